@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# MIT License
+"""Check files on disk against the digests recorded in CHAIN.jsonl or CHECKSUMS.txt.
+
+Sizes are compared first (a stat per file), so truncated or replaced files
+are reported without reading them; the rest are re-hashed on the shared
+thread pool. The digest cache (see file_hashing) makes daily runs cheap;
+paranoid=True ignores it and re-reads every byte. Ledger entries recorded as
+a sha256_tree are re-hashed chunk-parallel, and a mismatch reports which
+chunks (byte ranges) differ. Bundle entries (tars that were only ever
+streamed to the archives) are skipped; their members are checked.
+
+    python artifact_verify.py write CHECKSUMS.txt STORY.md [FILE ...]
+    python artifact_verify.py check CHECKSUMS.txt [--paranoid] [--report -]
+
+chain/chain_verify.py --artifacts runs the same check against the ledger.
+"""
+from __future__ import annotations
+import os, re, sys, json, time, pathlib, argparse
+from typing import Iterable, Optional
+from file_hashing import default_cache, hash_files, iter_hash_files, tree_digest
+from chain_merkle import TREE_SCHEME
+from chain_index import scan_ledger
+import telemetry
+
+ROOT = pathlib.Path(__file__).resolve().parent
+CHECKSUM_LINE = re.compile(r"^SHA256\((.+)\) = ([0-9a-fA-F]{64})\s*$")
+
+def read_checksums(path: os.PathLike | str) -> list[dict]:
+    """Entries of a `SHA256(name) = hex` file; names are relative to its directory."""
+    path = pathlib.Path(path); out = []
+    for n, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        if not line.strip(): continue
+        m = CHECKSUM_LINE.match(line)
+        if not m: raise ValueError(f"{path}:{n}: not a SHA256(name) = hex line")
+        out.append({"path": m.group(1), "bytes": None, "sha256": m.group(2).lower(), "source": f"{path.name}:{n}"})
+    return out
+
+def write_checksums(path: os.PathLike | str, files: list[str], workers: Optional[int] = None) -> int:
+    """Write `SHA256(name) = hex` lines, names relative to the output file's directory."""
+    path = pathlib.Path(path); base = path.resolve().parent
+    digests = hash_files(files, workers=workers, cache=default_cache())
+    lines = []
+    for f, (_, d) in zip(files, digests):
+        p = pathlib.Path(f).resolve()
+        name = p.relative_to(base).as_posix() if p.is_relative_to(base) else str(f)
+        lines.append(f"SHA256({name}) = {d}\n")
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    tmp.write_text("".join(lines), encoding="utf-8")
+    os.replace(tmp, path)
+    return len(lines)
+
+def ledger_entries(ledger: os.PathLike | str, index: Optional[int] = None) -> list[dict]:
+    """Latest recorded entry per path (or block index's files only)."""
+    latest: dict[str, dict] = {}
+    for _, _, b in scan_ledger(pathlib.Path(ledger)):
+        if index is not None and b["index"] != index: continue
+        for fi in b["files"]:
+            if "bundle" in fi: continue  # an uploaded tar (bundle_stream); its members are checked instead
+            e = {"path": fi["path"], "bytes": fi["bytes"], "sha256": fi.get("sha256"), "source": f"block {b['index']}"}
+            if TREE_SCHEME in fi:
+                t = fi[TREE_SCHEME]; e.update(tree_root=t["root"], chunk_size=t["chunk_size"], chunks=t["chunks"])
+            latest[fi["path"]] = e
+    return list(latest.values())
+
+def _brief(e: dict) -> dict:
+    return {k: v for k, v in e.items() if k != "chunks"}
+
+@telemetry.traced("verify_artifacts")
+def verify_artifacts(entries: Iterable[dict], base: os.PathLike | str = ROOT, paranoid: bool = False,
+                     workers: Optional[int] = None) -> dict:
+    """Report dict: ok, checked, bytes_hashed, elapsed_s and one mismatches[] item per bad file."""
+    t0 = time.monotonic(); base = pathlib.Path(base)
+    mismatches = []; todo = []; trees = []; checked = 0
+    for e in entries:
+        checked += 1; p = base / e["path"]
+        try:
+            size = os.stat(p).st_size
+        except OSError:
+            mismatches.append({**_brief(e), "status": "missing"}); continue
+        if e["bytes"] is not None and size != e["bytes"]:
+            mismatches.append({**_brief(e), "status": "size", "actual_bytes": size}); continue
+        (trees if "chunks" in e else todo).append((p, e))
+    cache = None if paranoid else default_cache(); hashed = 0
+    for (p, e), (_, size, digest) in zip(todo, iter_hash_files([p for p, _ in todo], workers=workers, cache=cache)):
+        hashed += size
+        if digest != e["sha256"]:
+            mismatches.append({**e, "status": "digest", "actual_bytes": size, "actual_sha256": digest})
+    for p, e in trees:  # one file at a time, each spread over all cores
+        size, chunks = tree_digest(p, e["chunk_size"], cache, workers); hashed += size
+        bad = [i for i, (want, got) in enumerate(zip(e["chunks"], chunks)) if want != got]
+        if bad:
+            cs = e["chunk_size"]
+            ranges = [{"chunk": i, "offset": i * cs, "length": min(cs, size - i * cs)} for i in bad]
+            mismatches.append({**_brief(e), "status": "chunks", "bad_chunks": ranges})
+    if cache is not None: cache.save()
+    telemetry.count("artifact_bytes_hashed", hashed); telemetry.count("artifact_mismatches", len(mismatches))
+    return {"ok": not mismatches, "checked": checked, "paranoid": paranoid, "bytes_hashed": hashed,
+            "elapsed_s": round(time.monotonic() - t0, 3), "mismatches": mismatches}
+
+def print_report(report: dict, dest: Optional[str] = None) -> None:
+    """Human summary, plus the full JSON report to dest ("-": stdout, and the summary moves to stderr)."""
+    out = sys.stderr if dest == "-" else sys.stdout
+    for m in report["mismatches"]:
+        if m["status"] == "missing": print(f"[!] missing: {m['path']} ({m['source']})", file=out)
+        elif m["status"] == "size":
+            print(f"[!] size mismatch: {m['path']} is {m['actual_bytes']} bytes, expected {m['bytes']} ({m['source']})", file=out)
+        elif m["status"] == "chunks":
+            spans = ", ".join(f"{c['chunk']} @ {c['offset']}" for c in m["bad_chunks"])
+            print(f"[!] chunk mismatch: {m['path']} ({m['source']}) — chunk(s) {spans}", file=out)
+        else: print(f"[!] sha256 mismatch: {m['path']} ({m['source']})", file=out)
+    if dest == "-":
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    elif dest:
+        pathlib.Path(dest).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+def summary(report: dict) -> str:
+    if report["ok"]: return f"[✓] {report['checked']} file(s) match"
+    return f"[x] {len(report['mismatches'])} of {report['checked']} file(s) do not match"
+
+def main():
+    ap = argparse.ArgumentParser(description="Write or check CHECKSUMS.txt-style files")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    w = sub.add_parser("write", help="Write SHA256(name) = hex lines for FILEs")
+    w.add_argument("out"); w.add_argument("files", nargs="+")
+    c = sub.add_parser("check", help="Re-hash the files listed in a checksums file")
+    c.add_argument("checksums")
+    c.add_argument("--paranoid", action="store_true", help="Ignore the digest cache and re-read every file")
+    c.add_argument("--workers", type=int)
+    c.add_argument("--report", help="Write the JSON report here ('-' for stdout)")
+    args = ap.parse_args()
+
+    if args.cmd == "write":
+        for f in args.files:
+            if not os.path.isfile(f): print(f"[!] Missing file: {f}", file=sys.stderr); sys.exit(1)
+        n = write_checksums(args.out, args.files); print(f"[+] Wrote {n} checksum(s) -> {args.out}"); return
+    entries = read_checksums(args.checksums)
+    report = verify_artifacts(entries, pathlib.Path(args.checksums).resolve().parent, args.paranoid, args.workers)
+    print_report(report, args.report)
+    print(summary(report), file=sys.stderr if args.report == "-" else sys.stdout)
+    sys.exit(0 if report["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
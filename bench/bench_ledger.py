@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# MIT License
+"""Concurrent append stress test for chain_writer.
+
+Spawns --procs processes with --threads appender threads each. Every thread
+appends --blocks small signed blocks to a scratch ledger. Afterwards the
+ledger is checked end to end: consecutive indices, prev_hash linkage,
+block_hash, signatures and the sidecar index. Blocks per commit are reported
+over all processes and per process: group commit only batches threads of one
+process, so --threads 1 shows the cross-process case (one block per commit).
+
+    python bench/bench_ledger.py --procs 4 --threads 8 --blocks 50
+    python bench/bench_ledger.py --procs 8 --threads 1  # separate processes, e.g. CI jobs
+    python bench/bench_ledger.py --mode lock      # one write + fsync per block
+    python bench/bench_ledger.py --mode unlocked  # the old read-tail-then-append, to see it fork
+"""
+import os, sys, json, time, base64, pathlib, argparse, tempfile, threading
+import multiprocessing as mp
+from nacl.signing import SigningKey
+from nacl.encoding import RawEncoder
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from chain_index import ChainIndex, scan_ledger
+from chain_writer import ChainWriter
+from chain_verify_engine import block_facts, canonical, sha256hex
+
+def make_draft(pid: int, t: int, i: int) -> dict:
+    digest = sha256hex(f"{pid}/{t}/{i}".encode())
+    return {"schema": "fabric-chain/1.0", "timestamp": "2025-01-01T00:00:00Z", "notes": f"bench {pid}/{t}/{i}",
+            "files": [{"path": f"bench/{pid}-{t}-{i}", "bytes": 0, "sha256": digest}], "merkle_root": digest}
+
+def unlocked_append(ledger: pathlib.Path, draft: dict, sign) -> None:
+    # what chain_new_block did before the writer: tail by full scan, then a plain append
+    prev = None; n = 0
+    for _, _, b in scan_ledger(ledger): prev = b; n += 1
+    block = {**draft, "index": n, "prev_hash": prev["block_hash"] if prev else None}
+    block["block_hash"] = sha256hex(canonical(block)); block["signatures"] = sign(block["block_hash"])
+    with open(ledger, "ab") as f:
+        f.write((json.dumps(block, sort_keys=True) + "\n").encode("utf-8"))
+
+def worker(ledger: str, mode: str, threads: int, blocks: int, sk_b64: str, go, out) -> None:
+    ledger = pathlib.Path(ledger); sk = SigningKey(base64.b64decode(sk_b64))
+    pub = base64.b64encode(bytes(sk.verify_key)).decode()
+    def sign(h: str) -> list[dict]:
+        sig = sk.sign(bytes.fromhex(h), encoder=RawEncoder).signature
+        return [{"signer": "bench", "pubkey_b64": pub, "sig_b64": base64.b64encode(sig).decode()}]
+    shared = ChainWriter(ledger); errors = []
+    def run(t: int) -> None:
+        for i in range(blocks):
+            try:
+                draft = make_draft(os.getpid(), t, i)
+                if mode == "group": shared.append(draft, sign)
+                elif mode == "lock": ChainWriter(ledger).append(draft, sign)
+                else: unlocked_append(ledger, draft, sign)
+            except Exception as e:
+                errors.append(repr(e))
+    go.wait()
+    ts = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    out.put({"commits": shared.commits, "blocks": threads * blocks, "errors": errors})
+
+def check(ledger: pathlib.Path, expected: int) -> list[str]:
+    problems = []; prev_hash = None; n = 0
+    try:
+        for _, _, b in scan_ledger(ledger):
+            facts = block_facts(b)
+            if b["index"] != n: problems.append(f"index {b['index']} at position {n}")
+            if b["prev_hash"] != prev_hash: problems.append(f"prev_hash mismatch at block {b['index']}")
+            if not (facts["hash_ok"] and facts["merkle_ok"] and all(facts["sigs"].values())):
+                problems.append(f"bad hash/signature at block {b['index']}")
+            prev_hash = b["block_hash"]; n += 1
+    except ValueError as e:
+        problems.append(f"unparseable ledger line: {e}")
+    if n != expected: problems.append(f"{n} blocks on disk, {expected} appended")
+    if not ChainIndex(ledger).check_deep(): problems.append("sidecar index disagrees with the ledger")
+    return problems
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--procs", type=int, default=4)
+    ap.add_argument("--threads", type=int, default=8, help="Appender threads per process")
+    ap.add_argument("--blocks", type=int, default=25, help="Blocks per thread")
+    ap.add_argument("--mode", choices=["group", "lock", "unlocked"], default="group")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = pathlib.Path(tmp) / "chain" / "CHAIN.jsonl"; ledger.parent.mkdir()
+        sk_b64 = base64.b64encode(bytes(SigningKey.generate())).decode()
+        go = mp.Event(); out = mp.Queue()
+        procs = [mp.Process(target=worker, args=(str(ledger), args.mode, args.threads, args.blocks, sk_b64, go, out))
+                 for _ in range(args.procs)]
+        for p in procs: p.start()
+        time.sleep(0.5)  # let every process import and spin up before the clock starts
+        t0 = time.perf_counter(); go.set()
+        results = [out.get() for _ in procs]
+        dt = time.perf_counter() - t0
+        for p in procs: p.join()
+        total = args.procs * args.threads * args.blocks
+        problems = check(ledger, total) if ledger.exists() else ["no ledger written"]
+        # "lock" builds a writer per block, so its commits are not counted: one per block
+        commits = (sum(r["commits"] for r in results) if args.mode == "group"
+                   else total if args.mode == "lock" else None)
+        res = {"mode": args.mode, "procs": args.procs, "threads": args.threads, "appends": total,
+               "seconds": round(dt, 3), "appends_per_s": round(total / dt, 1), "commits": commits,
+               "blocks_per_commit": round(total / commits, 2) if commits else None,
+               "blocks_per_commit_by_proc": [round(r["blocks"] / r["commits"], 2) for r in results if r["commits"]]
+                                            if args.mode == "group" else None,
+               "errors": sum(len(r["errors"]) for r in results), "integrity_ok": not problems,
+               "problems": problems[:10]}
+    if args.json: print(json.dumps(res, indent=2)); return
+    print(f"[i] {args.mode}: {total} appends from {args.procs}x{args.threads} appenders in {dt:.2f}s "
+          f"— {res['appends_per_s']} appends/s" + (f", {res['commits']} write+fsync rounds "
+                                                   f"({res['blocks_per_commit']} blocks/commit)" if res["commits"] else ""))
+    if res["blocks_per_commit_by_proc"]:
+        print(f"[i] blocks/commit per process: {res['blocks_per_commit_by_proc']} "
+              f"(batches never span processes)")
+    for p in problems[:10]: print(f"[!] {p}")
+    print("[✓] Chain intact" if not problems else f"[x] Chain damaged ({len(problems)} problem(s))")
+    sys.exit(0 if not problems and not res["errors"] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# MIT License
+"""Offline Zenodo upload benchmark against mock_services.MockZenodo.
+
+Compares the old per-file multipart POST (fresh connection per request) with
+upload_to_zenodo's streamed bucket PUTs over one pooled session.
+
+    python bench/bench_zenodo.py --files 20 --size-mb 8 --workers 4 --connect-delay 0.05
+"""
+import os, sys, time, json, pathlib, argparse, tempfile, logging
+import requests
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import mock_services
+import uploader_core
+
+def legacy_upload(api: str, files: list[str]) -> None:
+    # the pre-bucket code path: module-level requests.post, multipart body
+    h = {"Authorization": "Bearer bench"}
+    dep = requests.post(f"{api}/deposit/depositions", headers=h, json={}).json()
+    for f in files:
+        with open(f, "rb") as fp:
+            requests.post(f"{api}/deposit/depositions/{dep['id']}/files", headers=h,
+                          data={"name": os.path.basename(f)}, files={"file": fp}).raise_for_status()
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--files", type=int, default=20)
+    ap.add_argument("--size-mb", type=float, default=4)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--connect-delay", type=float, default=0.05)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--throttle-mb", type=float, default=0.0, help="Per-stream cap in MiB/s")
+    args = ap.parse_args()
+    logging.getLogger("testament.uploader").setLevel(logging.WARNING)
+
+    svc = mock_services.MockZenodo(connect_delay=args.connect_delay, latency=args.latency,
+                                   throttle=args.throttle_mb * 2**20)
+    mock_services.serve(svc)
+    os.environ.update(ZENODO_API_URL=svc.api, ZENODO_TOKEN="bench", FABRIC_DIGEST_CACHE="off")
+    md = uploader_core.default_metadata("bench", ["bench"], "bench", [])
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for i in range(args.files):
+            p = pathlib.Path(tmp) / f"f{i:05d}.bin"
+            p.write_bytes(os.urandom(int(args.size_mb * 2**20))); files.append(str(p))
+        total = args.files * args.size_mb
+        runs = [("legacy-multipart", lambda: legacy_upload(svc.api, files)),
+                ("bucket-1", lambda: uploader_core.upload_to_zenodo(files, md, publish=False, workers=1)),
+                (f"bucket-{args.workers}", lambda: uploader_core.upload_to_zenodo(files, md, publish=False,
+                                                                                  workers=args.workers))]
+        out = {}
+        for name, fn in runs:
+            c0 = svc.connections; t0 = time.perf_counter(); fn(); dt = time.perf_counter() - t0
+            out[name] = {"seconds": round(dt, 3), "mib_per_s": round(total / dt, 2),
+                         "connections": svc.connections - c0}
+    print(json.dumps(out, indent=2))
+
+if __name__ == "__main__":
+    main()
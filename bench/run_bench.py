@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# MIT License
+"""Benchmark suite: times the real entry points on synthetic data.
+
+Each scenario builds a scratch root with bench/synth.py, points the
+entry point's module globals (LEDGER, PUBS, KEYS, POLICY) at it and
+calls its main() or API exactly as a user would. Uploads go to
+mock_services.MockZenodo and MockIAS3 on localhost. The median of
+--repeat runs is reported.
+
+    python bench/run_bench.py --scale small --out bench.json
+    python bench/run_bench.py --scale small --baseline bench.json   # exit 1 on regression
+
+Scales: small ~1e3 blocks, medium ~1e5, large 1e6 blocks and 1e5-file
+blocks; the individual --blocks/--files/... flags override a scale.
+"""
+import io, os, sys, json, time, random, platform, pathlib, argparse, tempfile, statistics, importlib.util, logging
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT)); sys.path.insert(0, str(ROOT / "bench"))
+import synth
+import mock_services
+import uploader_core
+import chain_new_block
+import cosign_block
+
+SCALES = {
+    "small":  dict(blocks=1_000, files=4, cosigners=2, wide_blocks=4, wide_files=1_000,
+                   tree_files=200, tree_kb=64, upload_files=4, upload_mb=2),
+    "medium": dict(blocks=100_000, files=4, cosigners=3, wide_blocks=4, wide_files=10_000,
+                   tree_files=2_000, tree_kb=256, upload_files=8, upload_mb=16),
+    "large":  dict(blocks=1_000_000, files=4, cosigners=3, wide_blocks=4, wide_files=100_000,
+                   tree_files=20_000, tree_kb=256, upload_files=8, upload_mb=64),
+}
+
+def load_script(name: str):
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", ROOT / "chain" / f"{name}.py")
+    mod = importlib.util.module_from_spec(spec); spec.loader.exec_module(mod)
+    return mod
+
+chain_verify = load_script("chain_verify")
+chain_verify_threshold = load_script("chain_verify_threshold")
+
+@contextmanager
+def patched(obj, **attrs):
+    old = {k: getattr(obj, k) for k in attrs}
+    for k, v in attrs.items(): setattr(obj, k, v)
+    try: yield
+    finally:
+        for k, v in old.items(): setattr(obj, k, v)
+
+@contextmanager
+def env(**kv):
+    old = {k: os.environ.get(k) for k in kv}
+    os.environ.update(kv)
+    try: yield
+    finally:
+        for k, v in old.items():
+            if v is None: os.environ.pop(k, None)
+            else: os.environ[k] = v
+
+def point_at(root: pathlib.Path):
+    """Patch every entry point's path globals to the synthetic root."""
+    c = root / "chain"
+    return [patched(chain_new_block, LEDGER=c / "CHAIN.jsonl", PUBS=c / "pubkeys.json", KEYS=c / "keys"),
+            patched(cosign_block, LEDGER=c / "CHAIN.jsonl", PUBS=c / "pubkeys.json", KEYS=c / "keys"),
+            patched(chain_verify, LEDGER=c / "CHAIN.jsonl", PUBS=c / "pubkeys.json"),
+            patched(chain_verify_threshold, LEDGER=c / "CHAIN.jsonl", PUBS=c / "pubkeys.json",
+                    POLICY=c / "policy.json")]
+
+def call_main(fn, argv: list[str]) -> int:
+    out = io.StringIO()
+    with patched(sys, argv=["bench"] + argv), redirect_stdout(out), redirect_stderr(out):
+        try:
+            fn(); return 0
+        except SystemExit as e:
+            code = e.code or 0
+    if code: raise RuntimeError(f"{argv} exited {code}:\n{out.getvalue()[-2000:]}")
+    return code
+
+def timed(fn, repeat: int, setup=None) -> dict:
+    runs = []
+    for _ in range(repeat):
+        if setup: setup()
+        t0 = time.perf_counter(); fn(); runs.append(time.perf_counter() - t0)
+    return {"seconds": round(statistics.median(runs), 6), "runs": [round(r, 6) for r in runs]}
+
+def scenarios(root: pathlib.Path, p: dict, repeat: int, only: set):
+    """Yield (name, params, result) for each selected scenario."""
+    def want(name): return not only or name in only
+    ledger = root / "main" / "chain" / "CHAIN.jsonl"
+    tree = synth.make_tree(root / "main" / "artifacts", p["tree_files"], p["tree_kb"])
+    t0 = time.perf_counter()
+    synth.make_ledger(root / "main", p["blocks"], p["files"], p["cosigners"])
+    yield "synth_ledger", {"blocks": p["blocks"]}, {"seconds": round(time.perf_counter() - t0, 3), "runs": []}
+    import chain_query
+    chain_query.sync(ledger)  # steady state: the writers' incremental sync, not a first-time build
+
+    ctx = point_at(root / "main")
+    for c in ctx: c.__enter__()
+    try:
+        cwd = os.getcwd(); os.chdir(root / "main")
+        try:
+            if want("verify_full"):
+                yield "verify_full", {"blocks": p["blocks"]}, timed(lambda: call_main(chain_verify.main, ["--full"]), repeat)
+            if want("verify_threshold_full"):
+                yield "verify_threshold_full", {"blocks": p["blocks"]}, timed(
+                    lambda: call_main(chain_verify_threshold.main, ["--full"]), repeat)
+            if want("new_block"):
+                yield "new_block", {"files": len(tree)}, timed(lambda: call_main(
+                    chain_new_block.main, ["--signer", "s0", "--dir", "artifacts", "--quiet"]), repeat)
+            if want("verify_incremental"):
+                call_main(chain_verify.main, [])  # checkpoint at the tail
+                yield "verify_incremental", {"blocks": p["blocks"]}, timed(
+                    lambda: call_main(chain_verify.main, []), repeat,
+                    setup=lambda: call_main(chain_new_block.main, ["--signer", "s0", "--file", tree[0], "--quiet"]))
+            if want("cosign"):
+                n = p["blocks"]
+                yield "cosign", {"blocks": n}, timed(lambda: call_main(
+                    cosign_block.main, ["--signer", "c0", "--index", str(random.randrange(n))]), repeat)
+            if want("build_checksums"):
+                with env(FABRIC_DIGEST_CACHE="off"):
+                    yield "build_checksums", {"files": len(tree), "kb": p["tree_kb"]}, timed(
+                        lambda: uploader_core.build_checksums(tree), repeat)
+            if want("build_checksums_cached"):
+                uploader_core.build_checksums(tree)  # warm the run's cache (see main)
+                yield "build_checksums_cached", {"files": len(tree)}, timed(
+                    lambda: uploader_core.build_checksums(tree), repeat)
+            if want("run_archive_dry"):
+                yield "run_archive_dry", {"files": len(tree)}, timed(lambda: uploader_core.run_archive(
+                    "bench", ["bench"], "bench", [], tree, dry_run=True), repeat)
+        finally:
+            os.chdir(cwd)
+    finally:
+        for c in reversed(ctx): c.__exit__(None, None, None)
+
+    if want("verify_wide"):
+        synth.make_ledger(root / "wide", p["wide_blocks"], p["wide_files"], p["cosigners"])
+        with patched(chain_verify, LEDGER=root / "wide" / "chain" / "CHAIN.jsonl",
+                     PUBS=root / "wide" / "chain" / "pubkeys.json"):
+            yield "verify_wide", {"blocks": p["wide_blocks"], "files_per_block": p["wide_files"]}, timed(
+                lambda: call_main(chain_verify.main, ["--full"]), repeat)
+
+    if want("verify_segmented"):
+        import chain_segments
+        seg = root / "seg" / "chain" / "CHAIN.jsonl"
+        synth.make_ledger(root / "seg", p["blocks"], p["files"], p["cosigners"])
+        chain_segments.convert(seg, seg.with_suffix(chain_segments.SUFFIX)); seg.unlink()
+        with patched(chain_verify, LEDGER=seg, PUBS=seg.parent / "pubkeys.json"):
+            yield "verify_segmented", {"blocks": p["blocks"]}, timed(
+                lambda: call_main(chain_verify.main, ["--full"]), repeat)
+
+    if want("upload_mock"):
+        files = [str(f) for f in synth.make_tree(root / "upload", p["upload_files"], p["upload_mb"] * 1024)]
+        zen = mock_services.MockZenodo(); s3 = mock_services.MockIAS3()
+        servers = [mock_services.serve(zen), mock_services.serve(s3)]
+        def upload():
+            # every file through IA S3 multipart so nothing leaves localhost
+            res = uploader_core.run_archive("bench", ["bench"], "bench", [], files, identifier="bench-item",
+                                            concurrent=True, resume=False, zenodo_workers=4, ia_multipart_threshold=1)
+            if res["errors"]: raise RuntimeError(f"upload_mock failed: {res['errors']}")
+        try:
+            with env(ZENODO_API_URL=zen.api, ZENODO_TOKEN="bench", IA_S3_URL=s3.base, IA_ACCESS_KEY="bench",
+                     IA_SECRET_KEY="bench", FABRIC_DIGEST_CACHE="off"), redirect_stderr(io.StringIO()):
+                yield "upload_mock", {"files": len(files), "mb": p["upload_mb"]}, timed(upload, repeat)
+        finally:
+            for s in servers: s.shutdown()
+
+    if want("mirror_audit"):
+        import mirror_audit
+        from file_hashing import hash_file
+        base = root / "main" / "artifacts"
+        entries = [{"name": pathlib.Path(f).relative_to(base).as_posix(), "source": "bench",
+                    **dict(zip(("bytes", "sha256"), hash_file(f)))} for f in tree]
+        mirror = mock_services.MockMirror(base); srv = mock_services.serve(mirror)
+        def audit():
+            rep = mirror_audit.audit(entries, [mirror_audit.url_mirror(mirror.base)], connections=16)
+            if not rep["ok"]: raise RuntimeError(f"mirror_audit failed: {rep['failed']} file(s)")
+        try:
+            yield "mirror_audit", {"files": len(tree), "kb": p["tree_kb"]}, timed(audit, repeat)
+        finally:
+            srv.shutdown()
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta: float) -> list[str]:
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get("results", {}).get(name)
+        if not b or not b.get("seconds") or name == "synth_ledger": continue
+        ratio = r["seconds"] / b["seconds"]; r["baseline_seconds"] = b["seconds"]; r["ratio"] = round(ratio, 3)
+        slower = ratio > 1 + tolerance and r["seconds"] - b["seconds"] > min_delta  # ignore timer noise on tiny runs
+        flag = "REGRESSION" if slower else ("faster" if ratio < 1 - tolerance else "")
+        print(f"    {name:24s} {b['seconds']:10.4f}s -> {r['seconds']:10.4f}s  x{ratio:5.2f} {flag}")
+        if flag == "REGRESSION": regressions.append(name)
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the benchmark suite on synthetic data")
+    ap.add_argument("--scale", choices=sorted(SCALES), default="small")
+    for k in SCALES["small"]: ap.add_argument("--" + k.replace("_", "-"), type=float if k.endswith(("kb", "mb")) else int)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", action="append", default=[], help="Run just this scenario (repeatable)")
+    ap.add_argument("--out", help="Write results JSON here")
+    ap.add_argument("--baseline", help="Compare against an earlier --out file")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    ap.add_argument("--min-delta", type=float, default=0.01, help="...and by at least this many seconds")
+    args = ap.parse_args()
+    logging.disable(logging.INFO)
+    p = dict(SCALES[args.scale])
+    for k in p:
+        v = getattr(args, k)
+        if v is not None: p[k] = v
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="fabric-bench-") as tmp, \
+         env(FABRIC_DIGEST_CACHE=str(pathlib.Path(tmp) / "digest_cache.json")):  # never touch the repo's cache
+        for name, params, res in scenarios(pathlib.Path(tmp), p, args.repeat, set(args.only)):
+            results[name] = {**res, "params": params}
+            print(f"[i] {name:24s} {res['seconds']:10.4f}s  {params}")
+    report = {"meta": {"scale": args.scale, "params": p, "repeat": args.repeat, "python": platform.python_version(),
+                       "platform": platform.platform(), "cpus": os.cpu_count(),
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+              "results": results}
+    regressions = []
+    if args.baseline:
+        print(f"[i] Against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        regressions = compare(results, json.loads(pathlib.Path(args.baseline).read_text(encoding="utf-8")),
+                              args.tolerance, args.min_delta)
+        report["regressions"] = regressions
+    if args.out:
+        pathlib.Path(args.out).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"[+] Results -> {args.out}")
+    if regressions:
+        print(f"[x] {len(regressions)} regression(s): {', '.join(regressions)}"); sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# MIT License
+"""Synthetic ledgers and artifact trees for the benchmarks.
+
+A synthetic root mirrors the repo layout the chain scripts expect:
+chain/CHAIN.jsonl, chain/pubkeys.json, chain/policy.json, chain/keys/*.sk.
+Blocks carry made-up file digests. Each block is signed by signer s0 and
+by some of the cosigners; the rest of the cosignatures go to
+chain/SIGS.jsonl. The result passes both verifiers.
+
+    python bench/synth.py ledger OUT --blocks 10000 --files 4 --cosigners 2
+    python bench/synth.py tree OUT --files 1000 --size-kb 64
+"""
+import os, sys, json, base64, random, hashlib, pathlib, argparse
+from nacl.signing import SigningKey
+from nacl.encoding import RawEncoder
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from chain_merkle import merkle_root
+from chain_index import ChainIndex
+from chain_verify_engine import canonical, sha256hex
+
+def make_keys(root: pathlib.Path, signers: list[str]) -> dict[str, SigningKey]:
+    keys_dir = root / "chain" / "keys"; keys_dir.mkdir(parents=True, exist_ok=True)
+    keys = {}; pubs = {}
+    for name in signers:
+        sk = SigningKey.generate(); keys[name] = sk
+        (keys_dir / f"{name}.ed25519.sk").write_text(base64.b64encode(bytes(sk)).decode() + "\n", encoding="utf-8")
+        pubs[name] = base64.b64encode(bytes(sk.verify_key)).decode()
+    (root / "chain" / "pubkeys.json").write_text(json.dumps(pubs, indent=2, sort_keys=True), encoding="utf-8")
+    return keys
+
+def make_ledger(root: os.PathLike | str, blocks: int, files_per_block: int = 4, cosigners: int = 2,
+                logged_share: float = 0.25, seed: int = 0) -> pathlib.Path:
+    """Write a verifiable ledger under root/chain; returns its path.
+
+    Cosigner signatures are embedded in the block, except logged_share of
+    them which go to SIGS.jsonl the way cosign_block writes them.
+    """
+    root = pathlib.Path(root); rnd = random.Random(seed)
+    signers = ["s0"] + [f"c{i}" for i in range(cosigners)]
+    keys = make_keys(root, signers)
+    pubs = {n: base64.b64encode(bytes(k.verify_key)).decode() for n, k in keys.items()}
+    (root / "chain" / "policy.json").write_text(json.dumps(
+        {"allowed_signers": signers, "threshold": len(signers)}, indent=2), encoding="utf-8")
+    ledger = root / "chain" / "CHAIN.jsonl"
+    prev = None
+    with open(ledger, "wb") as out, open(root / "chain" / "SIGS.jsonl", "wb") as log:
+        for i in range(blocks):
+            files = [{"path": f"data/{i}/{j}.bin", "bytes": rnd.randrange(1 << 20),
+                      "sha256": hashlib.sha256(b"%d/%d/%d" % (seed, i, j)).hexdigest()} for j in range(files_per_block)]
+            block = {"schema": "fabric-chain/1.0", "index": i, "timestamp": f"2025-01-01T00:00:{i % 60:02d}Z",
+                     "prev_hash": prev, "files": files, "merkle_root": merkle_root([f["sha256"] for f in files]),
+                     "notes": f"synthetic {i}"}
+            bh = sha256hex(canonical(block)); block["block_hash"] = bh; sigs = []; logged = []
+            for name in signers:
+                s = {"signer": name, "pubkey_b64": pubs[name],
+                     "sig_b64": base64.b64encode(keys[name].sign(bytes.fromhex(bh), encoder=RawEncoder).signature).decode()}
+                (logged if name != "s0" and rnd.random() < logged_share else sigs).append(s)
+            block["signatures"] = sigs
+            out.write((json.dumps(block, sort_keys=True, ensure_ascii=False) + "\n").encode("utf-8"))
+            for s in logged:
+                log.write((json.dumps({"index": i, "block_hash": bh, **s}, sort_keys=True) + "\n").encode("utf-8"))
+            prev = bh
+    ChainIndex(ledger).rebuild()
+    return ledger
+
+def make_tree(root: os.PathLike | str, files: int, size_kb: float = 64, fanout: int = 100,
+              seed: int = 0) -> list[str]:
+    """files random files of about size_kb spread over fanout subdirectories; returns their paths."""
+    root = pathlib.Path(root); rnd = random.Random(seed); paths = []
+    block = rnd.randbytes(max(1, int(size_kb * 1024)))
+    for i in range(files):
+        d = root / f"d{i % fanout:03d}"; d.mkdir(parents=True, exist_ok=True)
+        p = d / f"f{i:07d}.bin"
+        p.write_bytes(i.to_bytes(8, "little") + block)  # distinct content, cheap to generate
+        paths.append(str(p))
+    return paths
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate synthetic ledgers and artifact trees")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    l = sub.add_parser("ledger"); l.add_argument("out")
+    l.add_argument("--blocks", type=int, default=1000); l.add_argument("--files", type=int, default=4)
+    l.add_argument("--cosigners", type=int, default=2); l.add_argument("--seed", type=int, default=0)
+    t = sub.add_parser("tree"); t.add_argument("out")
+    t.add_argument("--files", type=int, default=1000); t.add_argument("--size-kb", type=float, default=64)
+    args = ap.parse_args()
+    if args.cmd == "ledger":
+        p = make_ledger(args.out, args.blocks, args.files, args.cosigners, seed=args.seed)
+        print(f"[+] {args.blocks} blocks -> {p}")
+    else:
+        n = len(make_tree(args.out, args.files, args.size_kb)); print(f"[+] {n} files -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# MIT License
+"""Stream many files as one tar, with no temp file, hashing in the same pass.
+
+TarBundle lays out a PAX tar from the files' stat results, so its exact
+size is known before a byte is read (uploads need a Content-Length). Each
+open() returns a fresh sequential reader that emits the tar and, while
+doing so, hashes every member (sha256) and the bundle itself (sha256, md5).
+When a reader reaches the end, the manifest lands on the bundle:
+
+    {"schema": "fabric-bundle/1", "name", "bytes", "sha256", "md5",
+     "members": [{"path", "source", "bytes", "sha256"}]}
+
+path is the member name inside the tar, source the file it was read from.
+chain_new_block.py --bundle-manifest logs the bundle and its members.
+
+    python bundle_stream.py manifest release.tar STORY.md ... [-o release.tar.manifest.json]
+    python bundle_stream.py write release.tar STORY.md ...
+"""
+from __future__ import annotations
+import os, sys, json, hashlib, pathlib, argparse, tarfile, threading
+from collections import Counter
+from typing import Iterator, Optional
+
+BUNDLE_SCHEMA = "fabric-bundle/1"
+CHUNK = 1 << 20
+BLOCK = tarfile.BLOCKSIZE
+
+def arcnames(files: list[str]) -> list[str]:
+    """Member names: paths relative to the files' deepest common directory."""
+    absp = [os.path.abspath(f) for f in files]
+    if not absp: return []
+    base = os.path.commonpath([os.path.dirname(p) for p in absp])
+    names = [pathlib.Path(os.path.relpath(p, base)).as_posix() for p in absp]
+    dup = sorted(n for n, c in Counter(names).items() if c > 1)
+    if dup: raise ValueError(f"duplicate bundle member(s): {', '.join(dup[:5])}")
+    return names
+
+def _source(path: str) -> str:
+    rel = os.path.relpath(path)
+    return path if rel.startswith("..") else rel
+
+class TarBundle:
+    def __init__(self, name: str, files: list[str]):
+        self.name = name; self.members = []; size = 0; stat_list = []
+        for src, arc in zip(files, arcnames(files)):
+            st = os.stat(src)
+            ti = tarfile.TarInfo(arc); ti.size = st.st_size; ti.mtime = int(st.st_mtime); ti.mode = 0o644
+            hdr = ti.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+            self.members.append((str(src), arc, st.st_size, hdr))
+            size += len(hdr) + st.st_size + (-st.st_size) % BLOCK
+            stat_list.append([arc, st.st_size, st.st_mtime_ns])
+        size += 2 * BLOCK; size += (-size) % tarfile.RECORDSIZE
+        self.size = size
+        # stands in for the digest in upload journals: changes whenever a member's stat does
+        self.key = "stat:" + hashlib.sha256(json.dumps(stat_list).encode()).hexdigest()
+        self.manifest: Optional[dict] = None
+        self._mu = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"TarBundle({self.name!r}, {len(self.members)} members, {self.size} bytes)"
+
+    def open(self) -> "BundleReader":
+        return BundleReader(self)
+
+    def _finish(self, manifest: dict) -> None:
+        with self._mu:
+            if self.manifest and self.manifest["sha256"] != manifest["sha256"]:
+                raise RuntimeError(f"bundle {self.name}: members changed between passes")
+            self.manifest = manifest
+
+    def hash_pass(self) -> dict:
+        """Read the bundle once without sending it anywhere; returns the manifest."""
+        with self.open() as r:
+            while r.read(CHUNK): pass
+        return self.manifest
+
+    def write(self, dest: os.PathLike | str) -> dict:
+        with self.open() as r, open(dest, "wb") as out:
+            for chunk in iter(lambda: r.read(CHUNK), b""): out.write(chunk)
+        return self.manifest
+
+class BundleReader:
+    """File-like, read-only, sequential view of a TarBundle (len() is the full size)."""
+
+    def __init__(self, bundle: TarBundle):
+        self.bundle = bundle; self._gen = self._produce(); self._cur = b""; self._pos = 0
+
+    def __len__(self) -> int:
+        return self.bundle.size
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def close(self) -> None:
+        self._gen.close()
+
+    def _produce(self) -> Iterator[bytes]:
+        sha = hashlib.sha256(); md5 = hashlib.md5(); emitted = 0; members = []
+        def emit(b: bytes) -> bytes:
+            nonlocal emitted
+            sha.update(b); md5.update(b); emitted += len(b); return b
+        for src, arc, size, hdr in self.bundle.members:
+            yield emit(hdr)
+            h = hashlib.sha256(); got = 0
+            with open(src, "rb") as f:
+                while got < size:
+                    chunk = f.read(min(CHUNK, size - got))
+                    if not chunk: break
+                    got += len(chunk); h.update(chunk); yield emit(chunk)
+                if got != size or f.read(1): raise RuntimeError(f"{src} changed size while bundling")
+            if size % BLOCK: yield emit(bytes(BLOCK - size % BLOCK))
+            members.append({"path": arc, "source": _source(src), "bytes": size, "sha256": h.hexdigest()})
+        tail = emit(bytes(self.bundle.size - emitted))
+        self.bundle._finish({"schema": BUNDLE_SCHEMA, "name": self.bundle.name, "bytes": self.bundle.size,
+                             "sha256": sha.hexdigest(), "md5": md5.hexdigest(), "members": members})
+        yield tail
+
+    def read(self, n: int = -1) -> bytes:
+        if n is None or n < 0: n = CHUNK
+        out = bytearray()
+        while len(out) < n:
+            if self._pos >= len(self._cur):
+                self._cur = next(self._gen, None); self._pos = 0
+                if self._cur is None:
+                    self._cur = b""; break
+                if not out and len(self._cur) <= n:  # whole piece fits: hand it over without copying
+                    self._pos = len(self._cur); return self._cur
+            take = self._cur[self._pos:self._pos + n - len(out)]; self._pos += len(take); out += take
+        return bytes(out)
+
+def read_manifest(path: os.PathLike | str) -> dict:
+    m = json.loads(pathlib.Path(path).read_text(encoding="utf-8"))
+    if m.get("schema") != BUNDLE_SCHEMA: raise ValueError(f"{path}: not a {BUNDLE_SCHEMA} manifest")
+    return m
+
+def write_manifest(manifest: dict, path: os.PathLike | str) -> None:
+    path = pathlib.Path(path); tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+def main():
+    ap = argparse.ArgumentParser(description="Stream files into a tar bundle and record member digests")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("manifest", help="Hash the bundle without writing it")
+    w = sub.add_parser("write", help="Write the bundle to disk (to inspect what would be uploaded)")
+    for p in (m, w):
+        p.add_argument("name"); p.add_argument("files", nargs="+")
+        p.add_argument("-o", "--output", help="Manifest path (default NAME.manifest.json)")
+    args = ap.parse_args()
+    for f in args.files:
+        if not os.path.isfile(f): print(f"[!] Missing file: {f}", file=sys.stderr); sys.exit(1)
+    b = TarBundle(os.path.basename(args.name), args.files)
+    manifest = b.hash_pass() if args.cmd == "manifest" else b.write(args.name)
+    out = args.output or f"{args.name}.manifest.json"
+    write_manifest(manifest, out)
+    print(f"[+] {b.name}: {len(b.members)} members, {b.size} bytes, sha256 {manifest['sha256']}")
+    print(f"[+] Manifest -> {out}")
+
+if __name__ == "__main__":
+    main()
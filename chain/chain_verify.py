@@ -1,37 +1,94 @@
 #!/usr/bin/env python3
-import json, base64, hashlib, sys, pathlib, os
-from nacl.signing import VerifyKey
-from nacl.exceptions import BadSignatureError
+import json, sys, pathlib, os, argparse
 
 ROOT   = pathlib.Path(__file__).resolve().parent.parent
 LEDGER = ROOT / "chain" / "CHAIN.jsonl"
 PUBS   = ROOT / "chain" / "pubkeys.json"
 
-def sha256hex(b: bytes) -> str:
-    import hashlib; return hashlib.sha256(b).hexdigest()
-
-def canonical(obj) -> bytes:
-    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
-
-def merkle_root(hashes):
-    import hashlib as _h
-    if not hashes: return _h.sha256(b'').hexdigest()
-    level = [bytes.fromhex(h) for h in hashes]
-    while len(level) > 1:
-        nxt = []
-        for i in range(0, len(level), 2):
-            l = level[i]; r = level[i+1] if i+1 < len(level) else l
-            nxt.append(_h.sha256(l + r).digest())
-        level = nxt
-    return level[0].hex()
+sys.path.insert(0, str(ROOT))
+from chain_verify_state import config_hash, verify_ledger
+from chain_index import ledger_exists
+from chain_verify_engine import lookup_sig
+from chain_checkpoint import CheckpointChecker
+from artifact_verify import ledger_entries, read_checksums, verify_artifacts, print_report, summary
 
 def to_list(v):
     if v is None: return []
     if isinstance(v, list): return v
     return [v]
 
+def check_signatures(block, facts, allow):
+    ok = True; idx = block["index"]
+    # signatures — verify with the key embedded in the block
+    sigs = block.get("signatures", [])
+    if not sigs:
+        print(f"[!] no signatures at block {idx}"); ok = False
+    for s in sigs:
+        signer   = s["signer"]
+        pub_b64  = s["pubkey_b64"]
+
+        # cryptographic verification (source of truth); precomputed by the engine's workers
+        if not lookup_sig(facts, block, s):
+            print(f"[!] bad signature from '{signer}' at block {idx}"); ok = False
+
+        # allowlist advisory check (warn only)
+        if signer in allow and allow[signer] and pub_b64 not in allow[signer]:
+            print(f"[i] WARN: signer '{signer}' used a pubkey not in pubkeys.json allowlist at block {idx}")
+    return ok
+
+def check_block(block, facts, lineno, prev_hash, prev_index, allow, checker):
+    ok = True; idx = block["index"]
+
+    # index continuity
+    if idx != prev_index + 1:
+        print(f"[!] Index jump at line {lineno}: {idx} after {prev_index}"); ok = False
+
+    # prev linkage
+    if block["prev_hash"] != prev_hash and prev_hash is not None:
+        print(f"[!] prev_hash mismatch at block {idx}"); ok = False
+
+    # merkle
+    if not facts["merkle_ok"]:
+        print(f"[!] merkle_root mismatch at block {idx}"); ok = False
+
+    # chunk tree entries (sha256_tree): root must match the recorded chunks
+    for path in facts.get("bad_trees", []):
+        print(f"[!] chunk tree mismatch for {path} at block {idx}"); ok = False
+
+    # block hash
+    if not facts["hash_ok"]:
+        print(f"[!] block_hash mismatch at block {idx}"); ok = False
+
+    # checkpoint blocks: the root must match the block hashes they cover
+    if "checkpoint" in block:
+        for msg in checker.problems(block):
+            print(f"[!] {msg}"); ok = False
+
+    return check_signatures(block, facts, allow) and ok
+
 def main():
-    if not LEDGER.exists():
+    ap = argparse.ArgumentParser(description="Verify chain/CHAIN.jsonl (linkage, Merkle roots, hashes, signatures)")
+    ap.add_argument("--full", action="store_true", help="Ignore the verified-prefix checkpoint and re-check every block")
+    ap.add_argument("--workers", type=int, help="Verification processes, or hashing threads with --artifacts (default: all cores)")
+    ap.add_argument("--artifacts", action="store_true", help="Instead, re-hash the files the ledger records (latest entry per path)")
+    ap.add_argument("--checksums", metavar="FILE", help="Instead, re-hash the files listed in a CHECKSUMS.txt-style file")
+    ap.add_argument("--block", type=int, help="With --artifacts: only this block's files")
+    ap.add_argument("--paranoid", action="store_true", help="With --artifacts/--checksums: ignore the digest cache")
+    ap.add_argument("--report", help="With --artifacts/--checksums: JSON report path ('-' for stdout)")
+    args = ap.parse_args()
+
+    if args.artifacts or args.checksums:
+        # files are resolved against the repo root (ledger) or the checksum file's directory
+        if args.checksums:
+            entries = read_checksums(args.checksums); base = pathlib.Path(args.checksums).resolve().parent
+        else:
+            entries = ledger_entries(LEDGER, args.block); base = ROOT
+        report = verify_artifacts(entries, base, paranoid=args.paranoid, workers=args.workers)
+        print_report(report, args.report)
+        print(summary(report), file=sys.stderr if args.report == "-" else sys.stdout)
+        sys.exit(0 if report["ok"] else 1)
+
+    if not ledger_exists(LEDGER):
         msg = "[!] No chain yet: expected chain/CHAIN.jsonl"
         print(msg)
         sys.exit(1 if os.getenv("GITHUB_ACTIONS") else 0)
@@ -42,55 +99,11 @@ def main():
         # normalize to lists
         allow = {k: to_list(v) for k, v in raw.items()}
 
-    prev_hash, prev_index, ok = None, -1, True
-
-    with open(LEDGER, "r", encoding="utf-8") as f:
-        for lineno, line in enumerate(f, start=1):
-            if not line.strip(): continue
-            block = json.loads(line); idx = block["index"]
-
-            # index continuity
-            if idx != prev_index + 1:
-                print(f"[!] Index jump at line {lineno}: {idx} after {prev_index}"); ok = False
-
-            # prev linkage
-            if block["prev_hash"] != prev_hash and prev_hash is not None:
-                print(f"[!] prev_hash mismatch at block {idx}"); ok = False
-
-            # merkle
-            leaves = [fi["sha256"] for fi in block["files"]]
-            if block["merkle_root"] != merkle_root(leaves):
-                print(f"[!] merkle_root mismatch at block {idx}"); ok = False
-
-            # block hash
-            to_hash = {k: v for k, v in block.items() if k not in ("signatures", "block_hash")}
-            calc = sha256hex(canonical(to_hash))
-            if calc != block["block_hash"]:
-                print(f"[!] block_hash mismatch at block {idx}"); ok = False
-
-            # signatures — verify with the key embedded in the block
-            sigs = block.get("signatures", [])
-            if not sigs:
-                print(f"[!] no signatures at block {idx}"); ok = False
-            for s in sigs:
-                signer   = s["signer"]
-                pub_b64  = s["pubkey_b64"]
-                sig_b64  = s["sig_b64"]
-
-                # cryptographic verification (source of truth)
-                try:
-                    VerifyKey(base64.b64decode(pub_b64)).verify(
-                        bytes.fromhex(block["block_hash"]),
-                        base64.b64decode(sig_b64)
-                    )
-                except BadSignatureError:
-                    print(f"[!] bad signature from '{signer}' at block {idx}"); ok = False
-
-                # allowlist advisory check (warn only)
-                if signer in allow and allow[signer] and pub_b64 not in allow[signer]:
-                    print(f"[i] WARN: signer '{signer}' used a pubkey not in pubkeys.json allowlist at block {idx}")
-
-            prev_hash, prev_index = block["block_hash"], idx
+    # resumes after the last verified block unless --full; cosignatures from chain/SIGS.jsonl are merged in
+    checker = CheckpointChecker(LEDGER)
+    ok = verify_ledger(LEDGER, "chain_verify", config_hash(PUBS),
+                       lambda b, facts, lineno, ph, pi: check_block(b, facts, lineno, ph, pi, allow, checker),
+                       lambda b, facts: check_signatures(b, facts, allow), full=args.full, workers=args.workers)
 
     if ok:
         print("[✓] Chain verified OK"); sys.exit(0)
@@ -99,4 +112,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# MIT License
+"""Checkpoint blocks: one threshold-signed commitment to a range of earlier blocks.
+
+A checkpoint is an ordinary ledger block with no files and a "checkpoint" field:
+
+    {"schema": "fabric-checkpoint/1", "from": 0, "to": 4999, "count": 5000,
+     "root": merkle_root(block_hash of blocks from..to), "last_hash": block_hash of block `to`}
+
+The root is built like a block's file tree (chain_merkle), with block hashes as
+leaves. One signer appends it; cosign_block.py --index N brings it to the
+policy.json threshold. Full verification recomputes every checkpoint root.
+chain/chain_verify_threshold.py --light trusts the newest checkpoint that
+meets the threshold and checks only the blocks after its range; blocks inside
+the range can be spot-checked with an O(log n) inclusion proof.
+
+    python chain_checkpoint.py create --signer Keeper [--from 0] [--note "..."]
+    python chain_checkpoint.py prove --index 1234 > proof.json
+    python chain_checkpoint.py verify proof.json [--ledger chain/CHAIN.jsonl]
+"""
+from __future__ import annotations
+import sys, json, base64, pathlib, argparse
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from chain_index import ChainIndex
+from chain_cosigs import load_cosigs, merge_signatures, report_strays
+from chain_merkle import EMPTY_ROOT, MerkleAccumulator, MerkleTree, verify_proof
+from chain_verify_engine import block_facts, canonical, sha256hex, iter_checked
+import telemetry
+
+ROOT = pathlib.Path(__file__).resolve().parent
+LEDGER = ROOT / "chain" / "CHAIN.jsonl"
+CHECKPOINT_SCHEMA = "fabric-checkpoint/1"
+PROOF_SCHEMA = "fabric-checkpoint-proof/1"
+
+def _positions(cix: ChainIndex, lo: int, hi: int) -> Optional[tuple[int, int]]:
+    """Index positions of blocks lo and hi, or None unless lo..hi are all present."""
+    a, b = cix.find(lo), cix.find(hi)
+    if a is None or b is None or b - a != hi - lo: return None
+    return a, b
+
+def range_hashes(cix: ChainIndex, lo: int, hi: int) -> Optional[list[str]]:
+    pos = _positions(cix, lo, hi)
+    return None if pos is None else list(cix.iter_hashes(pos[0], pos[1] + 1))
+
+def payload(cix: ChainIndex, lo: int, hi: int) -> dict:
+    hashes = range_hashes(cix, lo, hi)
+    if hashes is None: raise ValueError(f"blocks {lo}..{hi} are not all in the ledger")
+    return {"schema": CHECKPOINT_SCHEMA, "from": lo, "to": hi, "count": len(hashes),
+            "root": MerkleTree(hashes).root, "last_hash": hashes[-1]}
+
+def shape_problems(block: dict) -> list[str]:
+    """What is wrong with a checkpoint field on its own (no other blocks consulted)."""
+    cp = block.get("checkpoint"); idx = block["index"]
+    if not isinstance(cp, dict) or cp.get("schema") != CHECKPOINT_SCHEMA:
+        return [f"unknown checkpoint schema at block {idx}"]
+    lo, hi = cp.get("from"), cp.get("to")
+    if not (isinstance(lo, int) and isinstance(hi, int) and 0 <= lo <= hi < idx) or cp.get("count") != hi - lo + 1:
+        return [f"checkpoint range {lo}..{hi} is invalid at block {idx}"]
+    return []
+
+class CheckpointChecker:
+    """Recomputes checkpoint roots during a full pass.
+
+    Ledger order means checkpoints sharing a start arrive with growing ends, so
+    one accumulator per start streams over the index once, not once per checkpoint.
+    """
+    def __init__(self, ledger: pathlib.Path):
+        self.ledger = ledger; self._cix: Optional[ChainIndex] = None; self.trusted: set[str] = set()
+        self._acc: dict[int, tuple[MerkleAccumulator, int, Optional[str]]] = {}  # from -> (acc, next pos, last hash)
+
+    def problems(self, block: dict) -> list[str]:
+        bad = shape_problems(block)
+        if bad or block["block_hash"] in self.trusted: return bad
+        cp = block["checkpoint"]; idx = block["index"]
+        if self._cix is None: self._cix = ChainIndex(self.ledger).open()
+        pos = _positions(self._cix, cp["from"], cp["to"])
+        if pos is None: return [f"checkpoint at block {idx} covers blocks missing from the ledger"]
+        acc, nxt, last = self._acc.get(cp["from"], (MerkleAccumulator(), pos[0], None))
+        if nxt > pos[1] + 1: acc, nxt, last = MerkleAccumulator(), pos[0], None  # out of order: start over
+        for h in self._cix.iter_hashes(nxt, pos[1] + 1): acc.add(h); last = h
+        self._acc[cp["from"]] = (acc, pos[1] + 1, last)
+        out = []
+        if acc.root() != cp["root"]: out.append(f"checkpoint root mismatch at block {idx}")
+        if last != cp["last_hash"]: out.append(f"checkpoint last_hash mismatch at block {idx}")
+        return out
+
+def newest_trusted(cix: ChainIndex, cosigs: Callable[[int], dict[int, list[dict]]],
+                   trusted: Callable[[dict, dict], bool]) -> Optional[dict]:
+    """Walk back from the tail to the newest well-formed checkpoint that trusted() accepts.
+
+    cosigs(lo) returns the cosignature records for blocks >= lo.
+    """
+    for pos in range(len(cix) - 1, -1, -1):
+        block = cix.read_at(cix.entry(pos)[0])[0]
+        if "checkpoint" not in block: continue
+        lo = block["checkpoint"]["to"] + 1 if not shape_problems(block) else block["index"]
+        block["signatures"], _ = merge_signatures(block, cosigs(lo).get(block["index"]))
+        facts = block_facts(block)
+        if facts["hash_ok"] and facts["merkle_ok"] and not shape_problems(block) and trusted(block, facts):
+            return block
+        print(f"[i] WARN: checkpoint block {block['index']} is not trusted; trying an older one")
+    return None
+
+def light_verify(ledger: pathlib.Path, name: str, check_block: Callable[[dict, dict, int, Optional[str], int], bool],
+                 trusted: Callable[[dict, dict], bool], checker: CheckpointChecker, workers: Optional[int] = None,
+                 spot: list[int] = ()) -> Optional[bool]:
+    """check_block over the blocks after the newest trusted checkpoint's range, then spot checks inside it.
+
+    The checkpoint block itself follows its range, so it goes through
+    check_block too; checker is told not to recompute its root. Returns None
+    when there is no trusted checkpoint (the caller runs a full pass).
+    Only cosignatures for blocks after the range are kept from SIGS.jsonl
+    (spot checks need none); the log is read again only if an untrusted
+    checkpoint sends the walk back to an older range.
+    """
+    cix = ChainIndex(ledger).open(); window = {"lo": None, "recs": {}}
+    def cosigs(lo: int) -> dict[int, list[dict]]:
+        if window["lo"] is None or lo < window["lo"]: window.update(lo=lo, recs=load_cosigs(ledger, since=lo))
+        return window["recs"]
+    with telemetry.span("light_checkpoint", verifier=name):
+        cpb = newest_trusted(cix, cosigs, trusted)
+    if cpb is None: return None
+    checker.trusted.add(cpb["block_hash"]); cp = cpb["checkpoint"]; start_pos = cix.find(cp["to"]) + 1
+    print(f"[i] Light: trusting checkpoint block {cpb['index']} over blocks {cp['from']}..{cp['to']} "
+          f"(root {cp['root'][:16]}…); checking the {len(cix) - start_pos} block(s) after its range")
+    ok = True; prev_hash, prev_index = cp["last_hash"], cp["to"]; blocks = 0; recs = cosigs(cp["to"] + 1)
+    with telemetry.span("verify_blocks", verifier=name, mode="light") as sp:
+        for n, _, _, block, facts in iter_checked(ledger, cix.entry(start_pos)[0], workers):
+            idx = block["index"]; blocks += 1
+            block["signatures"], stray = merge_signatures(block, recs.get(idx))
+            if not (report_strays(block, stray) & check_block(block, facts, start_pos + n, prev_hash, prev_index)):
+                ok = False
+            prev_hash, prev_index = block["block_hash"], idx
+        sp.add(blocks=blocks)
+    for idx in spot:
+        if idx > cp["to"]: print(f"[i] block {idx} is after the checkpoint range and was checked in full")
+        elif not spot_check(cix, cpb, idx): ok = False
+    return ok
+
+def covering(cix: ChainIndex, index: int) -> Optional[dict]:
+    """Newest checkpoint block whose range holds index."""
+    for pos in range(len(cix) - 1, -1, -1):
+        b = cix.read_at(cix.entry(pos)[0])[0]
+        if "checkpoint" in b and not shape_problems(b) and b["checkpoint"]["from"] <= index <= b["checkpoint"]["to"]:
+            return b
+    return None
+
+def prove(cix: ChainIndex, cpb: dict, index: int) -> dict:
+    """Inclusion proof that block index is leaf index - from of the checkpoint's root."""
+    cp = cpb["checkpoint"]; hashes = range_hashes(cix, cp["from"], cp["to"])
+    if hashes is None: raise ValueError(f"blocks {cp['from']}..{cp['to']} are not all in the ledger")
+    leaf = index - cp["from"]
+    return {"schema": PROOF_SCHEMA, "checkpoint_index": cpb["index"], "checkpoint_hash": cpb["block_hash"],
+            "from": cp["from"], "count": cp["count"], "root": cp["root"], "block_index": index,
+            "block_hash": hashes[leaf], "leaf_index": leaf, "siblings": MerkleTree(hashes).proof(leaf)}
+
+def proof_ok(proof: dict) -> bool:
+    return (proof.get("schema") == PROOF_SCHEMA and proof["leaf_index"] == proof["block_index"] - proof["from"]
+            and verify_proof(proof["block_hash"], proof["leaf_index"], proof["siblings"], proof["root"], proof["count"]))
+
+def spot_check(cix: ChainIndex, cpb: dict, index: int) -> bool:
+    """Block index re-hashes to its block_hash, and that hash is under the checkpoint root."""
+    block = cix.get(index); cp = cpb["checkpoint"]
+    if block is None or not cp["from"] <= index <= cp["to"]:
+        print(f"[!] block {index} is not covered by checkpoint block {cpb['index']}"); return False
+    facts = block_facts(block)
+    if not (facts["hash_ok"] and facts["merkle_ok"]):
+        print(f"[!] spot check: block {index} does not match its own block_hash/merkle_root"); return False
+    proof = prove(cix, cpb, index)
+    if proof["block_hash"] != block["block_hash"] or not proof_ok(proof):
+        print(f"[!] spot check: block {index} is not under checkpoint block {cpb['index']}'s root"); return False
+    print(f"[✓] Spot check: block {index} is leaf {proof['leaf_index']}/{proof['count']} of checkpoint block {cpb['index']}")
+    return True
+
+def main():
+    ap = argparse.ArgumentParser(description="Create checkpoint blocks and inclusion proofs against them")
+    ap.add_argument("--ledger", default=str(LEDGER))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("create", help="Append a checkpoint over blocks --from..latest")
+    c.add_argument("--signer", required=True)
+    c.add_argument("--from", dest="lo", type=int, default=0, help="First block covered (default genesis)")
+    c.add_argument("--note", default="")
+    p = sub.add_parser("prove", help="Print a proof that block --index is under a checkpoint root")
+    p.add_argument("--index", type=int, required=True)
+    p.add_argument("--checkpoint", type=int, help="Checkpoint block to prove against (default newest covering)")
+    v = sub.add_parser("verify", help="Check a proof offline")
+    v.add_argument("proof")
+    v.add_argument("--ledger", dest="against", help="Also check both blocks against this ledger")
+    args = ap.parse_args()
+    ledger = pathlib.Path(args.ledger)
+
+    if args.cmd == "create":
+        from nacl.signing import SigningKey
+        from nacl.encoding import RawEncoder
+        from chain_writer import ChainWriter
+        import chain_query
+        # keys live next to the ledger, as the verifiers expect (chain/keys, chain/pubkeys.json)
+        sk_path = ledger.parent / "keys" / f"{args.signer}.ed25519.sk"; pubs = ledger.parent / "pubkeys.json"
+        if not sk_path.exists():
+            print(f"[!] Secret key not found: {sk_path} — run: python chain_init.py {args.signer}", file=sys.stderr); sys.exit(1)
+        sk = SigningKey(base64.b64decode(sk_path.read_text().strip()))
+        vk_b64 = (json.loads(pubs.read_text(encoding="utf-8")) if pubs.exists() else {}).get(args.signer)
+        if not vk_b64:
+            print(f"[!] No pubkey entry for signer '{args.signer}' in pubkeys.json", file=sys.stderr); sys.exit(1)
+        cix = ChainIndex(ledger).open(); tail, _ = cix.tail()
+        if tail is None: print("[!] No blocks to checkpoint", file=sys.stderr); sys.exit(1)
+        try:
+            with telemetry.span("checkpoint_root") as sp:
+                cp = payload(cix, args.lo, tail["index"]); sp.add(blocks=cp["count"])
+        except ValueError as e:
+            print(f"[!] {e}", file=sys.stderr); sys.exit(1)
+        draft = {"schema": "fabric-chain/1.0", "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                 "files": [], "merkle_root": EMPTY_ROOT, "notes": args.note, "checkpoint": cp}
+        def sign(block_hash: str) -> list[dict]:
+            sig = sk.sign(bytes.fromhex(block_hash), encoder=RawEncoder).signature
+            return [{"signer": args.signer, "pubkey_b64": vk_b64, "sig_b64": base64.b64encode(sig).decode("utf-8")}]
+        block = ChainWriter(ledger).append(draft, sign)
+        chain_query.sync(ledger)
+        print(f"[+] Checkpoint block {block['index']} over blocks {cp['from']}..{cp['to']}")
+        print(f"    root: {cp['root']}"); print(f"    hash: {block['block_hash']}")
+        print(f"[i] Cosign it up to the policy.json threshold: python cosign_block.py --signer NAME --index {block['index']}")
+        return
+
+    if args.cmd == "prove":
+        cix = ChainIndex(ledger).open()
+        if args.checkpoint is None: cpb = covering(cix, args.index)
+        else:
+            cpb = cix.get(args.checkpoint)
+            if cpb is not None and ("checkpoint" not in cpb or shape_problems(cpb)): cpb = None
+        if cpb is None or not cpb["checkpoint"]["from"] <= args.index <= cpb["checkpoint"]["to"]:
+            print(f"[!] No checkpoint covers block {args.index}", file=sys.stderr); sys.exit(1)
+        try:
+            proof = prove(cix, cpb, args.index)
+        except ValueError as e:
+            print(f"[!] {e}", file=sys.stderr); sys.exit(1)
+        if not proof_ok(proof):
+            print(f"[!] checkpoint block {cpb['index']} root does not match the ledger", file=sys.stderr); sys.exit(1)
+        print(json.dumps(proof, indent=2)); return
+
+    proof = json.loads(pathlib.Path(args.proof).read_text(encoding="utf-8"))
+    ok = proof_ok(proof)
+    if not ok: print("[!] proof does not reach the checkpoint root")
+    if ok and args.against:
+        cix = ChainIndex(args.against).open()
+        cpb = cix.get(proof["checkpoint_index"]); b = cix.get(proof["block_index"])
+        if (not cpb or cpb["block_hash"] != proof["checkpoint_hash"] or shape_problems(cpb)
+                or cpb["checkpoint"]["root"] != proof["root"] or cpb["checkpoint"]["from"] != proof["from"]):
+            print(f"[!] checkpoint block {proof['checkpoint_index']} in {args.against} does not match the proof"); ok = False
+        elif not b or b["block_hash"] != proof["block_hash"] or sha256hex(canonical(
+                {k: v for k, v in b.items() if k not in ("signatures", "block_hash")})) != b["block_hash"]:
+            print(f"[!] block {proof['block_index']} in {args.against} does not match the proof"); ok = False
+    if ok:
+        print(f"[✓] block {proof['block_index']} ({proof['block_hash'][:16]}…) is leaf {proof['leaf_index']}/{proof['count']} "
+              f"of checkpoint block {proof['checkpoint_index']} (root {proof['root']})")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# MIT License
+"""Append-only cosignature log kept next to the ledger (chain/SIGS.jsonl).
+
+Each line is {"index", "block_hash", "signer", "pubkey_b64", "sig_b64"}. A
+cosignature is one small fsync'd append; readers merge the log into the
+block's own signatures (a later entry from the same signer replaces the
+earlier one, as cosign_block always did). Only a record whose signature
+verifies over the block's hash with its own pubkey is merged; any other is a
+stray that stays in the log for the verifiers to flag, so a garbage line can
+never displace a good signature. `compact` folds the log back into the block
+lines through a temp file + rename.
+
+    python chain_cosigs.py compact
+"""
+from __future__ import annotations
+import os, re, json, pathlib, argparse
+from typing import Iterable, Iterator, Optional
+from chain_index import ChainIndex, scan_ledger
+from chain_segments import store_path
+from chain_writer import ledger_lock
+from chain_verify_engine import sig_valid
+
+ROOT = pathlib.Path(__file__).resolve().parent
+LEDGER = ROOT / "chain" / "CHAIN.jsonl"
+_INDEX = re.compile(rb'"index": (\d+)')  # first key after block_hash in a sort_keys record; strings escape quotes
+
+def sigs_path(ledger: os.PathLike | str) -> pathlib.Path:
+    return pathlib.Path(ledger).with_name("SIGS.jsonl")
+
+def cosig_record(block: dict, signer: str, pubkey_b64: str, sig_b64: str) -> dict:
+    return {"index": block["index"], "block_hash": block["block_hash"],
+            "signer": signer, "pubkey_b64": pubkey_b64, "sig_b64": sig_b64}
+
+def append_cosigs(ledger: os.PathLike | str, records: Iterable[dict]) -> int:
+    """Durably append records with a single write + fsync; returns how many were written."""
+    data = "".join(json.dumps(r, sort_keys=True, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+    if not data: return 0
+    path = sigs_path(ledger)
+    with ledger_lock(ledger):  # compaction must not drop an append landing mid-rewrite
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data); os.fsync(fd)
+        finally:
+            os.close(fd)
+    return data.count(b"\n")
+
+def iter_cosigs(ledger: os.PathLike | str, start: int = 0) -> Iterator[tuple[int, dict]]:
+    """Yield (end offset, record) from the log, beginning at byte offset start."""
+    path = sigs_path(ledger)
+    if not path.exists(): return
+    with open(path, "rb") as f:
+        f.seek(start); off = start
+        for line in f:
+            off += len(line)
+            if not line.endswith(b"\n"): break  # torn tail from a crashed writer
+            if line.strip(): yield off, json.loads(line)
+
+def load_cosigs(ledger: os.PathLike | str, since: int = 0) -> dict[int, list[dict]]:
+    """Cosignature records grouped by block index, in log order.
+
+    since keeps only records for blocks >= since; older ones are skipped on
+    their raw "index" without being parsed.
+    """
+    path = sigs_path(ledger); out: dict[int, list[dict]] = {}
+    if not path.exists(): return out
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"): break  # torn tail from a crashed writer
+            if since:
+                m = _INDEX.search(line)
+                if m and int(m.group(1)) < since: continue
+            if line.strip():
+                r = json.loads(line)
+                if r["index"] >= since: out.setdefault(r["index"], []).append(r)
+    return out
+
+def cosig_valid(r: dict) -> bool:
+    """Does the record's signature verify over its block_hash with its pubkey?"""
+    try:
+        return sig_valid(r["block_hash"], r["pubkey_b64"], r["sig_b64"])
+    except (KeyError, TypeError, ValueError):  # malformed hex/base64/key length
+        return False
+
+def merge_signatures(block: dict, records: Optional[list[dict]]) -> tuple[list[dict], list[dict]]:
+    """(signatures with matching records applied, stray records).
+
+    A stray names a different block_hash or carries a signature that does not
+    verify; it is never applied.
+    """
+    sigs = list(block.get("signatures", [])); stray = []
+    for r in records or ():
+        if r["block_hash"] != block["block_hash"] or not cosig_valid(r):
+            stray.append(r); continue
+        sigs = [s for s in sigs if s.get("signer") != r["signer"]]
+        sigs.append({"signer": r["signer"], "pubkey_b64": r["pubkey_b64"], "sig_b64": r["sig_b64"]})
+    return sigs, stray
+
+def report_strays(block: dict, stray: list[dict]) -> bool:
+    """Print the verifiers' line for each stray; False if any is a bad signature on this block."""
+    ok = True
+    for r in stray:
+        if r["block_hash"] != block["block_hash"]:
+            print(f"[i] WARN: cosignature from '{r['signer']}' names another block_hash at block {block['index']} (ignored)")
+        else:
+            print(f"[!] bad cosignature from '{r['signer']}' at block {block['index']} (not merged)"); ok = False
+    return ok
+
+def compact(ledger: os.PathLike | str = LEDGER) -> int:
+    """Fold the log into the ledger atomically; returns how many records were folded."""
+    if store_path(ledger) is not None:
+        raise ValueError("a segmented ledger keeps its cosignatures in SIGS.jsonl; export it to JSON lines to compact")
+    with ledger_lock(ledger):
+        return _compact(pathlib.Path(ledger))
+
+def _compact(ledger: pathlib.Path) -> int:
+    path = sigs_path(ledger)
+    if not path.exists(): return 0
+    cosigs = {}; folded = 0; log_end = 0
+    for end, r in iter_cosigs(ledger):
+        cosigs.setdefault(r["index"], []).append(r); log_end = end
+    strays = []
+    tmp = ledger.with_name(ledger.name + f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as out:
+        for _, _, b in scan_ledger(ledger):
+            recs = cosigs.pop(b["index"], None)
+            if recs:
+                b["signatures"], stray = merge_signatures(b, recs)
+                folded += len(recs) - len(stray); strays += stray
+            out.write((json.dumps(b, sort_keys=True, ensure_ascii=False) + "\n").encode("utf-8"))
+        out.flush(); os.fsync(out.fileno())
+    os.replace(tmp, ledger)
+    strays += [r for recs in cosigs.values() for r in recs]  # records for blocks not in the ledger
+    # keep strays (other block_hash, bad signature, missing block) for the verifiers to flag,
+    # and anything appended past what we folded
+    with open(path, "rb") as f:
+        f.seek(log_end); rest = f.read()
+    keep = "".join(json.dumps(r, sort_keys=True, ensure_ascii=False) + "\n" for r in strays).encode("utf-8") + rest
+    tmp_log = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with open(tmp_log, "wb") as f:
+        f.write(keep); f.flush(); os.fsync(f.fileno())
+    os.replace(tmp_log, path)
+    ChainIndex(ledger).rebuild()
+    return folded
+
+def main():
+    ap = argparse.ArgumentParser(description="Maintain the append-only cosignature log")
+    ap.add_argument("--ledger", default=str(LEDGER))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("compact", help="Fold SIGS.jsonl into CHAIN.jsonl (atomic rewrite)")
+    args = ap.parse_args()
+    try:
+        n = compact(args.ledger)
+    except ValueError as e:
+        print(f"[!] {e}"); raise SystemExit(1)
+    print(f"[✓] Folded {n} cosignature(s) into {args.ledger}")
+
+if __name__ == "__main__":
+    main()
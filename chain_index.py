@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# MIT License
+"""Sidecar index for chain/CHAIN.jsonl: constant-time tail and by-index lookups.
+
+chain/CHAIN.idx is an 8-byte magic followed by one fixed 48-byte record per
+block: byte offset of its line, block index, raw 32-byte block_hash. Record N
+describes the Nth non-blank line, so tail and get(index) are single seeks.
+
+The index is checked on open by re-reading the line its last record points at
+(index, hash, and that it ends the file); a stale or damaged index is rebuilt
+with one full scan. A segmented ledger (chain_segments) needs no sidecar:
+open() hands back its SegmentStore, which reads the same way with block
+positions as offsets.
+
+    python chain_index.py rebuild | check [--deep] | tail | get N
+"""
+from __future__ import annotations
+import os, sys, json, struct, pathlib, argparse
+from typing import Iterator, Optional
+from chain_segments import SegmentStore, open_store, store_path
+
+ROOT = pathlib.Path(__file__).resolve().parent
+LEDGER = ROOT / "chain" / "CHAIN.jsonl"
+
+MAGIC = b"FCIDX\x00\x01\x00"
+REC = struct.Struct("<QQ32s")
+
+def index_path(ledger: pathlib.Path) -> pathlib.Path:
+    return ledger.with_suffix(".idx")
+
+def ledger_exists(ledger: os.PathLike | str) -> bool:
+    return pathlib.Path(ledger).exists() or store_path(ledger) is not None
+
+def read_block_at(ledger: os.PathLike | str, offset: int) -> tuple[dict, int]:
+    """Block at offset and the offset after it, without opening (or rebuilding) the index."""
+    store = open_store(ledger)
+    if store is None: return ChainIndex(ledger).read_at(offset)
+    with store: return store.read_at(offset)
+
+def scan_ledger(ledger: pathlib.Path) -> Iterator[tuple[int, int, dict]]:
+    """Yield (offset, end, block) for every non-blank ledger line (every block of a segment store)."""
+    store = open_store(ledger)
+    if store is not None:
+        with store: yield from store.scan()
+        return
+    if not ledger.exists(): return
+    with open(ledger, "rb") as f:
+        off = 0
+        for line in f:
+            end = off + len(line)
+            if line.strip(): yield off, end, json.loads(line)
+            off = end
+
+class ChainIndex:
+    def __init__(self, ledger: os.PathLike | str = LEDGER, path: Optional[os.PathLike | str] = None):
+        self.ledger = pathlib.Path(ledger)
+        self.path = pathlib.Path(path) if path else index_path(self.ledger)
+
+    def __len__(self) -> int:
+        if not self.path.exists(): return 0
+        return max(0, (self.path.stat().st_size - len(MAGIC)) // REC.size)
+
+    def entry(self, pos: int) -> tuple[int, int, str]:
+        """(offset, index, block_hash) of the pos-th block (negative counts from the end)."""
+        n = len(self)
+        if pos < 0: pos += n
+        if not 0 <= pos < n: raise IndexError(pos)
+        with open(self.path, "rb") as f:
+            f.seek(len(MAGIC) + pos * REC.size)
+            off, idx, h = REC.unpack(f.read(REC.size))
+        return off, idx, h.hex()
+
+    def read_at(self, offset: int) -> tuple[dict, int]:
+        """Block stored on the ledger line starting at offset, and the offset just past it."""
+        with open(self.ledger, "rb") as f:
+            f.seek(offset); line = f.readline()
+        return json.loads(line), offset + len(line)
+
+    def valid(self) -> bool:
+        if not self.path.exists(): return False
+        size = self.path.stat().st_size
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC: return False
+        if (size - len(MAGIC)) % REC.size: return False
+        ledger_size = self.ledger.stat().st_size if self.ledger.exists() else 0
+        if len(self) == 0:
+            return ledger_size == 0 or not self.ledger.read_bytes().strip()
+        off, idx, h = self.entry(-1)
+        try:
+            block, end = self.read_at(off)
+        except (ValueError, OSError):
+            return False
+        if block.get("index") != idx or block.get("block_hash") != h: return False
+        if end == ledger_size: return True
+        with open(self.ledger, "rb") as f:
+            f.seek(end); return not f.read().strip()  # only trailing blank lines after the tail
+
+    def check_deep(self) -> bool:
+        """Compare every record against a full scan."""
+        if not self.valid(): return False
+        recs = [(off, b["index"], b["block_hash"]) for off, _, b in scan_ledger(self.ledger)]
+        return len(recs) == len(self) and all(self.entry(i) == r for i, r in enumerate(recs))
+
+    def rebuild(self) -> int:
+        n = 0
+        tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as out:
+            out.write(MAGIC)
+            for off, _, b in scan_ledger(self.ledger):
+                out.write(REC.pack(off, b["index"], bytes.fromhex(b["block_hash"]))); n += 1
+            out.flush(); os.fsync(out.fileno())
+        os.replace(tmp, self.path)
+        return n
+
+    def open(self) -> "ChainIndex | SegmentStore":
+        """Validate, falling back to a full-scan rebuild when stale (a segment store is returned as is)."""
+        store = open_store(self.ledger)
+        if store is not None: return store
+        if not self.valid(): self.rebuild()
+        return self
+
+    def append(self, offset: int, index: int, block_hash: str) -> None:
+        """Record a block just appended to the ledger at offset."""
+        if not self.path.exists():
+            self.path.write_bytes(MAGIC)
+        with open(self.path, "ab") as f:
+            f.write(REC.pack(offset, index, bytes.fromhex(block_hash)))
+
+    def tail(self) -> tuple[Optional[dict], int]:
+        """(last block, its position) or (None, -1); same contract as chain_new_block.load_prev."""
+        n = len(self)
+        if n == 0: return None, -1
+        return self.read_at(self.entry(-1)[0])[0], n - 1
+
+    def find(self, index: int) -> Optional[int]:
+        """Position of the block with this index: direct slot, else binary search (indices ascend)."""
+        n = len(self)
+        if 0 <= index < n and self.entry(index)[1] == index: return index
+        lo, hi = 0, n - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2; got = self.entry(mid)[1]
+            if got == index: return mid
+            if got < index: lo = mid + 1
+            else: hi = mid - 1
+        return None
+
+    def iter_hashes(self, start: int, stop: int, step: int = 1 << 16) -> Iterator[str]:
+        """block_hash of positions start..stop-1, read straight from the records (no ledger lines parsed)."""
+        with open(self.path, "rb") as f:
+            f.seek(len(MAGIC) + start * REC.size)
+            while start < stop:
+                n = min(step, stop - start); buf = f.read(n * REC.size)
+                if len(buf) != n * REC.size: raise IndexError(start)
+                for i in range(n): yield REC.unpack_from(buf, i * REC.size)[2].hex()
+                start += n
+
+    def get(self, index: int) -> Optional[dict]:
+        pos = self.find(index)
+        return None if pos is None else self.read_at(self.entry(pos)[0])[0]
+
+def open_index(ledger: os.PathLike | str = LEDGER) -> ChainIndex:
+    return ChainIndex(ledger).open()
+
+def main():
+    ap = argparse.ArgumentParser(description="Maintain the CHAIN.jsonl sidecar index")
+    ap.add_argument("--ledger", default=str(LEDGER))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("rebuild", help="Rebuild the index with a full scan")
+    c = sub.add_parser("check", help="Exit non-zero if the index is stale")
+    c.add_argument("--deep", action="store_true", help="Compare every record with the ledger")
+    sub.add_parser("tail", help="Print the last block")
+    g = sub.add_parser("get", help="Print the block with this index")
+    g.add_argument("index", type=int)
+    args = ap.parse_args()
+
+    ix = ChainIndex(args.ledger)
+    if args.cmd == "rebuild":
+        print(f"[+] Indexed {ix.rebuild()} blocks -> {ix.path}")
+    elif args.cmd == "check":
+        ok = ix.check_deep() if args.deep else ix.valid()
+        print(f"[✓] Index OK ({len(ix)} blocks)" if ok else "[x] Index stale — run: python chain_index.py rebuild")
+        sys.exit(0 if ok else 1)
+    elif args.cmd == "tail":
+        print(json.dumps(ix.open().tail()[0], indent=2, ensure_ascii=False))
+    else:
+        b = ix.open().get(args.index)
+        if b is None: print(f"[!] Block {args.index} not found", file=sys.stderr); sys.exit(1)
+        print(json.dumps(b, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# MIT License
+"""Merkle trees over block file digests, with O(log n) inclusion proofs.
+
+Same construction the ledger has always used: leaves are the raw sha256 of
+each file in block order, parents are sha256(left + right), and an odd last
+node is paired with itself. Levels are kept as contiguous byte strings (32
+bytes per node) so blocks with hundreds of thousands of files stay compact.
+
+A files[] entry carries "sha256" and, for large files recorded with
+--chunked, also "sha256_tree": {"chunk_size", "root", "chunks"} where chunks
+are the sha256 of each chunk_size range and root is merkle_root(chunks). The
+block-level leaf is the sha256; an entry with only a tree (no whole-file
+sha256) uses the tree root. The tree itself is covered by block_hash.
+
+    python chain_merkle.py prove --index 0 --file STORY.md > proof.json
+    python chain_merkle.py verify proof.json [--file STORY.md] [--ledger chain/CHAIN.jsonl]
+"""
+from __future__ import annotations
+import sys, json, hashlib, pathlib, argparse
+from typing import Optional
+
+ROOT = pathlib.Path(__file__).resolve().parent
+LEDGER = ROOT / "chain" / "CHAIN.jsonl"
+PROOF_SCHEMA = "fabric-merkle-proof/1"
+EMPTY_ROOT = hashlib.sha256(b"").hexdigest()
+TREE_SCHEME = "sha256_tree"
+
+def _parent_level(level: bytes) -> bytes:
+    sha = hashlib.sha256; n = len(level) // 32; out = bytearray()
+    for i in range(0, n - 1, 2):
+        out += sha(level[i*32:(i+2)*32]).digest()
+    if n % 2:
+        last = level[(n-1)*32:]; out += sha(last + last).digest()
+    return bytes(out)
+
+def merkle_root(hashes: list[str]) -> str:
+    if not hashes: return EMPTY_ROOT
+    level = b"".join(bytes.fromhex(h) for h in hashes)
+    while len(level) > 32:
+        level = _parent_level(level)
+    return level.hex()
+
+def file_leaf(fi: dict) -> str:
+    """Block Merkle leaf of a files[] entry under either digest scheme."""
+    return fi["sha256"] if "sha256" in fi else fi[TREE_SCHEME]["root"]
+
+def tree_consistent(fi: dict) -> bool:
+    """A chunk tree entry's root and chunk count agree with its chunks and bytes (plain entries: True)."""
+    t = fi.get(TREE_SCHEME)
+    if t is None: return True
+    n = max(1, -(-fi["bytes"] // t["chunk_size"]))
+    return len(t["chunks"]) == n and merkle_root(t["chunks"]) == t["root"]
+
+class MerkleTree:
+    def __init__(self, hashes: list[str]):
+        self.levels: list[bytes] = []
+        if hashes:
+            level = b"".join(bytes.fromhex(h) for h in hashes)
+            self.levels.append(level)
+            while len(level) > 32:
+                level = _parent_level(level); self.levels.append(level)
+
+    def __len__(self) -> int:
+        return len(self.levels[0]) // 32 if self.levels else 0
+
+    @property
+    def root(self) -> str:
+        return self.levels[-1].hex() if self.levels else EMPTY_ROOT
+
+    def proof(self, index: int) -> list[str]:
+        """Sibling hashes from leaf to root; a duplicated odd node is its own sibling."""
+        if not 0 <= index < len(self): raise IndexError(index)
+        path = []
+        for level in self.levels[:-1]:
+            n = len(level) // 32
+            sib = index ^ 1
+            if sib >= n: sib = index
+            path.append(level[sib*32:(sib+1)*32].hex())
+            index //= 2
+        return path
+
+class MerkleAccumulator:
+    """Streaming merkle_root: add leaves in order, O(log n) memory.
+
+    _pending[k] holds a finished height-k node still waiting for its right
+    sibling; adding a leaf carries upward like a binary counter.
+    """
+    def __init__(self):
+        self._pending: list[Optional[bytes]] = []
+        self.count = 0
+
+    def add(self, leaf: str) -> None:
+        node = bytes.fromhex(leaf); k = 0; pend = self._pending
+        while k < len(pend) and pend[k] is not None:
+            node = hashlib.sha256(pend[k] + node).digest(); pend[k] = None; k += 1
+        if k == len(pend): pend.append(node)
+        else: pend[k] = node
+        self.count += 1
+
+    def root(self) -> str:
+        if not self.count: return EMPTY_ROOT
+        pend = self._pending; top = len(pend) - 1; node = None
+        for k, p in enumerate(pend):
+            if node is None:
+                if p is None: continue
+                if k == top: return p.hex()
+                node = hashlib.sha256(p + p).digest()  # lone odd node at this level
+            elif p is not None:
+                node = hashlib.sha256(p + node).digest()
+            else:
+                node = hashlib.sha256(node + node).digest()
+        return node.hex()
+
+def root_from_proof(leaf: str, index: int, path: list[str]) -> str:
+    node = bytes.fromhex(leaf)
+    for sib_hex in path:
+        sib = bytes.fromhex(sib_hex)
+        node = hashlib.sha256(node + sib if index % 2 == 0 else sib + node).digest()
+        index //= 2
+    return node.hex()
+
+def verify_proof(leaf: str, index: int, path: list[str], root: str, leaf_count: Optional[int] = None) -> bool:
+    if leaf_count is not None:
+        depth = 0; n = leaf_count
+        while n > 1: n = (n + 1) // 2; depth += 1
+        if len(path) != depth or not 0 <= index < leaf_count: return False
+    return root_from_proof(leaf, index, path) == root
+
+def file_proof(block: dict, path: str) -> dict:
+    """Inclusion proof for the file entry matching path (exact, else unique basename)."""
+    files = block["files"]
+    pos = next((i for i, fi in enumerate(files) if fi["path"] == path), None)
+    if pos is None:
+        hits = [i for i, fi in enumerate(files) if pathlib.PurePath(fi["path"]).name == pathlib.PurePath(path).name]
+        if len(hits) != 1:
+            raise KeyError(f"{path} {'is ambiguous' if hits else 'not found'} in block {block['index']}")
+        pos = hits[0]
+    tree = MerkleTree([file_leaf(fi) for fi in files])
+    fi = files[pos]
+    proof = {"schema": PROOF_SCHEMA, "block_index": block["index"], "block_hash": block["block_hash"],
+             "merkle_root": block["merkle_root"], "path": fi["path"], "bytes": fi["bytes"],
+             "leaf": file_leaf(fi), "leaf_index": pos, "leaf_count": len(files), "siblings": tree.proof(pos)}
+    if "sha256" not in fi: proof["chunk_size"] = fi[TREE_SCHEME]["chunk_size"]  # the leaf is the tree root
+    return proof
+
+def main():
+    ap = argparse.ArgumentParser(description="Export and check Merkle inclusion proofs for ledger files")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("prove", help="Print a proof that --file is part of block --index")
+    p.add_argument("--index", type=int, required=True)
+    p.add_argument("--file", required=True, help="Path as recorded in the block (or its unique basename)")
+    p.add_argument("--ledger", default=str(LEDGER))
+    v = sub.add_parser("verify", help="Check a proof offline")
+    v.add_argument("proof")
+    v.add_argument("--file", help="Also check that this local file hashes to the proven leaf")
+    v.add_argument("--ledger", help="Also check merkle_root/block_hash against this ledger")
+    args = ap.parse_args()
+
+    if args.cmd == "prove":
+        from chain_index import ChainIndex
+        block = ChainIndex(args.ledger).open().get(args.index)
+        if block is None: print(f"[!] Block {args.index} not found", file=sys.stderr); sys.exit(1)
+        try:
+            proof = file_proof(block, args.file)
+        except KeyError as e:
+            print(f"[!] {e.args[0]}", file=sys.stderr); sys.exit(1)
+        if not verify_proof(proof["leaf"], proof["leaf_index"], proof["siblings"], proof["merkle_root"]):
+            print(f"[!] block {args.index} merkle_root does not match its files", file=sys.stderr); sys.exit(1)
+        print(json.dumps(proof, indent=2, ensure_ascii=False))
+        return
+
+    proof = json.loads(pathlib.Path(args.proof).read_text(encoding="utf-8"))
+    ok = proof.get("schema") == PROOF_SCHEMA and verify_proof(
+        proof["leaf"], proof["leaf_index"], proof["siblings"], proof["merkle_root"], proof["leaf_count"])
+    if not ok: print("[!] proof does not reach merkle_root")
+    if ok and args.file:
+        from file_hashing import hash_file, chunk_digests
+        if "chunk_size" in proof:
+            size, chunks = chunk_digests(args.file, proof["chunk_size"]); digest = merkle_root(chunks)
+        else:
+            size, digest = hash_file(args.file)
+        if digest != proof["leaf"] or size != proof["bytes"]:
+            print(f"[!] {args.file} does not match the proven leaf"); ok = False
+    if ok and args.ledger:
+        from chain_index import ChainIndex
+        block = ChainIndex(args.ledger).open().get(proof["block_index"])
+        if not block or block["block_hash"] != proof["block_hash"] or block["merkle_root"] != proof["merkle_root"]:
+            print(f"[!] block {proof['block_index']} in {args.ledger} does not match the proof"); ok = False
+    if ok:
+        print(f"[✓] {proof['path']} is leaf {proof['leaf_index']}/{proof['leaf_count']} of block "
+              f"{proof['block_index']} (merkle_root {proof['merkle_root']})")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 # MIT License
-import os, sys, json, base64, hashlib, pathlib, argparse
+import os, sys, json, glob, time, base64, hashlib, pathlib, argparse
 from datetime import datetime, timezone
 from nacl.signing import SigningKey
 from nacl.encoding import RawEncoder
+from file_hashing import TREE_CHUNK, default_cache, hash_file, iter_digest_entries
+from chain_index import ChainIndex, ledger_exists
+from chain_writer import ChainWriter
+from chain_merkle import MerkleAccumulator, file_leaf
+import chain_query
+from bundle_stream import read_manifest
+import telemetry
 
 ROOT = pathlib.Path(__file__).resolve().parent
 LEDGER = ROOT / "chain" / "CHAIN.jsonl"
@@ -14,40 +21,73 @@ def sha256hex(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
 
 def file_sha256(path: pathlib.Path) -> tuple[int, str]:
-    h = hashlib.sha256(); n = 0
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(1<<20), b""):
-            n += len(chunk); h.update(chunk)
-    return n, h.hexdigest()
+    return hash_file(path, default_cache())
 
 def canonical(obj) -> bytes:
     return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode("utf-8")
 
-def merkle_root(hashes: list[str]) -> str:
-    if not hashes: return sha256hex(b'')
-    level = [bytes.fromhex(h) for h in hashes]
-    while len(level) > 1:
-        nxt = []
-        for i in range(0, len(level), 2):
-            left = level[i]; right = level[i+1] if i+1 < len(level) else level[i]
-            nxt.append(hashlib.sha256(left + right).digest())
-        level = nxt
-    return level[0].hex()
-
-def load_prev():
-    if not LEDGER.exists(): return None, -1
-    last = None; idx = -1
-    with open(LEDGER, "r", encoding="utf-8") as f:
-        for i, line in enumerate(f):
-            if line.strip(): last = json.loads(line); idx = i
-    return last, idx
+SKIP_DIRS = {".git", "__pycache__"}
+PROGRESS_EVERY = 1.0  # seconds
+
+def walk_dir(top: str):
+    """Yield files under top depth-first in sorted order, without listing the whole tree up front."""
+    try:
+        entries = sorted(os.scandir(top), key=lambda e: e.name)
+    except OSError as e:
+        print(f"[!] Cannot read {top}: {e.strerror}", file=sys.stderr); return
+    for e in entries:
+        if e.is_dir(follow_symlinks=False):
+            if e.name not in SKIP_DIRS: yield from walk_dir(e.path)
+        elif e.is_file():
+            yield e.path
+
+def iter_inputs(files: list[str], dirs: list[str], globs: list[str]):
+    for f in files: yield f
+    for d in dirs: yield from walk_dir(d)
+    for g in globs:
+        yield from (p for p in sorted(glob.iglob(g, recursive=True)) if os.path.isfile(p))
+
+class Progress:
+    def __init__(self, enabled: bool):
+        self.enabled = enabled; self.files = 0; self.bytes = 0
+        self.t0 = self.last = time.monotonic()
+
+    def update(self, size: int) -> None:
+        self.files += 1; self.bytes += size
+        now = time.monotonic()
+        if self.enabled and now - self.last >= PROGRESS_EVERY:
+            self.last = now
+            print(f"\r[i] {self.files} files, {self.bytes / 2**20:.1f} MiB, "
+                  f"{self.bytes / 2**20 / (now - self.t0):.1f} MiB/s", end="", file=sys.stderr, flush=True)
+
+    def done(self) -> None:
+        dt = max(time.monotonic() - self.t0, 1e-9)
+        if self.enabled and dt >= PROGRESS_EVERY: print(file=sys.stderr)
+        print(f"[+] Hashed {self.files} files ({self.bytes / 2**20:.1f} MiB) in {dt:.1f}s — "
+              f"{self.bytes / 2**20 / dt:.1f} MiB/s, {self.files / dt:.0f} files/s")
+
+@telemetry.traced("load_prev")
+def load_prev(index: ChainIndex | None = None):
+    # constant-time via the sidecar index; open() falls back to a full scan if it is stale
+    if not ledger_exists(LEDGER): return None, -1
+    return (index or ChainIndex(LEDGER)).open().tail()
 
 def main():
     ap = argparse.ArgumentParser(description="Create a new signed Fabric block")
     ap.add_argument("--signer", required=True)
     ap.add_argument("--note", default="")
-    ap.add_argument("--file", action="append", required=True)
+    ap.add_argument("--file", action="append", default=[])
+    ap.add_argument("--dir", action="append", default=[], help="Add every file under this directory (recursive, sorted)")
+    ap.add_argument("--glob", action="append", default=[], help="Add files matching this pattern (** recurses)")
+    ap.add_argument("--chunked", action="store_true",
+                    help="Also record a sha256_tree for files larger than one chunk (chunks hashed on all cores)")
+    ap.add_argument("--chunk-mb", type=int, default=TREE_CHUNK >> 20, help="Chunk size for --chunked (MiB)")
+    ap.add_argument("--bundle-manifest", action="append", default=[],
+                    help="Log an uploaded tar bundle and each of its members (from uploader_cli.py --bundle)")
+    ap.add_argument("--quiet", action="store_true", help="No live progress line")
     args = ap.parse_args()
+    if not (args.file or args.dir or args.glob or args.bundle_manifest):
+        ap.error("give at least one --file, --dir, --glob or --bundle-manifest")
 
     sk_path = KEYS / f"{args.signer}.ed25519.sk"
     if not sk_path.exists():
@@ -59,32 +99,51 @@ def main():
     if not vk_b64:
         print(f"[!] No pubkey entry for signer '{args.signer}' in pubkeys.json", file=sys.stderr); sys.exit(1)
 
-    prev, idx = load_prev(); index = idx + 1; prev_hash = prev["block_hash"] if prev else None
-
-    files = []; leaves = []
     for p in args.file:
-        pp = pathlib.Path(p)
-        if not pp.exists(): print(f"[!] Missing file: {pp}", file=sys.stderr); sys.exit(1)
-        size, digest = file_sha256(pp); files.append({"path": str(pp), "bytes": size, "sha256": digest}); leaves.append(digest)
+        if not pathlib.Path(p).exists(): print(f"[!] Missing file: {p}", file=sys.stderr); sys.exit(1)
+    for d in args.dir:
+        if not pathlib.Path(d).is_dir(): print(f"[!] Not a directory: {d}", file=sys.stderr); sys.exit(1)
+    bundles = []
+    for m in args.bundle_manifest:
+        try: bundles.append(read_manifest(m))
+        except (OSError, ValueError) as e: print(f"[!] Bad bundle manifest: {e}", file=sys.stderr); sys.exit(1)
+    # walk, hash and fold into the Merkle root as one stream, in deterministic order
+    files = []; acc = MerkleAccumulator(); progress = Progress(not args.quiet and sys.stderr.isatty())
+    chunk_size = args.chunk_mb << 20 if args.chunked else None
+    with telemetry.span("hash_inputs") as sp:
+        for p, fields in iter_digest_entries(iter_inputs(args.file, args.dir, args.glob), cache=default_cache(),
+                                             chunk_size=chunk_size):
+            fi = {"path": str(pathlib.Path(p)), **fields}
+            files.append(fi); acc.add(file_leaf(fi)); progress.update(fi["bytes"])
+        sp.add(files=len(files), bytes=progress.bytes)
+    if files: progress.done()
+    for m in bundles:
+        # the tar itself only exists remotely; its members are on disk and verifiable like any file
+        fi = {"path": m["name"], "bytes": m["bytes"], "sha256": m["sha256"],
+              "bundle": {"schema": m["schema"], "md5": m["md5"], "members": len(m["members"])}}
+        files.append(fi); acc.add(file_leaf(fi))
+        for mem in m["members"]:
+            fi = {"path": mem["source"], "bytes": mem["bytes"], "sha256": mem["sha256"], "in_bundle": m["name"]}
+            files.append(fi); acc.add(file_leaf(fi))
+        print(f"[+] Bundle {m['name']}: {len(m['members'])} member(s), sha256 {m['sha256'][:16]}…")
+    if not files: print("[!] No files matched", file=sys.stderr); sys.exit(1)
 
-    block = {
+    # index and prev_hash are assigned by the writer under the ledger lock, so concurrent runs cannot fork;
+    # a separate process does not share this writer's group commit (see chain_writer)
+    draft = {
         "schema": "fabric-chain/1.0",
-        "index": index,
         "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "prev_hash": prev_hash,
         "files": files,
-        "merkle_root": merkle_root(leaves),
+        "merkle_root": acc.root(),
         "notes": args.note,
     }
-    block_hash = sha256hex(canonical(block)); block["block_hash"] = block_hash
-    sig = sk.sign(bytes.fromhex(block_hash), encoder=RawEncoder).signature
-    sig_b64 = base64.b64encode(sig).decode("utf-8")
-    block["signatures"] = [{"signer": args.signer, "pubkey_b64": vk_b64, "sig_b64": sig_b64}]
-    LEDGER.parent.mkdir(parents=True, exist_ok=True)
-    with open(LEDGER, "a", encoding="utf-8") as f:
-        f.write(json.dumps(block, sort_keys=True, ensure_ascii=False) + "\n")
-    print(f"[+] Block {index} appended"); print(f"    hash: {block_hash}"); 
-    if prev_hash: print(f"    prev: {prev_hash}")
+    def sign(block_hash: str) -> list[dict]:
+        sig = sk.sign(bytes.fromhex(block_hash), encoder=RawEncoder).signature
+        return [{"signer": args.signer, "pubkey_b64": vk_b64, "sig_b64": base64.b64encode(sig).decode("utf-8")}]
+    block = ChainWriter(LEDGER).append(draft, sign)
+    chain_query.sync(LEDGER)
+    print(f"[+] Block {block['index']} appended"); print(f"    hash: {block['block_hash']}")
+    if block["prev_hash"]: print(f"    prev: {block['prev_hash']}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# MIT License
+"""SQLite query index over chain/CHAIN.jsonl (+ chain/SIGS.jsonl).
+
+chain/CHAIN.sqlite is derived data: tables blocks, files and signatures
+(block signatures with cosignatures merged in, latest per signer; files.sha256
+holds the block Merkle leaf: the whole-file sha256, or the tree root for a
+sha256_tree entry recorded without one), plus a
+meta table recording how far each file has been read and a digest of the
+last line consumed. sync() only reads what was appended since; if either
+file was rewritten underneath it (compaction, history edit) the index is
+rebuilt from scratch. chain_new_block and cosign_block sync after writing,
+and every query syncs first, so answers always match the ledger. Over a
+segmented ledger (chain_segments) offsets are block positions and the
+recorded digest is the last block_hash.
+
+    python chain_query.py digest SHA256 [--all]
+    python chain_query.py path STORY_Parchment.pdf
+    python chain_query.py unsigned Guardian
+    python chain_query.py range --since 2025-01-01 --until 2025-02-01
+    python chain_query.py block N | sync | rebuild
+"""
+from __future__ import annotations
+import os, sys, json, sqlite3, hashlib, pathlib, argparse
+from typing import Iterable, Iterator, Optional
+from chain_cosigs import sigs_path, cosig_valid
+from chain_merkle import file_leaf
+from chain_segments import open_store
+
+ROOT = pathlib.Path(__file__).resolve().parent
+LEDGER = ROOT / "chain" / "CHAIN.jsonl"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value);
+CREATE TABLE IF NOT EXISTS blocks(
+    idx INTEGER PRIMARY KEY, block_hash TEXT NOT NULL, prev_hash TEXT, timestamp TEXT,
+    merkle_root TEXT, notes TEXT, n_files INTEGER, bytes INTEGER, offset INTEGER);
+CREATE INDEX IF NOT EXISTS blocks_hash ON blocks(block_hash);
+CREATE INDEX IF NOT EXISTS blocks_time ON blocks(timestamp);
+CREATE TABLE IF NOT EXISTS files(
+    block INTEGER NOT NULL, pos INTEGER NOT NULL, path TEXT NOT NULL, name TEXT NOT NULL,
+    bytes INTEGER, sha256 TEXT NOT NULL, PRIMARY KEY(block, pos)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS files_sha ON files(sha256, block);
+CREATE INDEX IF NOT EXISTS files_path ON files(path, block);
+CREATE INDEX IF NOT EXISTS files_name ON files(name, block);
+CREATE TABLE IF NOT EXISTS signatures(
+    block INTEGER NOT NULL, signer TEXT NOT NULL, pubkey_b64 TEXT, sig_b64 TEXT,
+    cosig INTEGER NOT NULL DEFAULT 0, PRIMARY KEY(block, signer)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signatures_signer ON signatures(signer, block);
+"""
+
+def db_path(ledger: pathlib.Path) -> pathlib.Path:
+    return ledger.with_suffix(".sqlite")
+
+def _tail_ok(path: pathlib.Path, end: int, tail: int, tail_sha: Optional[str]) -> bool:
+    """Does the line [tail, end) we consumed last time still sit there unchanged?"""
+    if end == 0: return True
+    if not path.exists() or path.stat().st_size < end: return False
+    with open(path, "rb") as f:
+        f.seek(tail); return hashlib.sha256(f.read(end - tail)).hexdigest() == tail_sha
+
+def _new_lines(path: pathlib.Path, start: int):
+    """Yield (offset, line) for complete lines from start; a torn last line is left for later."""
+    if not path.exists(): return
+    with open(path, "rb") as f:
+        f.seek(start); off = start
+        for line in f:
+            if not line.endswith(b"\n"): break
+            yield off, line; off += len(line)
+
+def _ledger_tail_ok(ledger: pathlib.Path, end: int, tail: int, tail_sha: Optional[str]) -> bool:
+    store = open_store(ledger)
+    if store is None: return _tail_ok(ledger, end, tail, tail_sha)
+    if end == 0: return True
+    with store: return len(store) >= end and store.entry(tail)[2] == tail_sha
+
+def _new_blocks(ledger: pathlib.Path, start: int):
+    """Yield (offset, end, digest, block or None for a blank line) past start, from JSON lines or a segment store."""
+    store = open_store(ledger)
+    if store is None:
+        for off, line in _new_lines(ledger, start):
+            yield off, off + len(line), hashlib.sha256(line).hexdigest(), json.loads(line) if line.strip() else None
+        return
+    with store:
+        for pos, end, b in store.scan(start): yield pos, end, b["block_hash"], b
+
+class ChainQuery:
+    def __init__(self, ledger: os.PathLike | str = LEDGER, path: Optional[os.PathLike | str] = None):
+        self.ledger = pathlib.Path(ledger)
+        self.path = pathlib.Path(path) if path else db_path(self.ledger)
+        self.db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # derived data; rebuild is always possible
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def _meta(self) -> dict:
+        return {r["key"]: r["value"] for r in self.db.execute("SELECT key, value FROM meta")}
+
+    def _set_meta(self, **kv) -> None:
+        self.db.executemany("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", kv.items())
+
+    def _clear(self) -> None:
+        for t in ("meta", "blocks", "files", "signatures"): self.db.execute(f"DELETE FROM {t}")
+
+    def _put_sig(self, block: int, s: dict, cosig: int) -> None:
+        self.db.execute("INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?, ?)",
+                        (block, s.get("signer"), s["pubkey_b64"], s["sig_b64"], cosig))
+
+    def sync(self) -> int:
+        """Bring the index up to date; returns how many ledger + log lines were read."""
+        logp = sigs_path(self.ledger); n = 0
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            m = self._meta()
+            if (m.get("version") != SCHEMA_VERSION
+                    or not _ledger_tail_ok(self.ledger, m.get("ledger_end", 0), m.get("ledger_tail", 0), m.get("ledger_tail_sha"))
+                    or not _tail_ok(logp, m.get("sigs_end", 0), m.get("sigs_tail", 0), m.get("sigs_tail_sha"))):
+                self._clear(); m = {}
+            end = m.get("ledger_end", 0); tail = m.get("ledger_tail", 0); tail_sha = m.get("ledger_tail_sha")
+            for off, end, tail_sha, b in _new_blocks(self.ledger, end):
+                n += 1; tail = off
+                if b is None: continue
+                idx = b["index"]
+                self.db.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                (idx, b["block_hash"], b.get("prev_hash"), b.get("timestamp"), b.get("merkle_root"),
+                                 b.get("notes"), len(b["files"]), sum(fi["bytes"] for fi in b["files"]), off))
+                self.db.execute("DELETE FROM files WHERE block = ?", (idx,))
+                self.db.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                                    ((idx, i, fi["path"], pathlib.PurePath(fi["path"]).name, fi["bytes"], file_leaf(fi))
+                                     for i, fi in enumerate(b["files"])))
+                for s in b.get("signatures", []): self._put_sig(idx, s, 0)
+            self._set_meta(version=SCHEMA_VERSION, ledger_end=end, ledger_tail=tail, ledger_tail_sha=tail_sha)
+
+            end = m.get("sigs_end", 0); tail = m.get("sigs_tail", 0); tail_sha = m.get("sigs_tail_sha")
+            for off, line in _new_lines(logp, end):
+                n += 1; end = off + len(line); tail = off; tail_sha = hashlib.sha256(line).hexdigest()
+                if not line.strip(): continue
+                r = json.loads(line)
+                hit = self.db.execute("SELECT 1 FROM blocks WHERE idx = ? AND block_hash = ?",
+                                      (r["index"], r["block_hash"])).fetchone()
+                # same rule as merge_signatures: a later valid record wins, strays and bad signatures are ignored
+                if hit and cosig_valid(r): self._put_sig(r["index"], r, 1)
+            self._set_meta(sigs_end=end, sigs_tail=tail, sigs_tail_sha=tail_sha)
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK"); raise
+        return n
+
+    def rebuild(self) -> int:
+        self.db.execute("BEGIN IMMEDIATE"); self._clear(); self.db.execute("COMMIT")
+        return self.sync()
+
+    def _rows(self, sql: str, args=()) -> list[dict]:
+        return [dict(r) for r in self.db.execute(sql, args)]
+
+    _FILE_COLS = "f.block, b.timestamp, f.path, f.bytes, f.sha256, b.block_hash"
+
+    def first_seen(self, sha256: str) -> Optional[dict]:
+        """The earliest block that recorded this digest."""
+        rows = self._rows(f"SELECT {self._FILE_COLS} FROM files f JOIN blocks b ON b.idx = f.block "
+                          "WHERE f.sha256 = ? ORDER BY f.block, f.pos LIMIT 1", (sha256.lower(),))
+        return rows[0] if rows else None
+
+    def by_digest(self, sha256: str) -> list[dict]:
+        return self._rows(f"SELECT {self._FILE_COLS} FROM files f JOIN blocks b ON b.idx = f.block "
+                          "WHERE f.sha256 = ? ORDER BY f.block, f.pos", (sha256.lower(),))
+
+    def by_path(self, path: str) -> list[dict]:
+        """Files recorded at path; a bare file name matches that name in any directory."""
+        col = "name" if pathlib.PurePath(path).name == path else "path"
+        return self._rows(f"SELECT {self._FILE_COLS} FROM files f JOIN blocks b ON b.idx = f.block "
+                          f"WHERE f.{col} = ? ORDER BY f.block, f.pos", (path,))
+
+    def unsigned_by(self, signer: str) -> list[dict]:
+        return self._rows("SELECT idx, timestamp, block_hash, n_files FROM blocks b WHERE NOT EXISTS "
+                          "(SELECT 1 FROM signatures s WHERE s.block = b.idx AND s.signer = ?) ORDER BY idx", (signer,))
+
+    def iter_blocks(self, lo: Optional[int] = None, hi: Optional[int] = None, unsigned_by: Optional[str] = None,
+                    below: Optional[int] = None, allowed: Optional[Iterable[str]] = None) -> Iterator[tuple[int, str]]:
+        """(idx, block_hash) for lo <= idx <= hi in index order, streamed from the cursor.
+
+        unsigned_by keeps blocks that signer has not signed; below keeps blocks
+        with fewer than that many signers, counting only allowed ones if given.
+        """
+        where = ["idx BETWEEN ? AND ?"]; args: list = [0 if lo is None else lo, (1 << 62) if hi is None else hi]
+        if unsigned_by is not None:
+            where.append("NOT EXISTS (SELECT 1 FROM signatures s WHERE s.block = b.idx AND s.signer = ?)")
+            args.append(unsigned_by)
+        if below is not None:
+            allowed = sorted(allowed or ())
+            only = f" AND s.signer IN ({', '.join('?' * len(allowed))})" if allowed else ""
+            where.append(f"(SELECT COUNT(*) FROM signatures s WHERE s.block = b.idx{only}) < ?")
+            args += allowed + [below]
+        for r in self.db.execute(f"SELECT idx, block_hash FROM blocks b WHERE {' AND '.join(where)} ORDER BY idx", args):
+            yield r[0], r[1]
+
+    def between(self, since: Optional[str] = None, until: Optional[str] = None) -> list[dict]:
+        """Blocks with since <= timestamp < until (ISO-8601 UTC strings compare in time order)."""
+        return self._rows("SELECT idx, timestamp, block_hash, n_files FROM blocks "
+                          "WHERE timestamp >= ? AND timestamp < ? ORDER BY idx", (since or "", until or "\uffff"))
+
+    def block(self, index: int) -> Optional[dict]:
+        rows = self._rows("SELECT * FROM blocks WHERE idx = ?", (index,))
+        if not rows: return None
+        b = rows[0]
+        b["signers"] = [r["signer"] for r in self.db.execute(
+            "SELECT signer FROM signatures WHERE block = ? ORDER BY signer", (index,))]
+        return b
+
+def open_query(ledger: os.PathLike | str = LEDGER, sync: bool = True) -> ChainQuery:
+    q = ChainQuery(ledger)
+    if sync: q.sync()
+    return q
+
+def sync(ledger: os.PathLike | str = LEDGER) -> None:
+    """Called by the ledger writers; a failure here never blocks the write itself."""
+    try:
+        with ChainQuery(ledger) as q: q.sync()
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"[i] WARN: query index not updated ({e}) — run: python chain_query.py rebuild", file=sys.stderr)
+
+def _print(rows: list[dict], as_json: bool) -> None:
+    for r in rows:
+        print(json.dumps(r, ensure_ascii=False) if as_json else "\t".join("" if v is None else str(v) for v in r.values()))
+
+def main():
+    ap = argparse.ArgumentParser(description="Query the SQLite index of CHAIN.jsonl")
+    ap.add_argument("--ledger", default=str(LEDGER))
+    ap.add_argument("--json", action="store_true", help="One JSON object per line")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("sync", help="Index anything appended since the last sync")
+    sub.add_parser("rebuild", help="Re-index the whole ledger")
+    d = sub.add_parser("digest", help="Block that first recorded a sha256")
+    d.add_argument("sha256"); d.add_argument("--all", action="store_true", help="Every occurrence")
+    p = sub.add_parser("path", help="Every block recording this path (or bare file name)")
+    p.add_argument("path")
+    u = sub.add_parser("unsigned", help="Blocks this signer has not signed or cosigned")
+    u.add_argument("signer")
+    r = sub.add_parser("range", help="Blocks by timestamp, since <= t < until")
+    r.add_argument("--since"); r.add_argument("--until")
+    b = sub.add_parser("block", help="One block's summary and signers")
+    b.add_argument("index", type=int)
+    args = ap.parse_args()
+
+    with ChainQuery(args.ledger) as q:
+        if args.cmd == "rebuild":
+            n = q.rebuild(); print(f"[+] Indexed {n} lines -> {q.path}"); return
+        n = q.sync()
+        if args.cmd == "sync":
+            print(f"[+] Indexed {n} new lines -> {q.path}"); return
+        if args.cmd == "digest":
+            rows = q.by_digest(args.sha256) if args.all else [x for x in [q.first_seen(args.sha256)] if x]
+        elif args.cmd == "path": rows = q.by_path(args.path)
+        elif args.cmd == "unsigned": rows = q.unsigned_by(args.signer)
+        elif args.cmd == "range": rows = q.between(args.since, args.until)
+        else: rows = [x for x in [q.block(args.index)] if x]
+        _print(rows, args.json)
+        if not rows and args.cmd in ("digest", "path", "block"): sys.exit(1)
+
+if __name__ == "__main__":
+    main()
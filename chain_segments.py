@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# MIT License
+"""Segmented binary ledger: an optional, compact stand-in for chain/CHAIN.jsonl.
+
+chain/CHAIN.seg/ holds numbered segment files of a fixed number of blocks
+(SEGMENT_BLOCKS; only the last may be partial), so block position N lives in
+segment N // capacity. Each segment file is
+
+    MAGIC | block records | string table | string ends | record offsets | block hashes | trailer
+
+and a block record is its fixed header, then the fixed-size file and
+signature arrays (unpacked in one call each), then any JSON extras.
+
+Digests (block_hash, prev_hash, merkle_root, file sha256) are stored as raw 32
+bytes and signatures as raw 64. Signer names, pubkeys, paths, timestamps and
+notes are interned in the segment's string table. Fields outside that shape
+(sha256_tree, bundle entries, checkpoint, ...) ride along as JSON in the same
+table, and a block that does not fit it at all is kept whole as JSON. So
+conversion is lossless both ways, and block_hash, which is still computed
+over canonical() JSON, is unchanged. The fixed-size trailer at the end of
+each file locates everything else.
+
+Segments are memory-mapped; hashes, offsets and record fields are read in
+place. When CHAIN.jsonl is absent and CHAIN.seg exists, ChainIndex.open(),
+scan_ledger, the verifiers, load_prev and ChainWriter use the store (an
+append rewrites only the last segment). Cosignatures stay in chain/SIGS.jsonl.
+
+    python chain_segments.py convert [--replace]    CHAIN.jsonl -> CHAIN.seg
+    python chain_segments.py export [-o FILE]       CHAIN.seg -> JSON lines
+    python chain_segments.py check | stat
+"""
+from __future__ import annotations
+import os, re, sys, json, mmap, base64, shutil, struct, pathlib, argparse
+from base64 import b64encode
+from typing import Iterable, Iterator, Optional
+
+ROOT = pathlib.Path(__file__).resolve().parent
+LEDGER = ROOT / "chain" / "CHAIN.jsonl"
+SUFFIX = ".seg"
+SEGMENT_BLOCKS = 4096
+MAGIC = b"FCSEG\x00\x01\x00"
+# first index, count, capacity, strings, string blob, string ends, record offsets, block hashes, magic
+TRAILER = struct.Struct("<QIIIQQQQ8s")
+BLOCK = struct.Struct("<BQ32s32s32sIIIIH")  # flags, index, block_hash, prev_hash, merkle_root, schema, timestamp, notes, files, sigs
+FILE = struct.Struct("<BIQ32s")            # flags, path, bytes, sha256
+SIG = struct.Struct("<II64s")              # signer, pubkey, signature
+U32 = struct.Struct("<I")
+U64 = struct.Struct("<Q")
+ABSENT = 0xFFFFFFFF
+B_RAW, B_PREV, B_SIGS, B_EXTRA = 1, 2, 4, 8
+F_RAW, F_SHA, F_EXTRA = 1, 2, 4
+TEXT_KEYS = ("schema", "timestamp", "notes")
+BLOCK_KEYS = {"index", "prev_hash", "files", "merkle_root", "block_hash", "signatures", *TEXT_KEYS}
+HEX64 = re.compile(r"[0-9a-f]{64}")
+
+def store_path(ledger: os.PathLike | str) -> Optional[pathlib.Path]:
+    """The segment store standing in for ledger: ledger itself if it is one, else CHAIN.seg beside a missing CHAIN.jsonl."""
+    p = pathlib.Path(ledger)
+    if p.is_dir(): return p
+    if not p.exists() and p.with_suffix(SUFFIX).is_dir(): return p.with_suffix(SUFFIX)
+    return None
+
+def open_store(ledger: os.PathLike | str) -> Optional["SegmentStore"]:
+    path = store_path(ledger)
+    return None if path is None else SegmentStore(path)
+
+def _json(v) -> str:
+    return json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+
+def _digest(v) -> bool:
+    return isinstance(v, str) and len(v) == 64 and HEX64.fullmatch(v) is not None
+
+def _uint(v, bits: int) -> bool:
+    return type(v) is int and 0 <= v < 1 << bits
+
+def _sig_raw(s) -> Optional[bytes]:
+    if not (isinstance(s, dict) and s.keys() == {"signer", "pubkey_b64", "sig_b64"}
+            and all(isinstance(v, str) for v in s.values())): return None
+    try:
+        raw = base64.b64decode(s["sig_b64"], validate=True)
+    except ValueError:
+        return None
+    return raw if len(raw) == 64 and base64.b64encode(raw).decode() == s["sig_b64"] else None
+
+class _Strings:
+    def __init__(self, items: Iterable[str] = ()):
+        self.items = list(items); self.ids = {s: i for i, s in enumerate(self.items)}
+
+    def __call__(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.items); self.items.append(s)
+        return i
+
+def _encode_file(fi, strings: _Strings) -> tuple[bytes, Optional[int]]:
+    """(fixed record, string id of its extra JSON or None)."""
+    if (isinstance(fi, dict) and isinstance(fi.get("path"), str) and _uint(fi.get("bytes"), 64)
+            and ("sha256" not in fi or _digest(fi["sha256"]))):
+        sha = fi.get("sha256"); rest = {k: v for k, v in fi.items() if k not in ("path", "bytes", "sha256")}
+        rec = FILE.pack((F_SHA if sha else 0) | (F_EXTRA if rest else 0), strings(fi["path"]), fi["bytes"],
+                        bytes.fromhex(sha) if sha else bytes(32))
+        return rec, strings(_json(rest)) if rest else None
+    return FILE.pack(F_RAW, strings(_json(fi)), 0, bytes(32)), None
+
+def encode_block(b: dict, strings: _Strings) -> bytes:
+    """One block record; anything outside the fixed shape goes to the string table as JSON."""
+    sigs = b.get("signatures", []) if isinstance(b, dict) else None
+    raws = [_sig_raw(s) for s in sigs] if isinstance(sigs, list) else [None]
+    if not (isinstance(b, dict) and _uint(b.get("index"), 64) and _digest(b.get("block_hash"))
+            and _digest(b.get("merkle_root")) and "prev_hash" in b and (b["prev_hash"] is None or _digest(b["prev_hash"]))
+            and isinstance(b.get("files"), list) and None not in raws and len(raws) < 1 << 16):
+        return bytes([B_RAW]) + U32.pack(strings(_json(b)))
+    rest = {k: v for k, v in b.items() if k not in BLOCK_KEYS or (k in TEXT_KEYS and not isinstance(v, str))}
+    text = [strings(b[k]) if isinstance(b.get(k), str) else ABSENT for k in TEXT_KEYS]
+    flags = (B_PREV if b["prev_hash"] else 0) | (B_SIGS if "signatures" in b else 0) | (B_EXTRA if rest else 0)
+    out = [BLOCK.pack(flags, b["index"], bytes.fromhex(b["block_hash"]),
+                      bytes.fromhex(b["prev_hash"]) if b["prev_hash"] else bytes(32), bytes.fromhex(b["merkle_root"]),
+                      *text, len(b["files"]), len(raws))]
+    if rest: out.append(U32.pack(strings(_json(rest))))
+    files = [_encode_file(fi, strings) for fi in b["files"]]
+    out += [rec for rec, _ in files]
+    out += [SIG.pack(strings(s["signer"]), strings(s["pubkey_b64"]), r) for s, r in zip(sigs, raws)]
+    out += [U32.pack(x) for _, x in files if x is not None]
+    return b"".join(out)
+
+class Segment:
+    """One memory-mapped segment file."""
+
+    def __init__(self, path: os.PathLike | str):
+        self.path = pathlib.Path(path)
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(MAGIC) + TRAILER.size: raise ValueError(f"{self.path}: truncated segment")
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mv = memoryview(self.mm)
+        (self.first, self.count, self.capacity, self.nstrings, self._blob, self._ends,
+         self._offs, self._hashes, magic) = TRAILER.unpack_from(self.mm, size - TRAILER.size)
+        if magic != MAGIC or self.mm[:len(MAGIC)] != MAGIC: raise ValueError(f"{self.path}: not a ledger segment")
+        self._strings: dict[int, str] = {}; self._table: Optional[list[str]] = None
+
+    def close(self) -> None:
+        self.mv.release(); self.mm.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def string(self, i: int) -> str:
+        s = self._strings.get(i)
+        if s is None:  # decoded once per segment; ids repeat across blocks (signers, keys, paths)
+            start = U32.unpack_from(self.mm, self._ends + 4 * (i - 1))[0] if i else 0
+            end = U32.unpack_from(self.mm, self._ends + 4 * i)[0]
+            s = self._strings[i] = str(self.mv[self._blob + start:self._blob + end], "utf-8", "surrogatepass")
+        return s
+
+    def load_strings(self) -> "Segment":
+        """Decode the whole string table in one pass (sequential readers); point reads decode lazily."""
+        if self.nstrings and self._table is None:
+            ends = struct.unpack_from(f"<{self.nstrings}I", self.mm, self._ends)
+            blob = self.mm[self._blob:self._blob + ends[-1]]
+            self._table = [blob[a:b].decode("utf-8", "surrogatepass") for a, b in zip((0,) + ends[:-1], ends)]
+            self.string = self._table.__getitem__  # shadows the lazy method for this segment
+        return self
+
+    def offset(self, i: int) -> int:
+        return U64.unpack_from(self.mm, self._offs + 8 * i)[0]
+
+    def record(self, i: int) -> memoryview:
+        end = self.offset(i + 1) if i + 1 < self.count else self._blob
+        return self.mv[self.offset(i):end]
+
+    def block_hash(self, i: int) -> str:
+        o = self._hashes + 32 * i
+        return self.mv[o:o + 32].hex()
+
+    def hashes(self, lo: int, hi: int) -> memoryview:
+        """Raw 32-byte hashes of blocks lo..hi-1, in place."""
+        return self.mv[self._hashes + 32 * lo:self._hashes + 32 * hi]
+
+    def index(self, i: int) -> int:
+        o = self.offset(i)
+        if self.mm[o] & B_RAW: return json.loads(self.string(U32.unpack_from(self.mm, o + 1)[0]))["index"]
+        return U64.unpack_from(self.mm, o + 1)[0]
+
+    def block(self, i: int) -> dict:
+        mm = self.mm; st = self.string; o = self.offset(i)
+        if mm[o] & B_RAW: return json.loads(st(U32.unpack_from(mm, o + 1)[0]))
+        flags, index, bh, ph, mr, *text, nfiles, nsigs = BLOCK.unpack_from(mm, o); o += BLOCK.size
+        b = {"block_hash": bh.hex(), "index": index, "merkle_root": mr.hex(), "prev_hash": ph.hex() if flags & B_PREV else None}
+        for k, sid in zip(TEXT_KEYS, text):
+            if sid != ABSENT: b[k] = st(sid)
+        if flags & B_EXTRA:
+            b.update(json.loads(st(U32.unpack_from(mm, o)[0]))); o += 4
+        end = o + FILE.size * nfiles; extras = end + SIG.size * nsigs; files = b["files"] = []
+        for ff, path, size, sha in FILE.iter_unpack(self.mv[o:end]):
+            if ff & F_RAW:
+                files.append(json.loads(st(path))); continue
+            fi = {"bytes": size, "path": st(path)}
+            if ff & F_SHA: fi["sha256"] = sha.hex()
+            if ff & F_EXTRA:
+                fi.update(json.loads(st(U32.unpack_from(mm, extras)[0]))); extras += 4
+            files.append(fi)
+        if flags & B_SIGS:
+            b["signatures"] = [{"pubkey_b64": st(pub), "sig_b64": b64encode(sig).decode(), "signer": st(signer)}
+                               for signer, pub, sig in SIG.iter_unpack(self.mv[end:end + SIG.size * nsigs])]
+        return b
+
+def _write_segment(path: pathlib.Path, first: int, capacity: int, records: list, hashes: list[bytes],
+                   strings: list[str]) -> int:
+    out = bytearray(MAGIC); offs = []
+    for r in records:
+        offs.append(len(out)); out += r
+    blob = len(out); ends = []
+    for s in strings:
+        out += s.encode("utf-8", "surrogatepass"); ends.append(len(out) - blob)
+    ends_off = len(out); out += struct.pack(f"<{len(ends)}I", *ends)
+    offs_off = len(out); out += struct.pack(f"<{len(offs)}Q", *offs)
+    hashes_off = len(out); out += b"".join(hashes)
+    out += TRAILER.pack(first, len(records), capacity, len(strings), blob, ends_off, offs_off, hashes_off, MAGIC)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(out); f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(out)
+
+class _Builder:
+    def __init__(self, first: int, capacity: int, seg: Optional[Segment] = None):
+        self.first = first; self.capacity = capacity
+        self.records: list = []; self.hashes: list[bytes] = []; self.strings = _Strings()
+        if seg is not None:  # reuse the records as they are: string ids stay valid because the table only grows
+            self.strings = _Strings(seg.string(i) for i in range(seg.nstrings))
+            self.records = [bytes(seg.record(i)) for i in range(seg.count)]
+            self.hashes = [bytes(seg.hashes(i, i + 1)) for i in range(seg.count)]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, block: dict) -> None:
+        self.records.append(encode_block(block, self.strings)); self.hashes.append(bytes.fromhex(block["block_hash"]))
+
+    def write(self, path: pathlib.Path) -> int:
+        return _write_segment(path, self.first, self.capacity, self.records, self.hashes, self.strings.items)
+
+class SegmentStore:
+    """Same read interface as an open ChainIndex; offsets are block positions."""
+
+    def __init__(self, path: os.PathLike | str):
+        self.path = pathlib.Path(path); self._segs: dict[int, Segment] = {}
+        self.nsegs = len(list(self.path.glob("*.fseg")))
+
+    def __repr__(self) -> str:
+        return f"SegmentStore({str(self.path)!r}, {len(self)} blocks)"
+
+    def seg_path(self, n: int) -> pathlib.Path:
+        return self.path / f"{n:06d}.fseg"
+
+    def segment(self, n: int) -> Segment:
+        s = self._segs.get(n)
+        if s is None: s = self._segs[n] = Segment(self.seg_path(n))
+        return s
+
+    def close(self) -> None:
+        for s in self._segs.values(): s.close()
+        self._segs.clear()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def open(self) -> "SegmentStore":
+        return self
+
+    @property
+    def capacity(self) -> int:
+        return self.segment(0).capacity if self.nsegs else SEGMENT_BLOCKS
+
+    def __len__(self) -> int:
+        return (self.nsegs - 1) * self.capacity + self.segment(self.nsegs - 1).count if self.nsegs else 0
+
+    def _locate(self, pos: int) -> tuple[Segment, int, int]:
+        n = len(self)
+        if pos < 0: pos += n
+        if not 0 <= pos < n: raise IndexError(pos)
+        return self.segment(pos // self.capacity), pos % self.capacity, pos
+
+    def entry(self, pos: int) -> tuple[int, int, str]:
+        s, i, pos = self._locate(pos)
+        return pos, s.index(i), s.block_hash(i)
+
+    def read_at(self, offset: int) -> tuple[dict, int]:
+        s, i, pos = self._locate(offset)
+        return s.block(i), pos + 1
+
+    def tail(self) -> tuple[Optional[dict], int]:
+        n = len(self)
+        return (None, -1) if n == 0 else (self.read_at(n - 1)[0], n - 1)
+
+    def find(self, index: int) -> Optional[int]:
+        n = len(self)
+        if 0 <= index < n and self.entry(index)[1] == index: return index
+        lo, hi = 0, n - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2; got = self.entry(mid)[1]
+            if got == index: return mid
+            if got < index: lo = mid + 1
+            else: hi = mid - 1
+        return None
+
+    def get(self, index: int) -> Optional[dict]:
+        pos = self.find(index)
+        return None if pos is None else self.read_at(pos)[0]
+
+    def iter_hashes(self, start: int, stop: int) -> Iterator[str]:
+        cap = self.capacity
+        if stop > len(self): raise IndexError(stop)
+        while start < stop:
+            n, i = divmod(start, cap); j = min(cap, i + stop - start)
+            raw = self.segment(n).hashes(i, j)
+            for k in range(0, len(raw), 32): yield raw[k:k + 32].hex()
+            start += j - i
+
+    def scan(self, start: int = 0) -> Iterator[tuple[int, int, dict]]:
+        """(position, position + 1, block) from start, the scan_ledger contract."""
+        cap = self.capacity
+        for n in range(start // cap, self.nsegs):
+            seg = self.segment(n).load_strings()
+            for i in range(start - n * cap if n == start // cap else 0, seg.count):
+                yield n * cap + i, n * cap + i + 1, seg.block(i)
+
+    def append(self, blocks: list[dict]) -> int:
+        """Add blocks at the end; call under ledger_lock. Returns bytes written.
+
+        Only the last segment is rewritten (its records copied as they are),
+        then any new ones; each file lands by fsync + rename.
+        """
+        if not blocks: return 0
+        self.path.mkdir(parents=True, exist_ok=True)
+        cap = self.capacity; n = self.nsegs; total = len(self)
+        last = n - 1 if n and total % cap else n
+        b = _Builder(last * cap, cap, self.segment(last) if last < n else None)
+        self.close(); written = 0
+        for block in blocks:
+            if len(b) == cap:
+                written += b.write(self.seg_path(last)); last += 1; b = _Builder(last * cap, cap)
+            b.add(block)
+        written += b.write(self.seg_path(last))
+        self.nsegs = last + 1
+        return written
+
+def write_store(blocks: Iterable[dict], out: pathlib.Path, capacity: int = SEGMENT_BLOCKS) -> tuple[int, int]:
+    """Write a new store from a block stream; returns (blocks, bytes)."""
+    out.mkdir(parents=True); n = seg = written = 0; b = _Builder(0, capacity)
+    for block in blocks:
+        if len(b) == capacity:
+            written += b.write(out / f"{seg:06d}.fseg"); seg += 1; b = _Builder(seg * capacity, capacity)
+        b.add(block); n += 1
+    if len(b): written += b.write(out / f"{seg:06d}.fseg")
+    return n, written
+
+def _lines(ledger: pathlib.Path) -> Iterator[bytes]:
+    with open(ledger, "rb") as f:
+        for line in f:
+            if line.strip(): yield line
+
+def line_form(block: dict) -> bytes:
+    """A block as ChainWriter writes it."""
+    return (json.dumps(block, sort_keys=True, ensure_ascii=False) + "\n").encode("utf-8")
+
+def convert(ledger: pathlib.Path, out: pathlib.Path, capacity: int = SEGMENT_BLOCKS) -> dict:
+    """JSONL -> store, then re-read both to prove every block decodes to what was written."""
+    if out.exists(): raise FileExistsError(f"{out} already exists")
+    tmp = out.with_name(out.name + f".{os.getpid()}.tmp")
+    try:
+        n, size = write_store((json.loads(line) for line in _lines(ledger)), tmp, capacity)
+        reform = 0
+        with SegmentStore(tmp) as store:
+            if len(store) != n: raise RuntimeError(f"store holds {len(store)} blocks, ledger {n}")
+            for (_, _, got), line in zip(store.scan(), _lines(ledger)):
+                want = json.loads(line)
+                if got != want: raise RuntimeError(f"block {want.get('index')} does not round-trip")
+                reform += line_form(got) != line
+        os.replace(tmp, out)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True); raise
+    return {"blocks": n, "bytes": size, "ledger_bytes": ledger.stat().st_size, "reformatted": reform}
+
+def export(store: SegmentStore, out: pathlib.Path) -> int:
+    """Store -> JSON lines in ChainWriter's line form; returns blocks written."""
+    tmp = out.with_name(out.name + f".{os.getpid()}.tmp"); n = 0
+    with open(tmp, "wb") as f:
+        for _, _, b in store.scan():
+            f.write(line_form(b)); n += 1
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, out)
+    return n
+
+def check(store: SegmentStore) -> list[str]:
+    """Structural problems: segment layout, and record vs hash table agreement (signatures are the verifiers' job)."""
+    bad = []; cap = store.capacity
+    names = sorted(p.name for p in store.path.glob("*.fseg"))
+    if names != [f"{i:06d}.fseg" for i in range(len(names))]: return [f"segment files are not numbered 0..{len(names) - 1}"]
+    for n in range(store.nsegs):
+        s = store.segment(n)
+        if s.capacity != cap or s.first != n * cap: bad.append(f"{s.path.name}: wrong capacity or first block")
+        if s.count > cap or (n < store.nsegs - 1 and s.count != cap): bad.append(f"{s.path.name}: holds {s.count} blocks")
+        for i in range(min(s.count, cap)):
+            b = s.block(i)
+            if b.get("block_hash") != s.block_hash(i) or b.get("index") != s.index(i):
+                bad.append(f"{s.path.name}: record {i} disagrees with the hash table")
+    return bad
+
+def main():
+    ap = argparse.ArgumentParser(description="Convert between CHAIN.jsonl and the segmented binary ledger")
+    ap.add_argument("--ledger", default=str(LEDGER), help="JSON-lines ledger (default chain/CHAIN.jsonl)")
+    ap.add_argument("--store", help="Segment store directory (default: the ledger path with .seg)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("convert", help="Write the store from the JSON-lines ledger (verified block by block)")
+    c.add_argument("--segment-blocks", type=int, default=SEGMENT_BLOCKS)
+    c.add_argument("--replace", action="store_true",
+                   help="Then move CHAIN.jsonl aside (to .jsonl.bak) so every tool reads the store")
+    e = sub.add_parser("export", help="Write the store back out as JSON lines")
+    e.add_argument("-o", "--output", help="Output file (default: the ledger path; must not exist)")
+    sub.add_parser("check", help="Check segment layout and record/hash-table agreement")
+    sub.add_parser("stat", help="Blocks, segments and sizes")
+    args = ap.parse_args()
+    ledger = pathlib.Path(args.ledger); store_dir = pathlib.Path(args.store) if args.store else ledger.with_suffix(SUFFIX)
+
+    if args.cmd == "convert":
+        if not ledger.is_file(): print(f"[!] No ledger at {ledger}", file=sys.stderr); sys.exit(1)
+        from chain_writer import ledger_lock
+        try:
+            with ledger_lock(ledger): r = convert(ledger, store_dir, args.segment_blocks)
+        except (FileExistsError, RuntimeError, ValueError) as e:
+            print(f"[!] {e}", file=sys.stderr); sys.exit(1)
+        print(f"[+] {r['blocks']} blocks -> {store_dir} ({r['bytes']} bytes, {r['bytes'] / max(r['ledger_bytes'], 1):.0%} of the JSONL)")
+        if r["reformatted"]:
+            print(f"[i] WARN: {r['reformatted']} line(s) were not in the writer's line form; export re-serializes them "
+                  f"(values and block_hash unchanged)")
+        if args.replace:
+            with ledger_lock(ledger):
+                os.replace(ledger, ledger.with_name(ledger.name + ".bak"))
+                ledger.with_suffix(".idx").unlink(missing_ok=True)
+            print(f"[+] {ledger.name} moved to {ledger.name}.bak; tools now read {store_dir.name}")
+        return
+    if not store_dir.is_dir(): print(f"[!] No segment store at {store_dir}", file=sys.stderr); sys.exit(1)
+    with SegmentStore(store_dir) as store:
+        if args.cmd == "export":
+            out = pathlib.Path(args.output) if args.output else ledger
+            if out.exists(): print(f"[!] {out} exists; pass -o elsewhere or move it", file=sys.stderr); sys.exit(1)
+            print(f"[+] {export(store, out)} blocks -> {out}")
+        elif args.cmd == "check":
+            bad = check(store)
+            for m in bad: print(f"[!] {m}")
+            print(f"[✓] {len(store)} blocks in {store.nsegs} segment(s) OK" if not bad else "[x] Segment store FAILED")
+            sys.exit(1 if bad else 0)
+        else:
+            size = sum(p.stat().st_size for p in store.path.glob("*.fseg"))
+            print(f"{len(store)} blocks, {store.nsegs} segment(s) of {store.capacity}, {size} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# MIT License
+"""Parallel per-block verification for the chain verifiers.
+
+The ledger is read as a stream and cut into bounded batches of lines. Worker
+processes parse each batch and compute everything that does not depend on
+neighbouring blocks: the Merkle root check, the canonical() block_hash check
+and every embedded Ed25519 signature (with decoded VerifyKeys cached per
+pubkey). The caller receives (block, facts) strictly in ledger order and does
+the serial part itself: index continuity, prev_hash linkage and reporting.
+Small ledgers are checked in-process, where a pool would cost more than it saves.
+"""
+from __future__ import annotations
+import os, json, base64, hashlib, pathlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+from nacl.signing import VerifyKey
+from nacl.exceptions import BadSignatureError
+from chain_merkle import merkle_root, file_leaf, tree_consistent
+from chain_segments import Segment, open_store
+
+BATCH_LINES = 256
+INLINE_BYTES = 4 << 20  # below this much unread ledger, skip the pool
+INLINE_BLOCKS = 4096    # the same for a segment store
+
+def sha256hex(b: bytes) -> str:
+    return hashlib.sha256(b).hexdigest()
+
+def canonical(obj) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode("utf-8")
+
+_keys: dict[str, VerifyKey] = {}
+
+def verify_key(pub_b64: str) -> VerifyKey:
+    vk = _keys.get(pub_b64)
+    if vk is None:
+        vk = _keys[pub_b64] = VerifyKey(base64.b64decode(pub_b64))
+    return vk
+
+def sig_valid(block_hash: str, pub_b64: str, sig_b64: str) -> bool:
+    try:
+        verify_key(pub_b64).verify(bytes.fromhex(block_hash), base64.b64decode(sig_b64))
+        return True
+    except BadSignatureError:
+        return False
+
+def sig_key(s: dict) -> str:
+    return s["pubkey_b64"] + " " + s["sig_b64"]
+
+def block_facts(block: dict) -> dict:
+    """Order-independent checks for one block."""
+    leaves = [file_leaf(fi) for fi in block["files"]]
+    to_hash = {k: v for k, v in block.items() if k not in ("signatures", "block_hash")}
+    return {
+        "merkle_ok": block["merkle_root"] == merkle_root(leaves),
+        "bad_trees": [fi["path"] for fi in block["files"] if not tree_consistent(fi)],
+        "hash_ok": sha256hex(canonical(to_hash)) == block["block_hash"],
+        "sigs": {sig_key(s): sig_valid(block["block_hash"], s["pubkey_b64"], s["sig_b64"])
+                 for s in block.get("signatures", [])},
+    }
+
+def lookup_sig(facts: Optional[dict], block: dict, s: dict) -> bool:
+    """Signature validity from facts, verifying in-process if it was not precomputed (e.g. a cosignature)."""
+    if facts is not None:
+        hit = facts["sigs"].get(sig_key(s))
+        if hit is not None: return hit
+    return sig_valid(block["block_hash"], s["pubkey_b64"], s["sig_b64"])
+
+def _check_batch(lines: list[bytes]) -> list[tuple[dict, dict]]:
+    out = []
+    for line in lines:
+        block = json.loads(line); out.append((block, block_facts(block)))
+    return out
+
+def default_workers() -> int:
+    return int(os.getenv("FABRIC_VERIFY_WORKERS") or os.cpu_count() or 1)
+
+def _check_span(path: str, lo: int, hi: int) -> list[tuple[dict, dict]]:
+    with Segment(path) as seg:
+        seg.load_strings()
+        return [(b, block_facts(b)) for b in map(seg.block, range(lo, hi))]
+
+def _ordered(jobs, fn, workers: int):
+    """Yield (meta, fn(*args)) in job order, at most 2 * workers batches in flight."""
+    if workers <= 1:
+        for meta, args in jobs: yield meta, fn(*args)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        inflight = deque()
+        for meta, args in jobs:
+            inflight.append((meta, ex.submit(fn, *args)))
+            # bounded read-ahead keeps memory flat on huge ledgers
+            while len(inflight) > 2 * workers:
+                m, fut = inflight.popleft(); yield m, fut.result()
+        while inflight:
+            m, fut = inflight.popleft(); yield m, fut.result()
+
+def _iter_store(store, start: int, workers: Optional[int], batch_lines: int):
+    n = len(store); cap = store.capacity
+    if workers is None:
+        workers = default_workers() if n - start >= INLINE_BLOCKS else 1
+    def jobs():
+        pos = start
+        while pos < n:
+            seg, i = divmod(pos, cap); j = min(cap, i + batch_lines, n - seg * cap)
+            yield pos, (str(store.seg_path(seg)), i, j); pos += j - i
+    # in-process, keep the store's mapped segments (and their decoded strings) across batches
+    inline = lambda path, i, j: [(b, block_facts(b)) for b in
+                                 map(store.segment(int(pathlib.Path(path).stem)).load_strings().block, range(i, j))]
+    for pos, checked in _ordered(jobs(), _check_span if workers > 1 else inline, workers):
+        for k, (block, facts) in enumerate(checked, pos):
+            yield k - start + 1, k, k + 1, block, facts
+
+def iter_checked(ledger: pathlib.Path, start: int = 0, workers: Optional[int] = None,
+                 batch_lines: int = BATCH_LINES) -> Iterator[tuple[int, int, int, dict, dict]]:
+    """Yield (lineno offset, line start, line end, block, facts) in ledger order from byte offset start.
+
+    lineno offset counts every line read (blank ones included) since start.
+    For a segment store, offsets are block positions.
+    """
+    store = open_store(ledger)
+    if store is not None:
+        with store: yield from _iter_store(store, start, workers, batch_lines)
+        return
+    size = ledger.stat().st_size
+    if workers is None:
+        workers = default_workers() if size - start >= INLINE_BYTES else 1
+    with open(ledger, "rb") as f:
+        f.seek(start)
+        def batches():
+            batch = []; meta = []; n = 0; off = start
+            for line in f:
+                n += 1; line_off = off; off += len(line)
+                if not line.strip(): continue
+                batch.append(line); meta.append((n, line_off, off))
+                if len(batch) >= batch_lines:
+                    yield meta, (batch,); batch = []; meta = []
+            if batch: yield meta, (batch,)
+        for meta, checked in _ordered(batches(), _check_batch, workers):
+            for m, (block, facts) in zip(meta, checked): yield (*m, block, facts)
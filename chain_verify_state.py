@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# MIT License
+"""Incremental ledger verification from a verified-prefix checkpoint.
+
+chain/.verify_state.json keeps, per verifier, the last block of the longest
+prefix that passed: its index, block_hash, line offsets and line number, plus
+how much of chain/SIGS.jsonl had been seen (length and digest) and a hash of
+the config files (pubkeys.json, policy.json). A later run checks that the
+checkpoint still describes the ledger, re-verifies signatures only on prefix
+blocks that gained cosignatures, and streams the ledger from the stored
+offset. Anything that does not line up (config change, compaction, rewrite)
+falls back to a full pass, as does --full.
+
+In-place edits of the prefix that keep the checkpointed line intact are not
+detected incrementally; CI should still run --full periodically.
+"""
+from __future__ import annotations
+import os, json, hashlib, pathlib
+from typing import Callable, Optional
+from chain_index import ChainIndex, ledger_exists, read_block_at
+from chain_cosigs import sigs_path, iter_cosigs, merge_signatures, report_strays
+from chain_verify_engine import iter_checked
+import telemetry
+
+ROOT = pathlib.Path(__file__).resolve().parent
+STATE = ROOT / "chain" / ".verify_state.json"
+
+def config_hash(*paths: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(p.name.encode() + b"\0")
+        h.update(p.read_bytes() if p.exists() else b"")
+        h.update(b"\0")
+    return h.hexdigest()
+
+def _read_state(path: pathlib.Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _write_state(path: pathlib.Path, name: str, cp: Optional[dict]) -> None:
+    data = _read_state(path)
+    if cp is None:
+        if name not in data: return
+        data.pop(name)
+    else:
+        data[name] = cp
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _log_digest(ledger: pathlib.Path, upto: int) -> Optional[str]:
+    path = sigs_path(ledger)
+    if upto == 0: return hashlib.sha256(b"").hexdigest()
+    if not path.exists() or path.stat().st_size < upto: return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        left = upto
+        while left:
+            chunk = f.read(min(1 << 20, left)); left -= len(chunk); h.update(chunk)
+    return h.hexdigest()
+
+def state_path(ledger: pathlib.Path) -> pathlib.Path:
+    """Checkpoint file kept beside the ledger (chain/.verify_state.json for the real one)."""
+    return pathlib.Path(ledger).with_name(STATE.name)
+
+def load_checkpoint(ledger: pathlib.Path, name: str, config: str, state: Optional[pathlib.Path] = None) -> Optional[dict]:
+    """The stored checkpoint for name, or None if it no longer describes the ledger."""
+    cp = _read_state(state or state_path(ledger)).get(name)
+    if not cp or cp.get("config") != config or not ledger_exists(ledger): return None
+    try:
+        block, end = read_block_at(ledger, cp["line_offset"])
+    except (OSError, ValueError, KeyError, IndexError):
+        return None
+    if block.get("index") != cp["index"] or block.get("block_hash") != cp["block_hash"]: return None
+    if end != cp["offset"]: return None
+    if _log_digest(ledger, cp["cosig_offset"]) != cp["cosig_digest"]: return None
+    return cp
+
+def verify_ledger(ledger: pathlib.Path, name: str, config: str,
+                  check_block: Callable[[dict, dict, int, Optional[str], int], bool],
+                  check_sigs: Callable[[dict, Optional[dict]], bool], full: bool = False,
+                  state: Optional[pathlib.Path] = None, workers: Optional[int] = None) -> bool:
+    """Run check_block over the unverified suffix and check_sigs over re-signed prefix blocks.
+
+    check_block(block, facts, lineno, prev_hash, prev_index) and
+    check_sigs(block, facts) print their own findings and return True when the
+    block passes; blocks arrive with cosignatures already merged in, facts come
+    from chain_verify_engine (None for re-signed prefix blocks).
+    """
+    state = state or state_path(ledger)
+    with telemetry.span("verify_checkpoint", verifier=name):
+        cp = None if full else load_checkpoint(ledger, name, config, state)
+    if cp:
+        print(f"[i] Incremental: resuming after verified block {cp['index']} (--full to re-check all)")
+    start = cp["offset"] if cp else 0
+    prev_hash = cp["block_hash"] if cp else None
+    prev_index = cp["index"] if cp else -1
+    lineno = cp["lineno"] if cp else 0
+    seen = cp["cosig_offset"] if cp else 0
+
+    cosigs: dict[int, list[dict]] = {}; touched = set(); log_end = 0
+    with telemetry.span("verify_cosig_log", verifier=name) as sp:
+        for end, r in iter_cosigs(ledger):
+            cosigs.setdefault(r["index"], []).append(r); log_end = end
+            if cp and end > seen and r["index"] <= cp["index"]: touched.add(r["index"])
+        sp.add(bytes=log_end)
+
+    ok = True; prefix_ok = True; resigned_ok = True
+    if touched:
+        with telemetry.span("verify_resigned", verifier=name) as sp:
+            cix = ChainIndex(ledger).open()
+            for idx in sorted(touched):
+                block = cix.get(idx)
+                if block is None: continue
+                block["signatures"], stray = merge_signatures(block, cosigs.get(idx))
+                if not (report_strays(block, stray) & check_sigs(block, None)): ok = prefix_ok = resigned_ok = False
+            sp.add(blocks=len(touched))
+    if cp:
+        for idx in [i for i in cosigs if i <= cp["index"]]: cosigs.pop(idx)
+
+    new_cp = dict(cp) if cp else None; blocks = 0; off = start
+    with telemetry.span("verify_blocks", verifier=name) as sp:
+        for n, line_off, off, block, facts in iter_checked(ledger, start, workers):
+            idx = block["index"]; blocks += 1
+            block["signatures"], stray = merge_signatures(block, cosigs.pop(idx, None))
+            if not (report_strays(block, stray) & check_block(block, facts, lineno + n, prev_hash, prev_index)):
+                ok = prefix_ok = False
+            elif prefix_ok:
+                new_cp = {"index": idx, "block_hash": block["block_hash"],
+                          "line_offset": line_off, "offset": off, "lineno": lineno + n}
+            prev_hash, prev_index = block["block_hash"], idx
+        sp.add(blocks=blocks, **({"bytes": off - start} if ledger.is_file() else {}))
+
+    for idx, recs in sorted(cosigs.items()):
+        for r in recs: print(f"[i] WARN: cosignature from '{r['signer']}' for missing block {idx} (ignored)")
+
+    with telemetry.span("verify_save_state", verifier=name):
+        if new_cp is None or not resigned_ok:
+            # a re-signed prefix block failed: the checkpoint no longer vouches for the prefix
+            _write_state(state, name, None)
+        else:
+            new_cp.update(cosig_offset=log_end, cosig_digest=_log_digest(ledger, log_end), config=config)
+            _write_state(state, name, new_cp)
+    return ok
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# MIT License
+"""Serialized, durable appends to chain/CHAIN.jsonl.
+
+ledger_lock() is an advisory exclusive lock on chain/CHAIN.lock (flock on
+POSIX, msvcrt on Windows) taken around every ledger mutation: block appends,
+cosignature appends and compaction. It is re-entrant within a thread.
+
+ChainWriter does group commit. Appenders hand in a draft (everything but
+index, prev_hash, block_hash and signatures) plus a sign(block_hash)
+callback. Whichever thread arrives first becomes the leader. Under the lock
+it reads the tail, assigns consecutive indices and prev_hash values to
+every queued draft, signs them, writes them all with one write + fsync and
+updates the sidecar index. Threads that queued meanwhile just wait for
+their block. A segmented ledger (chain_segments) gets the same batch through
+SegmentStore.append instead of a line write.
+
+Batching only spans threads sharing one ChainWriter, i.e. one process.
+Concurrent processes (several chain_new_block runs, CI jobs) stay correct
+through the lock but each pays its own write + fsync: a block's signatures
+cover its index and prev_hash, which are only known under the lock, and the
+lock holder cannot sign another process's block without its key.
+bench/bench_ledger.py reports blocks per commit to show the difference.
+"""
+from __future__ import annotations
+import os, sys, json, pathlib, threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable
+from chain_index import ChainIndex
+from chain_segments import open_store
+from chain_verify_engine import canonical, sha256hex
+import telemetry
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+ROOT = pathlib.Path(__file__).resolve().parent
+LEDGER = ROOT / "chain" / "CHAIN.jsonl"
+MAX_BATCH = 256
+
+_held = threading.local()
+
+def lock_path(ledger: pathlib.Path) -> pathlib.Path:
+    return ledger.with_suffix(".lock")
+
+def _lock_fd(fd: int) -> None:
+    if fcntl:
+        fcntl.flock(fd, fcntl.LOCK_EX); return
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1); return
+        except OSError:
+            continue  # LK_LOCK gives up after ~10s; keep waiting like flock does
+
+def _unlock_fd(fd: int) -> None:
+    if fcntl: fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET); msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def ledger_lock(ledger: os.PathLike | str = LEDGER):
+    """Hold the ledger's advisory lock for the duration of the with-block."""
+    path = lock_path(pathlib.Path(ledger)).resolve()
+    held = _held.__dict__.setdefault("paths", {})
+    if held.get(path):
+        held[path] += 1
+        try: yield
+        finally: held[path] -= 1
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        _lock_fd(fd); held[path] = 1
+        try: yield
+        finally:
+            held[path] = 0; _unlock_fd(fd)
+    finally:
+        os.close(fd)
+
+def repair_tail(ledger: pathlib.Path) -> int:
+    """Drop a torn last line left by a writer that died mid-append; call under the lock. Returns bytes cut."""
+    if not ledger.exists(): return 0
+    with open(ledger, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0: return 0
+        f.seek(size - 1)
+        if f.read(1) == b"\n": return 0
+        pos = size
+        while pos > 0:
+            step = min(1 << 16, pos); pos -= step
+            f.seek(pos); buf = f.read(step); nl = buf.rfind(b"\n")
+            if nl >= 0: pos += nl + 1; break
+        f.truncate(pos); f.flush(); os.fsync(f.fileno())
+    print(f"[i] WARN: removed {size - pos} bytes of torn, unacknowledged append from {ledger}", file=sys.stderr)
+    return size - pos
+
+class ChainWriter:
+    def __init__(self, ledger: os.PathLike | str = LEDGER, max_batch: int = MAX_BATCH):
+        self.ledger = pathlib.Path(ledger); self.max_batch = max_batch
+        self._mu = threading.Lock(); self._queue: list = []; self._flushing = False
+        self.commits = 0  # write + fsync rounds, for benchmarks
+
+    def append(self, draft: dict, sign: Callable[[str], list[dict]]) -> dict:
+        """Append one block built from draft; returns it with index, prev_hash, block_hash and signatures."""
+        fut: Future = Future()
+        with self._mu:
+            self._queue.append((draft, sign, fut))
+            lead = not self._flushing
+            if lead: self._flushing = True
+        if lead:
+            while True:
+                with self._mu:
+                    batch = self._queue[:self.max_batch]; del self._queue[:self.max_batch]
+                    if not batch:
+                        self._flushing = False; break
+                try:
+                    self._commit(batch)
+                except BaseException as e:
+                    for _, _, f in batch:
+                        if not f.done(): f.set_exception(e)
+        return fut.result()
+
+    def _commit(self, batch: list) -> None:
+        self.ledger.parent.mkdir(parents=True, exist_ok=True)
+        with ledger_lock(self.ledger):
+            store = open_store(self.ledger)
+            if store is None: repair_tail(self.ledger)
+            with telemetry.span("load_prev"):
+                cix = store if store is not None else ChainIndex(self.ledger).open()
+                prev, pos = cix.tail()
+            index = pos + 1; prev_hash = prev["block_hash"] if prev else None
+            data = bytearray(); done = []
+            for draft, sign, fut in batch:
+                block = {**draft, "index": index, "prev_hash": prev_hash}
+                try:
+                    block_hash = sha256hex(canonical(block))
+                    block["block_hash"] = block_hash; block["signatures"] = sign(block_hash)
+                except Exception as e:
+                    fut.set_exception(e); continue
+                line = (json.dumps(block, sort_keys=True, ensure_ascii=False) + "\n").encode("utf-8")
+                done.append((len(data), block, fut)); data += line
+                index += 1; prev_hash = block_hash
+            if not done: return
+            if store is not None:
+                with telemetry.span("ledger_commit") as sp, store:
+                    sp.add(blocks=len(done), bytes=store.append([b for _, b, _ in done]))
+            else:
+                with telemetry.span("ledger_commit") as sp, open(self.ledger, "ab") as f:
+                    base = f.seek(0, os.SEEK_END)
+                    f.write(data); f.flush(); os.fsync(f.fileno())
+                    sp.add(blocks=len(done), bytes=len(data))
+                for rel, block, _ in done:
+                    cix.append(base + rel, block["index"], block["block_hash"])
+            self.commits += 1
+        for _, block, fut in done: fut.set_result(block)
@@ -1,44 +1,72 @@
 #!/usr/bin/env python3
-import json, base64, argparse, pathlib
+import sys, json, base64, argparse, pathlib
 from nacl.signing import SigningKey
 from nacl.encoding import RawEncoder
+from chain_index import ChainIndex, ledger_exists
+from chain_cosigs import append_cosigs, cosig_record
+import chain_query
+import telemetry
 
 LEDGER = pathlib.Path("chain/CHAIN.jsonl")
 KEYS   = pathlib.Path("chain/keys")
 PUBS   = pathlib.Path("chain/pubkeys.json")
-
-def load_blocks():
-    return [json.loads(l) for l in LEDGER.read_text(encoding="utf-8").splitlines() if l.strip()]
+POLICY = pathlib.Path("chain/policy.json")
 
 def main():
-    ap = argparse.ArgumentParser(description="Co-sign an existing block by index (default latest)")
+    ap = argparse.ArgumentParser(description="Co-sign an existing block by index (default latest), or many at once")
     ap.add_argument("--signer", required=True, help="Signer name (must have a .sk key)")
     ap.add_argument("--index", type=int, default=None, help="Block index to co-sign (default latest)")
+    ap.add_argument("--from", dest="lo", type=int, help="Co-sign blocks from this index on (inclusive)")
+    ap.add_argument("--to", dest="hi", type=int, help="...up to this index (inclusive)")
+    ap.add_argument("--missing", action="store_true", help="Every block this signer has not signed yet")
+    ap.add_argument("--below-threshold", action="store_true",
+                    help="Every block with fewer allowed signers than the policy.json threshold")
+    ap.add_argument("--dry-run", action="store_true", help="Only report how many blocks would be co-signed")
     args = ap.parse_args()
+    batch = args.lo is not None or args.hi is not None or args.missing or args.below_threshold
+    if batch and args.index is not None:
+        ap.error("--index cannot be combined with --from/--to/--missing/--below-threshold")
 
-    assert LEDGER.exists(), "Missing chain/CHAIN.jsonl"
+    assert ledger_exists(LEDGER), "Missing chain/CHAIN.jsonl"
     skp = KEYS / f"{args.signer}.ed25519.sk"
     assert skp.exists(), f"Missing secret key: {skp}"
-
-    blocks = load_blocks()
-    b = blocks[-1] if args.index is None else next((x for x in blocks if x["index"] == args.index), None)
-    assert b, "Block not found"
-
     sk = SigningKey(base64.b64decode(skp.read_text().strip()))
-    sig_b64 = base64.b64encode(sk.sign(bytes.fromhex(b["block_hash"]), encoder=RawEncoder).signature).decode()
-
     pubs = json.loads(PUBS.read_text(encoding="utf-8")) if PUBS.exists() else {}
     pubs[args.signer] = base64.b64encode(sk.verify_key.encode()).decode()
+    sign = lambda block_hash: base64.b64encode(sk.sign(bytes.fromhex(block_hash), encoder=RawEncoder).signature).decode()
 
-    b.setdefault("signatures", [])
-    b["signatures"] = [s for s in b["signatures"] if s.get("signer") != args.signer]
-    b["signatures"].append({"signer": args.signer, "pubkey_b64": pubs[args.signer], "sig_b64": sig_b64})
+    if not batch:
+        cix = ChainIndex(LEDGER).open()
+        b = cix.tail()[0] if args.index is None else cix.get(args.index)
+        assert b, "Block not found"
+        records = [cosig_record(b, args.signer, pubs[args.signer], sign(b["block_hash"]))]
+    else:
+        below = allowed = None
+        if args.below_threshold:
+            policy = json.loads(POLICY.read_text(encoding="utf-8")) if POLICY.exists() else {}
+            below = int(policy.get("threshold", 1)); allowed = policy.get("allowed_signers") or None
+            if allowed and args.signer not in allowed:
+                print(f"[i] WARN: '{args.signer}' is not in allowed_signers; its signatures will not count", file=sys.stderr)
+        # one pass over the query index; a batch never re-signs a block this signer already signed
+        records = []
+        with chain_query.open_query(LEDGER) as q, telemetry.span("cosign_batch") as sp:
+            for idx, block_hash in q.iter_blocks(args.lo, args.hi, unsigned_by=args.signer, below=below, allowed=allowed):
+                b = {"index": idx, "block_hash": block_hash}
+                records.append(b if args.dry_run else cosig_record(b, args.signer, pubs[args.signer], sign(block_hash)))
+            sp.add(blocks=len(records))
+        if not records:
+            print(f"[i] Nothing to co-sign for '{args.signer}'"); return
+        span = f"blocks {records[0]['index']}..{records[-1]['index']}"
+        if args.dry_run:
+            print(f"[i] Would co-sign {len(records)} block(s) as '{args.signer}' ({span})"); return
 
-    LEDGER.write_text("\n".join(json.dumps(x, sort_keys=True, ensure_ascii=False) for x in sorted(blocks, key=lambda x: x["index"])) + "\n",
-                      encoding="utf-8")
+    # one fsync'd write to chain/SIGS.jsonl however many blocks; `python chain_cosigs.py compact` folds them in
+    n = append_cosigs(LEDGER, records)
     PUBS.write_text(json.dumps(pubs, indent=2, sort_keys=True), encoding="utf-8")
+    chain_query.sync(LEDGER)
 
-    print(f"[✓] Co-signed block {b['index']} as '{args.signer}'")
+    if not batch: print(f"[✓] Co-signed block {records[0]['index']} as '{args.signer}'")
+    else: print(f"[✓] Co-signed {n} block(s) as '{args.signer}' ({span})")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# MIT License
+"""Shared SHA-256 engine: thread-pooled file hashing with a persistent digest cache.
+
+Cache entries are keyed by (path, inode, size, mtime_ns); a file whose stat
+still matches its entry is never re-read. Set FABRIC_DIGEST_CACHE=off to
+disable the cache or point it at another file.
+
+Files larger than one chunk can also get a chunk tree digest (see
+chain_merkle.TREE_SCHEME): fixed-size ranges of an mmap are hashed on all
+cores and combined with merkle_root, so verifying one huge file is not bound
+to one core, and a corrupted file can be narrowed down to the chunks that
+differ. The entry keeps the whole-file sha256 next to the tree (hashed over
+the same mmap on one more thread), so sha256sum-style digests and older
+readers of fi["sha256"] still work; recording is bound by that one stream.
+
+md5_file/md5_files keep md5s in the same cache (kind "md5"); the archives
+report md5s, so remote_manifest compares against those.
+"""
+from __future__ import annotations
+import os, json, mmap, atexit, hashlib, pathlib, tempfile, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+from chain_merkle import TREE_SCHEME, merkle_root
+
+ROOT = pathlib.Path(__file__).resolve().parent
+DEFAULT_CACHE = ROOT / ".digest_cache.json"
+CHUNK = 1 << 20
+TREE_CHUNK = 64 << 20
+
+def default_workers() -> int:
+    env = os.getenv("FABRIC_HASH_WORKERS")
+    if env: return max(1, int(env))
+    return min(32, (os.cpu_count() or 1) + 4)
+
+def sha256_stream(path) -> tuple[int, str]:
+    h = hashlib.sha256(); n = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            n += len(chunk); h.update(chunk)
+    return n, h.hexdigest()
+
+class DigestCache:
+    """JSON-backed map of absolute path (+ "#kind") -> [inode, size, mtime_ns, digest]."""
+
+    def __init__(self, path: os.PathLike | str = DEFAULT_CACHE):
+        self.path = pathlib.Path(path)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # saves run one at a time, so a newer snapshot is never overwritten
+        self._dirty = False
+        self._entries: dict[str, list] = {}
+        if self.path.exists():
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8")).get("entries", {})
+            except (ValueError, OSError):
+                self._entries = {}
+
+    @staticmethod
+    def _key(path, kind: str = "") -> str:
+        return os.path.abspath(path) + (f"#{kind}" if kind else "")
+
+    def get(self, path, st: os.stat_result, kind: str = ""):
+        with self._lock:
+            e = self._entries.get(self._key(path, kind))
+        if e and e[0] == st.st_ino and e[1] == st.st_size and e[2] == st.st_mtime_ns:
+            return e[3]
+        return None
+
+    def put(self, path, st: os.stat_result, digest, kind: str = "") -> None:
+        with self._lock:
+            self._entries[self._key(path, kind)] = [st.st_ino, st.st_size, st.st_mtime_ns, digest]
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty: return
+                data = json.dumps({"version": 1, "entries": self._entries}, sort_keys=True)
+                self._dirty = False
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.path.parent,
+                                                 prefix=self.path.name + ".", suffix=".tmp", delete=False) as f:
+                    f.write(data)
+                os.replace(f.name, self.path)
+            except BaseException:
+                with self._lock: self._dirty = True
+                raise
+
+_shared: Optional[DigestCache] = None
+_shared_lock = threading.Lock()
+
+def default_cache() -> Optional[DigestCache]:
+    """Process-wide cache, or None when FABRIC_DIGEST_CACHE is off/0/none.
+
+    Batch helpers (hash_files and friends) save it when they finish; anything
+    left unsaved, e.g. by single hash_file calls, is saved at exit.
+    """
+    global _shared
+    env = os.getenv("FABRIC_DIGEST_CACHE", "")
+    if env.lower() in ("off", "0", "none"): return None
+    with _shared_lock:
+        if _shared is None:
+            _shared = DigestCache(env or DEFAULT_CACHE); atexit.register(_save_at_exit, _shared)
+        return _shared
+
+def _save_at_exit(cache: DigestCache) -> None:
+    try:
+        cache.save()
+    except OSError:
+        pass  # a cache; the next run re-hashes
+
+def hash_file(path, cache: Optional[DigestCache] = None) -> tuple[int, str]:
+    """(size, sha256 hex) for path, served from cache when the stat matches."""
+    st = os.stat(path)
+    if cache is not None:
+        hit = cache.get(path, st)
+        if hit: return st.st_size, hit
+    size, digest = sha256_stream(path)
+    if cache is not None:
+        # only cache if the file did not change underneath us while reading
+        st2 = os.stat(path)
+        if st2.st_size == st.st_size == size and st2.st_mtime_ns == st.st_mtime_ns:
+            cache.put(path, st2, digest)
+    return size, digest
+
+def md5_file(path, cache: Optional[DigestCache] = None) -> tuple[int, str]:
+    """(size, md5 hex) for path, cached like hash_file under kind "md5"."""
+    st = os.stat(path)
+    if cache is not None:
+        hit = cache.get(path, st, "md5")
+        if hit: return st.st_size, hit
+    h = hashlib.md5(); n = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            n += len(chunk); h.update(chunk)
+    if cache is not None:
+        st2 = os.stat(path)
+        if st2.st_size == st.st_size == n and st2.st_mtime_ns == st.st_mtime_ns:
+            cache.put(path, st2, h.hexdigest(), "md5")
+    return n, h.hexdigest()
+
+def md5_files(paths: Iterable, workers: Optional[int] = None,
+              cache: Optional[DigestCache] = None, save: bool = True) -> list[tuple[int, str]]:
+    """md5_file over many paths on a thread pool; results keep input order."""
+    try:
+        return [r for _, r in _iter_ordered(lambda p: md5_file(p, cache), list(paths), workers, None)]
+    finally:
+        if cache is not None and save: cache.save()
+
+def hash_files(paths: Iterable, workers: Optional[int] = None,
+               cache: Optional[DigestCache] = None, save: bool = True) -> list[tuple[int, str]]:
+    """Hash many files on a thread pool (hashlib releases the GIL); results keep input order."""
+    paths = list(paths)
+    if not paths: return []
+    workers = min(workers or default_workers(), len(paths))
+    try:
+        if workers == 1:
+            return [hash_file(p, cache) for p in paths]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash") as ex:
+            return list(ex.map(lambda p: hash_file(p, cache), paths))
+    finally:
+        if cache is not None and save: cache.save()
+
+def _iter_ordered(fn: Callable, paths: Iterable, workers: Optional[int], window: Optional[int]) -> Iterator:
+    """Yield (path, fn(path)) in input order with at most window calls queued or in flight."""
+    workers = workers or default_workers()
+    window = window or 4 * workers
+    if workers == 1:
+        for p in paths: yield p, fn(p)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash") as ex:
+        pending = deque()
+        for p in paths:
+            pending.append((p, ex.submit(fn, p)))
+            if len(pending) >= window:
+                q, fut = pending.popleft(); yield q, fut.result()
+        while pending:
+            q, fut = pending.popleft(); yield q, fut.result()
+
+def iter_hash_files(paths: Iterable, workers: Optional[int] = None, cache: Optional[DigestCache] = None,
+                    save: bool = True, window: Optional[int] = None) -> Iterator[tuple[object, int, str]]:
+    """Streaming hash_files: yields (path, size, sha256) in input order.
+
+    paths may be a lazy iterator (e.g. a directory walk); at most window
+    files are queued or in flight, so memory stays flat on huge trees.
+    """
+    try:
+        for p, (size, digest) in _iter_ordered(lambda p: hash_file(p, cache), paths, workers, window):
+            yield p, size, digest
+    finally:
+        if cache is not None and save: cache.save()
+
+def _hash_range(mm: mmap.mmap, off: int, length: int) -> str:
+    with memoryview(mm) as whole, whole[off:off + length] as view:
+        return hashlib.sha256(view).hexdigest()
+
+def _chunk_pass(path, chunk_size: int, workers: Optional[int], only: Optional[Iterable[int]],
+                whole: bool) -> tuple[int, list[Optional[str]], Optional[str]]:
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            empty = hashlib.sha256(b"").hexdigest(); return 0, [empty], empty if whole else None
+        n = -(-size // chunk_size)
+        todo = list(range(n)) if only is None else sorted({i for i in only if 0 <= i < n})
+        got = {}; digest = None
+        if todo or whole:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                fn = lambda i: _hash_range(mm, i * chunk_size, min(chunk_size, size - i * chunk_size))
+                with ThreadPoolExecutor(max_workers=min(workers or default_workers(), max(1, len(todo))) + (1 if whole else 0),
+                                        thread_name_prefix="chunk") as ex:
+                    # the whole-file sha256 is one sequential stream beside the chunk workers
+                    fut = ex.submit(_hash_range, mm, 0, size) if whole else None
+                    got = dict(zip(todo, ex.map(fn, todo)))
+                    if fut is not None: digest = fut.result()
+    return size, [got.get(i) for i in range(n)], digest
+
+def chunk_digests(path, chunk_size: int = TREE_CHUNK, workers: Optional[int] = None,
+                  only: Optional[Iterable[int]] = None) -> tuple[int, list[Optional[str]]]:
+    """(size, sha256 of every chunk_size range) hashed in parallel over an mmap.
+
+    only= restricts hashing to those chunk numbers; the others come back as None.
+    """
+    size, chunks, _ = _chunk_pass(path, chunk_size, workers, only, False)
+    return size, chunks
+
+def tree_digest(path, chunk_size: int = TREE_CHUNK, cache: Optional[DigestCache] = None,
+                workers: Optional[int] = None) -> tuple[int, list[str]]:
+    """(size, chunk digests) for path, served from cache when the stat matches."""
+    kind = f"tree{chunk_size}"; st = os.stat(path)
+    if cache is not None:
+        hit = cache.get(path, st, kind)
+        if hit: return st.st_size, hit
+    size, chunks = chunk_digests(path, chunk_size, workers)
+    if cache is not None:
+        st2 = os.stat(path)
+        if st2.st_size == st.st_size == size and st2.st_mtime_ns == st.st_mtime_ns:
+            cache.put(path, st2, chunks, kind)
+    return size, chunks
+
+def tree_and_sha256(path, chunk_size: int = TREE_CHUNK, cache: Optional[DigestCache] = None,
+                    workers: Optional[int] = None) -> tuple[int, list[str], str]:
+    """(size, chunk digests, whole-file sha256) from one mmap pass; either half may come from cache."""
+    kind = f"tree{chunk_size}"; st = os.stat(path)
+    chunks = cache.get(path, st, kind) if cache is not None else None
+    digest = cache.get(path, st) if cache is not None else None
+    if chunks and digest: return st.st_size, chunks, digest
+    if chunks:
+        size, digest = hash_file(path, cache); return size, chunks, digest
+    if digest: return (*tree_digest(path, chunk_size, cache, workers), digest)
+    size, chunks, digest = _chunk_pass(path, chunk_size, workers, None, True)
+    if cache is not None:
+        st2 = os.stat(path)
+        if st2.st_size == st.st_size == size and st2.st_mtime_ns == st.st_mtime_ns:
+            cache.put(path, st2, chunks, kind); cache.put(path, st2, digest)
+    return size, chunks, digest
+
+def digest_entry(path, cache: Optional[DigestCache] = None, chunk_size: Optional[int] = None) -> dict:
+    """files[] fields for path: {"bytes", "sha256"}, plus a chunk tree when chunk_size is set and the file is larger."""
+    if chunk_size and os.stat(path).st_size > chunk_size:
+        size, chunks, digest = tree_and_sha256(path, chunk_size, cache)
+        return {"bytes": size, "sha256": digest,
+                TREE_SCHEME: {"chunk_size": chunk_size, "root": merkle_root(chunks), "chunks": chunks}}
+    size, digest = hash_file(path, cache)
+    return {"bytes": size, "sha256": digest}
+
+def iter_digest_entries(paths: Iterable, workers: Optional[int] = None, cache: Optional[DigestCache] = None,
+                        chunk_size: Optional[int] = None, save: bool = True,
+                        window: Optional[int] = None) -> Iterator[tuple[object, dict]]:
+    """Streaming digest_entry over many paths: yields (path, fields) in input order."""
+    try:
+        yield from _iter_ordered(lambda p: digest_entry(p, cache, chunk_size), paths, workers, window)
+    finally:
+        if cache is not None and save: cache.save()
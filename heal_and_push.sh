@@ -52,7 +52,7 @@ for f in STORY.md STORY_Parchment.pdf STORY_Archive.pdf CHECKSUMS.txt; do
 done
 if [ ${#FILES[@]} -eq 0 ]; then
   echo "# The Fabric Story" > STORY.md
-  echo "SHA256(STORY.md) = $(sha256sum STORY.md | cut -d' ' -f1)" > CHECKSUMS.txt
+  python3 artifact_verify.py write CHECKSUMS.txt STORY.md
   FILES=(--file STORY.md --file CHECKSUMS.txt)
 fi
 
@@ -64,6 +64,7 @@ python3 chain/chain_verify.py
 
 # 9) Commit and push
 git add chain/CHAIN.jsonl chain/pubkeys.json chain/.gitignore STORY.md CHECKSUMS.txt || true
+[ -f chain/SIGS.jsonl ] && git add chain/SIGS.jsonl || true
 git commit -m "chore(chain): (re)create genesis and verify" || echo "[i] Nothing to commit."
 git pull --rebase origin main || true
 git push
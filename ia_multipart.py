@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# MIT License
+"""Parallel multipart uploads to the Internet Archive's S3-compatible API.
+
+Large files are split into fixed-size parts that upload concurrently; each
+part carries a Content-MD5, its returned ETag is checked, and a failed part is
+retried on its own. Part progress can be persisted (see on_part) so a rerun
+resumes an unfinished upload instead of restarting the file.
+
+IA_S3_URL overrides the endpoint, e.g. for mock_services.MockIAS3.
+"""
+from __future__ import annotations
+import os, base64, hashlib, logging, urllib.parse
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+import requests
+from upload_journal import retry_with_backoff
+
+log = logging.getLogger("testament.uploader")
+
+IA_S3_URL = "https://s3.us.archive.org"
+DEFAULT_THRESHOLD = 256 << 20
+DEFAULT_PART_SIZE = 64 << 20
+DEFAULT_PART_WORKERS = 4
+MIN_PART_SIZE = 5 << 20  # S3 rule for every part but the last
+
+def s3_endpoint() -> str:
+    return os.getenv("IA_S3_URL", IA_S3_URL).rstrip("/")
+
+def s3_session(access_key: str, secret_key: str, pool_size: int = DEFAULT_PART_WORKERS) -> requests.Session:
+    s = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    s.mount("https://", adapter); s.mount("http://", adapter)
+    s.headers["Authorization"] = f"LOW {access_key}:{secret_key}"
+    return s
+
+def _header_value(v) -> str:
+    v = str(v)
+    # header values must be printable ASCII; IA decodes uri(...) values
+    if v.isascii() and v.isprintable(): return v
+    return f"uri({urllib.parse.quote(v, safe='')})"
+
+def meta_headers(md_ia: Dict) -> Dict[str, str]:
+    """x-archive-meta-* headers for an IA metadata dict (lists become meta01-, meta02-...)."""
+    h = {"x-amz-auto-make-bucket": "1", "x-archive-queue-derive": "0"}
+    for k, v in md_ia.items():
+        if v is None: continue
+        if isinstance(v, (list, tuple)):
+            for i, item in enumerate(v, start=1):
+                h[f"x-archive-meta{i:02d}-{k}"] = _header_value(item)
+        else:
+            h[f"x-archive-meta-{k}"] = _header_value(v)
+    return h
+
+def _md5_b64(data: bytes) -> tuple[str, str]:
+    d = hashlib.md5(data).digest()
+    return base64.b64encode(d).decode(), d.hex()
+
+def _check(r: requests.Response, what: str) -> requests.Response:
+    if not r.ok:
+        raise RuntimeError(f"{what}: status={r.status_code} {r.text[:200]}")
+    return r
+
+def _xml_text(body: bytes, tag: str) -> Optional[str]:
+    for el in ET.fromstring(body).iter():
+        if el.tag.rsplit("}", 1)[-1] == tag: return el.text
+    return None
+
+def put_object(session: requests.Session, identifier: str, name: str, body, md_ia: Dict) -> str:
+    """Single streamed PUT of body (file-like with len()) as identifier/name; returns the ETag."""
+    url = f"{s3_endpoint()}/{identifier}/{urllib.parse.quote(name)}"
+    r = _check(session.put(url, data=body, headers={**meta_headers(md_ia), "Content-Length": str(len(body))}),
+               f"IA upload of {name}")
+    return r.headers.get("ETag", "").strip('"')
+
+def multipart_upload(session: requests.Session, identifier: str, path: str, md_ia: Dict,
+                     part_size: int = DEFAULT_PART_SIZE, workers: int = DEFAULT_PART_WORKERS,
+                     retries: int = 5, state: Optional[Dict] = None,
+                     on_part: Optional[Callable[[Dict], None]] = None,
+                     progress: Optional[Callable[[int], None]] = None) -> str:
+    """Upload path as identifier/<basename> in parts; returns the final ETag.
+
+    state (upload_id, part_size, parts {n: etag}) from an earlier attempt is
+    resumed; on_part receives the updated state after every finished part.
+    """
+    part_size = max(part_size, MIN_PART_SIZE)
+    size = os.path.getsize(path)
+    key = urllib.parse.quote(os.path.basename(path))
+    url = f"{s3_endpoint()}/{identifier}/{key}"
+    nparts = max(1, -(-size // part_size))
+
+    state = dict(state or {})
+    if state.get("upload_id") and state.get("part_size") == part_size:
+        r = session.get(url, params={"uploadId": state["upload_id"]})
+        if not r.ok:
+            log.warning(f"IA: multipart {state['upload_id']} for {key} is gone; starting over"); state = {}
+    else:
+        state = {}
+    if not state:
+        r = _check(session.post(url, params={"uploads": ""}, headers=meta_headers(md_ia)),
+                   f"IA multipart init for {key}")
+        state = {"upload_id": _xml_text(r.content, "UploadId"), "part_size": part_size, "parts": {}}
+        if on_part: on_part(dict(state))
+    parts: Dict[str, str] = dict(state.get("parts", {}))
+    upload_id = state["upload_id"]
+
+    def send(n: int) -> None:
+        if progress: progress(0)  # lets the caller abort (raise) before another part goes out
+        with open(path, "rb") as f:
+            f.seek((n - 1) * part_size); data = f.read(part_size)
+        md5_b64, md5_hex = _md5_b64(data)
+        def put():
+            r = _check(session.put(url, params={"partNumber": n, "uploadId": upload_id}, data=data,
+                                   headers={"Content-MD5": md5_b64}), f"IA part {n}/{nparts} of {key}")
+            etag = r.headers.get("ETag", "").strip('"')
+            if etag and etag != md5_hex:
+                raise RuntimeError(f"IA part {n} of {key}: ETag {etag} != md5 {md5_hex}")
+        retry_with_backoff(put, retries, what=f"IA part {n}/{nparts} of {key}", target="internet_archive")
+        parts[str(n)] = md5_hex
+        if on_part: on_part({"upload_id": upload_id, "part_size": part_size, "parts": dict(parts)})
+        if progress: progress(len(data))
+
+    todo = [n for n in range(1, nparts + 1) if str(n) not in parts]
+    if progress and len(todo) < nparts:
+        progress(sum(min(part_size, size - (n - 1) * part_size) for n in range(1, nparts + 1) if str(n) in parts))
+    if workers > 1 and len(todo) > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ia-part") as ex:
+            list(ex.map(send, todo))
+    else:
+        for n in todo: send(n)
+
+    body = "<CompleteMultipartUpload>" + "".join(
+        f"<Part><PartNumber>{n}</PartNumber><ETag>\"{parts[str(n)]}\"</ETag></Part>"
+        for n in range(1, nparts + 1)) + "</CompleteMultipartUpload>"
+    r = _check(session.post(url, params={"uploadId": upload_id}, data=body.encode(),
+                            headers={"Content-Type": "application/xml"}), f"IA multipart complete for {key}")
+    # S3 may report errors inside a 200 response
+    if _xml_text(r.content, "Code"):
+        raise RuntimeError(f"IA multipart complete for {key}: {_xml_text(r.content, 'Message')}")
+    # S3-style multipart ETag: md5 of the concatenated part md5s, suffixed with the part count
+    expect = hashlib.md5(b"".join(bytes.fromhex(parts[str(n)]) for n in range(1, nparts + 1))).hexdigest()
+    etag = (_xml_text(r.content, "ETag") or "").strip('"')
+    if "-" in etag and etag != f"{expect}-{nparts}":
+        raise RuntimeError(f"IA multipart complete for {key}: ETag {etag} != {expect}-{nparts}")
+    return etag or f"{expect}-{nparts}"
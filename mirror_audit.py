@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# MIT License
+"""Check the archived copies of ledger files against the sha256s in CHAIN.jsonl.
+
+Every file of the selected blocks (the latest entry per name, which is how
+uploader_core names uploads) is streamed from each mirror over a bounded
+pool of keep-alive connections and hashed as it arrives; nothing is written
+to disk. A response cut short is resumed with a Range request from the last
+byte received, so a multi-GB file survives a flaky link. Files recorded as a
+sha256_tree are fetched as parallel chunk ranges, and a mismatch names the
+chunks that differ. Bundle members are skipped; the tar itself is checked.
+
+Mirrors: --ia IDENTIFIER (archive.org downloads, IA_DOWNLOAD_URL overrides),
+--zenodo RECORD (records API, ZENODO_API_URL overrides) and --mirror URL (any
+server; a {name} in the URL is replaced, otherwise the name is appended).
+
+    python mirror_audit.py --ia fabric-testament-316 --zenodo 123456 [--from 10 --to 20] [--report -]
+    python mock_services.py mirror --root DIR --port 8767   # then --mirror http://127.0.0.1:8767
+"""
+from __future__ import annotations
+import os, sys, json, time, random, hashlib, pathlib, argparse, threading, urllib.parse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Iterator, Optional
+import requests
+from chain_index import ChainIndex, ledger_exists, scan_ledger
+from chain_merkle import TREE_SCHEME
+import telemetry
+
+ROOT = pathlib.Path(__file__).resolve().parent
+LEDGER = ROOT / "chain" / "CHAIN.jsonl"
+IA_DOWNLOAD_URL = "https://archive.org/download"
+CHUNK = 64 << 10  # read size: a dropped connection loses the partial read, so resumes start at most this far back
+CONNECTIONS = 8
+ATTEMPTS = 4
+TIMEOUT = 60.0
+SEVERITY = {"ok": 0, "digest": 1, "chunks": 1, "error": 2, "size": 3, "missing": 4}
+
+def download_endpoint() -> str:
+    return os.getenv("IA_DOWNLOAD_URL", IA_DOWNLOAD_URL).rstrip("/")
+
+def ia_mirror(identifier: str) -> tuple[str, str]:
+    return f"ia:{identifier}", f"{download_endpoint()}/{identifier}/{{name}}"
+
+def zenodo_mirror(record: str, api: str) -> tuple[str, str]:
+    return f"zenodo:{record}", f"{api}/records/{record}/files/{{name}}/content"
+
+def url_mirror(url: str) -> tuple[str, str]:
+    return url, url if "{name}" in url else url.rstrip("/") + "/{name}"
+
+def select_blocks(ledger: pathlib.Path, lo: Optional[int] = None, hi: Optional[int] = None) -> Iterator[dict]:
+    """Blocks lo..hi (inclusive, either end open); a range start is found through the index, not a scan."""
+    if lo is None:
+        for _, _, b in scan_ledger(ledger):
+            if hi is not None and b["index"] > hi: return
+            yield b
+        return
+    cix = ChainIndex(ledger).open(); pos = cix.find(lo)
+    if pos is None: raise ValueError(f"block {lo} not found")
+    off = cix.entry(pos)[0]
+    for _ in range(pos, len(cix)):
+        b, off = cix.read_at(off)
+        if hi is not None and b["index"] > hi: return
+        yield b
+
+def mirror_entries(blocks: Iterable[dict]) -> list[dict]:
+    """Latest recorded entry per uploaded name in blocks."""
+    latest: dict[str, dict] = {}
+    for b in blocks:
+        for fi in b["files"]:
+            if "in_bundle" in fi: continue  # only the tar was uploaded
+            name = os.path.basename(fi["path"])
+            e = {"name": name, "bytes": fi["bytes"], "sha256": fi.get("sha256"), "source": f"block {b['index']}"}
+            if TREE_SCHEME in fi:
+                t = fi[TREE_SCHEME]; e.update(chunk_size=t["chunk_size"], chunks=t["chunks"])
+            latest[name] = e
+    return list(latest.values())
+
+def audit_session(connections: int = CONNECTIONS) -> requests.Session:
+    s = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(1, connections))
+    s.mount("https://", adapter); s.mount("http://", adapter)
+    s.headers["Accept-Encoding"] = "identity"  # hash the stored bytes, and keep ranges meaningful
+    return s
+
+def _content_range(v: Optional[str]) -> tuple[Optional[int], Optional[int]]:
+    """(first byte, total size) of a Content-Range header: "bytes 0-99/1234" or "bytes */1234"."""
+    if not v or not v.startswith("bytes "): return None, None
+    span, _, total = v[6:].partition("/")
+    return None if span == "*" else int(span.split("-")[0]), None if total in ("", "*") else int(total)
+
+def fetch(session: requests.Session, url: str, expect: Optional[int] = None, offset: int = 0,
+          length: Optional[int] = None, attempts: int = ATTEMPTS, timeout: float = TIMEOUT,
+          on_bytes: Optional[Callable[[int], None]] = None) -> dict:
+    """Stream url (or its bytes offset..offset+length-1) through sha256, resuming cut-off responses.
+
+    {"status": "ok" | "missing" | "size" | "error", "bytes", "sha256", "resumes", "seconds"}, plus
+    actual_bytes or error where they apply. expect is the whole file's size; a server reporting
+    another size fails with "size" before the body is read. attempts counts failures in a row
+    without progress.
+    """
+    t0 = time.monotonic(); h = hashlib.sha256(); got = 0; resumes = 0; failures = 0
+    def result(status: str, **kw) -> dict:
+        return {"status": status, "bytes": got, "sha256": h.hexdigest(), "resumes": resumes,
+                "seconds": round(time.monotonic() - t0, 6), **kw}
+    while True:
+        pos = offset + got; before = got; skip = 0; headers = {}
+        if pos or length is not None:
+            headers["Range"] = f"bytes={pos}-" + ("" if length is None else str(offset + length - 1))
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                if r.status_code == 404: return result("missing")
+                if r.status_code == 416: return result("size", actual_bytes=_content_range(r.headers.get("Content-Range"))[1])
+                if 400 <= r.status_code < 500: return result("error", error=f"HTTP {r.status_code}")
+                r.raise_for_status()
+                if r.status_code == 206:
+                    first, total = _content_range(r.headers.get("Content-Range"))
+                    if first != pos: raise IOError(f"asked for byte {pos}, got {first}")
+                else:  # the server ignored Range: start over from its first byte
+                    total = int(r.headers["Content-Length"]) if "Content-Length" in r.headers else None
+                    h = hashlib.sha256(); got = before = 0; skip = offset
+                if expect is not None and total is not None and total != expect:
+                    return result("size", actual_bytes=total)
+                want = length if length is not None else (None if total is None else total - offset)
+                for c in r.iter_content(CHUNK):
+                    if skip:
+                        n = min(skip, len(c)); c = c[n:]; skip -= n
+                    if want is not None: c = c[:want - got]
+                    if c:
+                        h.update(c); got += len(c)
+                        if on_bytes is not None: on_bytes(len(c))
+                    if want is not None and got >= want: break
+                if want is None or got >= want: return result("ok")
+                raise IOError(f"response ended at byte {offset + got} of {offset + want}")
+        except (requests.RequestException, OSError) as e:
+            failures = 0 if got > before else failures + 1
+            if failures >= attempts: return result("error", error=str(e))
+            if got: resumes += 1
+            telemetry.count("retries", target="mirror")
+            time.sleep(random.uniform(0, min(30.0, 0.5 * 2 ** failures)))
+
+def _jobs(entries: list[dict], mirrors: list[tuple[str, str]]) -> Iterator[tuple]:
+    for label, template in mirrors:
+        for e in entries:
+            url = template.replace("{name}", urllib.parse.quote(e["name"]))
+            if len(e.get("chunks", ())) > 1:
+                cs = e["chunk_size"]
+                for i in range(len(e["chunks"])): yield label, e, url, i, i * cs, min(cs, e["bytes"] - i * cs)
+            else: yield label, e, url, None, 0, None
+
+def _bounded(fn: Callable, jobs: Iterable, workers: int) -> Iterator[tuple]:
+    """(job, fn(job)) in completion order, with at most 2 * workers jobs submitted at a time."""
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mirror") as ex:
+        pending = {}
+        for job in jobs:
+            pending[ex.submit(fn, job)] = job
+            if len(pending) < 2 * workers: continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done: yield pending.pop(f), f.result()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done: yield pending.pop(f), f.result()
+
+@telemetry.traced("mirror_audit")
+def audit(entries: Iterable[dict], mirrors: list[tuple[str, str]], connections: int = CONNECTIONS,
+          attempts: int = ATTEMPTS, timeout: float = TIMEOUT, session: Optional[requests.Session] = None) -> dict:
+    """Report dict: ok, checked, failed, throughput figures and one files[] row per (mirror, file)."""
+    t0 = time.monotonic(); entries = list(entries); connections = max(1, connections)
+    session = session or audit_session(connections)
+    mu = threading.Lock(); fetched = [0]
+    def on_bytes(n: int) -> None:
+        with mu: fetched[0] += n
+    def run(job) -> dict:
+        _, e, url, _, off, length = job
+        return fetch(session, url, e["bytes"], off, length, attempts, timeout, on_bytes)
+    rows: dict[tuple[str, str], dict] = {}
+    for (label, e, url, chunk, off, length), res in _bounded(run, _jobs(entries, mirrors), connections):
+        row = rows.setdefault((label, e["name"]), {"mirror": label, "name": e["name"], "source": e["source"],
+                                                   "url": url, "bytes": e["bytes"], "status": "ok",
+                                                   "fetched": 0, "seconds": 0.0, "resumes": 0})
+        row["fetched"] += res["bytes"]; row["seconds"] += res["seconds"]; row["resumes"] += res["resumes"]
+        status = res["status"]
+        if status == "ok" and chunk is None and res["sha256"] != e["sha256"]:
+            status = "digest"; row["actual_sha256"] = res["sha256"]
+        elif status == "ok" and chunk is not None and res["sha256"] != e["chunks"][chunk]:
+            status = "chunks"; row.setdefault("bad_chunks", []).append({"chunk": chunk, "offset": off, "length": length})
+        if SEVERITY[status] > SEVERITY[row["status"]]:
+            row["status"] = status
+            for k in ("actual_bytes", "error"):
+                if k in res: row[k] = res[k]
+    files = sorted(rows.values(), key=lambda r: (r["mirror"], r["name"]))
+    for r in files:
+        r["seconds"] = round(r["seconds"], 3); r["mib_s"] = round(r["fetched"] / 2**20 / max(r["seconds"], 1e-9), 2)
+        if "bad_chunks" in r: r["bad_chunks"].sort(key=lambda c: c["chunk"])
+    per_mirror = {label: {"files": 0, "failed": 0, "bytes": 0} for label, _ in mirrors}
+    for r in files:
+        m = per_mirror[r["mirror"]]; m["files"] += 1; m["failed"] += r["status"] != "ok"; m["bytes"] += r["fetched"]
+    failed = sum(r["status"] != "ok" for r in files)
+    elapsed = max(time.monotonic() - t0, 1e-9)
+    telemetry.count("mirror_bytes_fetched", fetched[0]); telemetry.count("mirror_mismatches", failed)
+    return {"ok": not failed, "checked": len(files), "failed": failed, "connections": connections,
+            "bytes_fetched": fetched[0], "elapsed_s": round(elapsed, 3),
+            "mib_s": round(fetched[0] / 2**20 / elapsed, 2), "files_per_s": round(len(files) / elapsed, 1),
+            "mirrors": per_mirror, "files": files}
+
+def print_report(report: dict, dest: Optional[str] = None, verbose: bool = False) -> None:
+    """One line per failed copy (every copy with verbose), plus the full JSON report to dest ("-": stdout)."""
+    out = sys.stderr if dest == "-" else sys.stdout
+    for f in report["files"]:
+        where = f"{f['name']} on {f['mirror']} ({f['source']})"
+        if f["status"] == "ok":
+            if verbose: print(f"[✓] {where}: {f['fetched'] / 2**20:.1f} MiB at {f['mib_s']} MiB/s", file=out)
+        elif f["status"] == "missing": print(f"[!] missing: {where}", file=out)
+        elif f["status"] == "size":
+            print(f"[!] size mismatch: {where} is {f.get('actual_bytes')} bytes, expected {f['bytes']}", file=out)
+        elif f["status"] == "chunks":
+            spans = ", ".join(f"{c['chunk']} @ {c['offset']}" for c in f["bad_chunks"])
+            print(f"[!] chunk mismatch: {where} — chunk(s) {spans}", file=out)
+        elif f["status"] == "error": print(f"[!] fetch failed: {where}: {f['error']}", file=out)
+        else: print(f"[!] sha256 mismatch: {where}", file=out)
+    if dest == "-":
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    elif dest:
+        pathlib.Path(dest).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+def summary(report: dict) -> str:
+    speed = (f"{report['bytes_fetched'] / 2**20:.1f} MiB in {report['elapsed_s']:.1f}s, "
+             f"{report['mib_s']} MiB/s, {report['files_per_s']} files/s")
+    if report["ok"]: return f"[✓] {report['checked']} archived cop(ies) match ({speed})"
+    return f"[x] {report['failed']} of {report['checked']} archived cop(ies) do not match ({speed})"
+
+def main():
+    ap = argparse.ArgumentParser(description="Check archived copies of ledger files against their sha256")
+    ap.add_argument("--ledger", default=str(LEDGER))
+    ap.add_argument("--index", type=int, help="Audit this block only")
+    ap.add_argument("--from", dest="lo", type=int, help="First block of the range")
+    ap.add_argument("--to", dest="hi", type=int, help="Last block of the range")
+    ap.add_argument("--ia", action="append", default=[], metavar="IDENTIFIER", help="Internet Archive item")
+    ap.add_argument("--zenodo", action="append", default=[], metavar="RECORD", help="Zenodo record id")
+    ap.add_argument("--zenodo-sandbox", action="store_true", help="Records are on sandbox.zenodo.org")
+    ap.add_argument("--mirror", action="append", default=[], metavar="URL", help="Any server holding the files")
+    ap.add_argument("--connections", type=int, default=CONNECTIONS, help="Concurrent downloads")
+    ap.add_argument("--attempts", type=int, default=ATTEMPTS, help="Failures in a row (without progress) per file")
+    ap.add_argument("--timeout", type=float, default=TIMEOUT, help="Seconds without data before a retry")
+    ap.add_argument("--report", help="Write the JSON report here ('-' for stdout)")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Also list the copies that match")
+    args = ap.parse_args()
+    if args.index is not None: args.lo = args.hi = args.index
+
+    mirrors = [ia_mirror(i) for i in args.ia] + [url_mirror(u) for u in args.mirror]
+    if args.zenodo:
+        from uploader_core import _zenodo_api  # the uploader's endpoint rules, ZENODO_API_URL included
+        mirrors += [zenodo_mirror(r, _zenodo_api(args.zenodo_sandbox)) for r in args.zenodo]
+    if not mirrors: ap.error("give at least one --ia, --zenodo or --mirror")
+    ledger = pathlib.Path(args.ledger)
+    if not ledger_exists(ledger): print(f"[!] No ledger at {ledger}", file=sys.stderr); sys.exit(1)
+    try:
+        entries = mirror_entries(select_blocks(ledger, args.lo, args.hi))
+    except ValueError as e:
+        print(f"[!] {e}", file=sys.stderr); sys.exit(1)
+    if not entries: print("[!] No files in the selected blocks", file=sys.stderr); sys.exit(1)
+    report = audit(entries, mirrors, args.connections, args.attempts, args.timeout)
+    print_report(report, args.report, args.verbose)
+    print(summary(report), file=sys.stderr if args.report == "-" else sys.stdout)
+    sys.exit(0 if report["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# MIT License
+"""Local stand-ins for the archive services, for offline tests and benchmarks.
+
+    python mock_services.py zenodo --port 8765
+    ZENODO_API_URL=http://127.0.0.1:8765/api ZENODO_TOKEN=x python uploader_cli.py ...
+    python mock_services.py ia-s3 --port 8766   # then IA_S3_URL=http://127.0.0.1:8766
+                                                # and IA_METADATA_URL=http://127.0.0.1:8766/metadata
+    python mock_services.py mirror --root DIR --port 8767   # mirror_audit.py --mirror http://127.0.0.1:8767
+
+Uploaded bodies are hashed and counted, never kept in memory, so multi-GB
+benchmarks are fine. Failure injection (fail_uploads=N) answers the next N
+file uploads with 503 to exercise the retry paths; MockMirror's drops=N cuts
+the next N downloads short to exercise resumes. connect_delay, latency
+and per-stream throttle (bytes/s) make a loopback server behave enough like
+a WAN link for connection reuse and parallel uploads to show in benchmarks.
+"""
+from __future__ import annotations
+import re, sys, json, time, uuid, email, base64, hashlib, pathlib, argparse, itertools, tempfile, threading, urllib.parse
+import xml.etree.ElementTree as ET
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Iterator, Optional
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled sessions reuse connections
+    disable_nagle_algorithm = True  # headers and body go out as separate writes; no delayed-ACK stalls
+
+    def log_message(self, *a):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.service.lock: self.server.service.connections += 1
+        delay = self.server.service.connect_delay
+        if delay: time.sleep(delay)  # paid once per TCP connection, like a TLS handshake
+
+    def iter_body(self, size: int = 1 << 16) -> Iterator[bytes]:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                n = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if n == 0:
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""): pass
+                    return
+                left = n
+                while left:
+                    chunk = self.rfile.read(min(size, left)); left -= len(chunk)
+                    if not chunk: return
+                    yield chunk
+                self.rfile.readline()
+        left = int(self.headers.get("Content-Length") or 0)
+        throttle = self.server.service.throttle
+        while left > 0:
+            chunk = self.rfile.read(min(size, left))
+            if not chunk: return
+            left -= len(chunk)
+            if throttle: time.sleep(len(chunk) / throttle)
+            yield chunk
+
+    def body(self) -> bytes:
+        return b"".join(self.iter_body())
+
+    def send(self, code: int, obj=None, raw: Optional[bytes] = None, ctype: str = "application/json",
+             headers: Optional[dict] = None) -> None:
+        data = raw if raw is not None else (b"" if obj is None else json.dumps(obj).encode())
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD": self.wfile.write(data)
+
+    def _dispatch(self):
+        try:
+            if self.server.service.latency: time.sleep(self.server.service.latency)
+            self.server.service.handle(self)
+        except BrokenPipeError:
+            pass
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _dispatch
+
+class Service:
+    """Base for stand-ins: subclasses implement handle(req)."""
+    def __init__(self, connect_delay: float = 0.0, latency: float = 0.0, throttle: float = 0.0):
+        self.lock = threading.Lock()
+        self.base = ""
+        self.calls: list[tuple[str, str]] = []
+        self.connections = 0
+        self.connect_delay = connect_delay; self.latency = latency; self.throttle = throttle
+
+    def handle(self, req: _Handler) -> None:
+        raise NotImplementedError
+
+def serve(service: Service, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start service on a daemon thread; service.base holds its http://host:port."""
+    srv = ThreadingHTTPServer((host, port), _Handler)
+    srv.daemon_threads = True
+    srv.service = service
+    service.base = f"http://{host}:{srv.server_address[1]}"
+    threading.Thread(target=srv.serve_forever, daemon=True, name="mock-http").start()
+    return srv
+
+class MockZenodo(Service):
+    """Deposition API subset used by uploader_core.upload_to_zenodo (bucket PUTs and legacy multipart POSTs).
+
+    actions/newversion makes a draft holding the published deposition's files
+    (file DELETE removes them again); like Zenodo, publishing a version whose
+    files are identical to its parent's is refused.
+    """
+
+    def __init__(self, fail_uploads: int = 0, **link):
+        super().__init__(**link)
+        self.fail_uploads = fail_uploads
+        self.depositions: dict[int, dict] = {}
+        self.buckets: dict[str, dict] = {}
+        self._ids = itertools.count(1000)
+
+    @property
+    def api(self) -> str:
+        return self.base + "/api"
+
+    def _view(self, dep: dict) -> dict:
+        out = {k: v for k, v in dep.items() if not k.startswith("_")}
+        out["files"] = [{"id": f["id"], "filename": n, "filesize": f["bytes"], "checksum": f["md5"]}
+                        for n, f in dep["_files"].items()]
+        return out
+
+    def _create(self, concept: Optional[str] = None) -> dict:
+        """New draft deposition; the caller holds the lock."""
+        i = next(self._ids)
+        bucket = str(uuid.uuid4())
+        dep = {"id": i, "conceptrecid": concept or str(i), "submitted": False, "state": "unsubmitted",
+               "metadata": {}, "_files": {},
+               "links": {"html": f"{self.base}/deposit/{i}", "bucket": f"{self.api}/files/{bucket}"}}
+        self.depositions[i] = dep; self.buckets[bucket] = dep
+        return dep
+
+    def _store(self, dep: dict, name: str, chunks) -> dict:
+        md5 = hashlib.md5(); sha = hashlib.sha256(); n = 0
+        for c in chunks:
+            md5.update(c); sha.update(c); n += len(c)
+        entry = {"id": str(uuid.uuid4()), "bytes": n, "md5": md5.hexdigest(), "sha256": sha.hexdigest()}
+        with self.lock: dep["_files"][name] = entry
+        return entry
+
+    def _inject_failure(self, req: _Handler) -> bool:
+        with self.lock:
+            if self.fail_uploads <= 0: return False
+            self.fail_uploads -= 1
+        for _ in req.iter_body(): pass
+        req.send(503, {"message": "injected failure"})
+        return True
+
+    def _bucket_put(self, req: _Handler, bucket: str, name: str) -> None:
+        dep = self.buckets.get(bucket)
+        if dep is None or req.command != "PUT":
+            req.body(); return req.send(404 if dep is None else 405, {"message": "bad bucket request"})
+        if dep["submitted"]:
+            req.body(); return req.send(403, {"message": "deposition already published"})
+        if self._inject_failure(req): return
+        entry = self._store(dep, name, req.iter_body())
+        req.send(201, {"key": name, "size": entry["bytes"], "checksum": f"md5:{entry['md5']}"})
+
+    def handle(self, req: _Handler) -> None:
+        path = req.path.split("?")[0]
+        with self.lock: self.calls.append((req.command, path))
+        if not req.headers.get("Authorization", "").startswith("Bearer "):
+            return req.send(401, {"message": "missing token"})
+        b = re.fullmatch(r"/api/files/([0-9a-f-]+)/(.+)", path)
+        if b:
+            return self._bucket_put(req, b.group(1), urllib.parse.unquote(b.group(2)))
+        m = re.fullmatch(r"/api/deposit/depositions(?:/(\d+))?(/files(?:/([^/]+))?|/actions/(?:publish|newversion))?", path)
+        if not m:
+            return req.send(404, {"message": "not found"})
+        dep_id, sub, file_id = m.group(1), m.group(2), m.group(3)
+        if dep_id is None and req.command == "POST":
+            req.body()
+            with self.lock: dep = self._create()
+            return req.send(201, self._view(dep))
+        dep = self.depositions.get(int(dep_id)) if dep_id else None
+        if dep is None:
+            req.body(); return req.send(404, {"message": "deposition not found"})
+        if sub is None and req.command == "GET":
+            return req.send(200, self._view(dep))
+        if file_id is not None and req.command == "DELETE":
+            req.body()
+            if dep["submitted"]: return req.send(403, {"message": "deposition already published"})
+            with self.lock:
+                name = next((n for n, f in dep["_files"].items() if f["id"] == file_id), None)
+                if name is not None: del dep["_files"][name]
+            return req.send(404, {"message": "file not found"}) if name is None else req.send(204)
+        if sub == "/actions/newversion" and req.command == "POST":
+            req.body()
+            if not dep["submitted"]: return req.send(400, {"message": "deposition is not published"})
+            with self.lock:
+                draft = self.depositions.get(dep.get("_draft"))
+                if draft is None or draft["submitted"]:
+                    draft = self._create(dep["conceptrecid"]); draft["_parent"] = dep["id"]
+                    draft["_files"] = {n: dict(f, id=str(uuid.uuid4())) for n, f in dep["_files"].items()}
+                    dep["_draft"] = draft["id"]
+                dep["links"]["latest_draft"] = f"{self.api}/deposit/depositions/{draft['id']}"
+            return req.send(201, self._view(dep))
+        if sub is None and req.command == "PUT":
+            dep["metadata"] = json.loads(req.body() or b"{}").get("metadata", {})
+            return req.send(200, self._view(dep))
+        if sub == "/files" and req.command == "POST":
+            if self._inject_failure(req): return
+            raw = req.body()
+            msg = email.message_from_bytes(b"Content-Type: " + req.headers["Content-Type"].encode() + b"\r\n\r\n" + raw)
+            fields = {p.get_param("name", header="content-disposition"): p.get_payload(decode=True)
+                      for p in msg.get_payload()}
+            name = fields.get("name", b"").decode() or "file"
+            entry = self._store(dep, name, [fields.get("file", b"")])
+            return req.send(201, {"filename": name, "filesize": entry["bytes"], "checksum": entry["md5"]})
+        if sub == "/actions/publish" and req.command == "POST":
+            req.body()
+            parent = self.depositions.get(dep.get("_parent"))
+            if parent is not None and {n: f["md5"] for n, f in parent["_files"].items()} == \
+                    {n: f["md5"] for n, f in dep["_files"].items()}:
+                return req.send(400, {"message": "New version's files must differ from all previous versions."})
+            with self.lock:
+                dep.update(submitted=True, state="done", record_id=dep["id"], doi=f"10.5072/zenodo.{dep['id']}")
+                dep["links"]["record_html"] = f"{self.base}/records/{dep['id']}"
+            return req.send(202, self._view(dep))
+        req.send(405, {"message": "method not allowed"})
+
+class MockIAS3(Service):
+    """IA S3-compatible subset: object PUT plus multipart init/part/list/complete/abort.
+
+    Parts are spooled to temporary files so the completed object's md5 and
+    sha256 can be computed in part order without holding it in memory.
+    GET /metadata/<identifier> answers like archive.org's metadata API (files
+    with size, md5 and sha1; {} for an unknown item) and needs no credentials.
+    """
+
+    def __init__(self, fail_uploads: int = 0, **link):
+        super().__init__(**link)
+        self.fail_uploads = fail_uploads
+        self.items: dict[str, dict[str, dict]] = {}
+        self.uploads: dict[str, dict] = {}
+
+    def _xml(self, req: _Handler, code: int, body: str) -> None:
+        req.send(code, raw=('<?xml version="1.0" encoding="UTF-8"?>' + body).encode(), ctype="application/xml")
+
+    def _inject_failure(self, req: _Handler) -> bool:
+        with self.lock:
+            if self.fail_uploads <= 0: return False
+            self.fail_uploads -= 1
+        for _ in req.iter_body(): pass
+        self._xml(req, 503, "<Error><Code>SlowDown</Code><Message>injected failure</Message></Error>")
+        return True
+
+    def handle(self, req: _Handler) -> None:
+        url = urllib.parse.urlsplit(req.path)
+        q = urllib.parse.parse_qs(url.query, keep_blank_values=True)
+        with self.lock: self.calls.append((req.command, url.path))
+        if req.command == "GET" and url.path.startswith("/metadata/"):
+            files = self.items.get(urllib.parse.unquote(url.path[len("/metadata/"):]))
+            if files is None: return req.send(200, {})
+            return req.send(200, {"files": [{"name": k, "source": "original", "size": str(v["bytes"]), "md5": v["md5"],
+                                             "sha1": v["sha1"]} for k, v in sorted(files.items())]})
+        if not req.headers.get("Authorization", "").startswith("LOW "):
+            req.body(); return self._xml(req, 403, "<Error><Code>AccessDenied</Code></Error>")
+        parts = url.path.strip("/").split("/", 1)
+        if len(parts) != 2:
+            req.body(); return self._xml(req, 400, "<Error><Code>InvalidURI</Code></Error>")
+        ident, key = parts[0], urllib.parse.unquote(parts[1])
+        upload_id = (q.get("uploadId") or [None])[0]
+        if req.command == "POST" and "uploads" in q:
+            req.body()
+            uid = uuid.uuid4().hex
+            with self.lock:
+                self.uploads[uid] = {"item": ident, "key": key, "parts": {},
+                                     "meta": {k: v for k, v in req.headers.items() if k.lower().startswith("x-archive-meta")}}
+            return self._xml(req, 200, f"<InitiateMultipartUploadResult><Bucket>{ident}</Bucket><Key>{key}</Key>"
+                                       f"<UploadId>{uid}</UploadId></InitiateMultipartUploadResult>")
+        up = self.uploads.get(upload_id) if upload_id else None
+        if upload_id and up is None:
+            req.body(); return self._xml(req, 404, "<Error><Code>NoSuchUpload</Code></Error>")
+        if req.command == "PUT" and up is not None:
+            if self._inject_failure(req): return
+            n = int(q["partNumber"][0]); spool = tempfile.TemporaryFile(); md5 = hashlib.md5()
+            for c in req.iter_body():
+                md5.update(c); spool.write(c)
+            want = req.headers.get("Content-MD5")
+            if want and base64.b64decode(want) != md5.digest():
+                spool.close(); return self._xml(req, 400, "<Error><Code>BadDigest</Code></Error>")
+            with self.lock:
+                old = up["parts"].pop(n, None)
+                up["parts"][n] = (spool, md5.hexdigest())
+            if old: old[0].close()
+            return req.send(200, headers={"ETag": f'"{md5.hexdigest()}"'})
+        if req.command == "GET" and up is not None:
+            listing = "".join(f"<Part><PartNumber>{n}</PartNumber><ETag>\"{e}\"</ETag></Part>"
+                              for n, (_, e) in sorted(up["parts"].items()))
+            return self._xml(req, 200, f"<ListPartsResult><UploadId>{upload_id}</UploadId>{listing}</ListPartsResult>")
+        if req.command == "DELETE" and up is not None:
+            with self.lock: self.uploads.pop(upload_id, None)
+            for spool, _ in up["parts"].values(): spool.close()
+            return req.send(204)
+        if req.command == "POST" and up is not None:
+            wanted = [(int(p.findtext("PartNumber")), p.findtext("ETag").strip('"'))
+                      for p in ET.fromstring(req.body()).iter("Part")]
+            if [n for n, _ in wanted] != sorted(up["parts"]) or any(up["parts"][n][1] != e for n, e in wanted):
+                return self._xml(req, 400, "<Error><Code>InvalidPart</Code></Error>")
+            md5 = hashlib.md5(); sha = hashlib.sha256(); sha1 = hashlib.sha1(); size = 0
+            for n, _ in wanted:
+                spool = up["parts"][n][0]; spool.seek(0)
+                for c in iter(lambda: spool.read(1 << 20), b""):
+                    md5.update(c); sha.update(c); sha1.update(c); size += len(c)
+                spool.close()
+            etag = hashlib.md5(b"".join(bytes.fromhex(e) for _, e in wanted)).hexdigest() + f"-{len(wanted)}"
+            with self.lock:
+                self.uploads.pop(upload_id, None)
+                self.items.setdefault(ident, {})[key] = {"bytes": size, "md5": md5.hexdigest(), "sha1": sha1.hexdigest(),
+                                                         "sha256": sha.hexdigest(), "parts": len(wanted)}
+            return self._xml(req, 200, f"<CompleteMultipartUploadResult><Bucket>{ident}</Bucket><Key>{key}</Key>"
+                                       f"<ETag>\"{etag}\"</ETag></CompleteMultipartUploadResult>")
+        if req.command == "PUT":
+            if self._inject_failure(req): return
+            md5 = hashlib.md5(); sha = hashlib.sha256(); sha1 = hashlib.sha1(); size = 0
+            for c in req.iter_body():
+                md5.update(c); sha.update(c); sha1.update(c); size += len(c)
+            with self.lock:
+                self.items.setdefault(ident, {})[key] = {"bytes": size, "md5": md5.hexdigest(), "sha1": sha1.hexdigest(),
+                                                         "sha256": sha.hexdigest()}
+            return req.send(200, headers={"ETag": f'"{md5.hexdigest()}"'})
+        req.body(); self._xml(req, 405, "<Error><Code>MethodNotAllowed</Code></Error>")
+
+class MockMirror(Service):
+    """Read-only file server over a directory (GET/HEAD, single byte ranges), for mirror_audit.
+
+    drops=N ends the next N response bodies after drop_after bytes by closing
+    the connection, as a flaky link would; the client has to resume.
+    """
+
+    def __init__(self, root, drops: int = 0, drop_after: int = 1 << 20, **link):
+        super().__init__(**link)
+        self.root = pathlib.Path(root).resolve(); self.drops = drops; self.drop_after = drop_after
+
+    def handle(self, req: _Handler) -> None:
+        url = urllib.parse.urlsplit(req.path)
+        with self.lock: self.calls.append((req.command, url.path))
+        if req.command not in ("GET", "HEAD"):
+            req.body(); return req.send(405, {"message": "read-only mirror"})
+        path = (self.root / urllib.parse.unquote(url.path).lstrip("/")).resolve()
+        if not path.is_file() or not path.is_relative_to(self.root):
+            return req.send(404, {"message": "not found"})
+        size = path.stat().st_size; start, end, code = 0, size - 1, 200
+        rng = re.fullmatch(r"bytes=(\d+)-(\d*)", req.headers.get("Range", ""))
+        if rng:
+            start = int(rng.group(1)); end = min(int(rng.group(2) or size - 1), size - 1); code = 206
+            if start >= size:
+                return req.send(416, {"message": "range not satisfiable"}, headers={"Content-Range": f"bytes */{size}"})
+        req.send_response(code)
+        req.send_header("Content-Type", "application/octet-stream")
+        req.send_header("Content-Length", str(end - start + 1))
+        req.send_header("Accept-Ranges", "bytes")
+        if code == 206: req.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        req.end_headers()
+        if req.command == "HEAD": return
+        left = end - start + 1
+        with self.lock:
+            drop = self.drops > 0 and left > self.drop_after
+            if drop: self.drops -= 1
+        if drop: left = self.drop_after
+        with open(path, "rb") as f:
+            f.seek(start)
+            while left > 0:
+                chunk = f.read(min(1 << 16, left)); left -= len(chunk)
+                if not chunk: break
+                req.wfile.write(chunk)
+                if self.throttle: time.sleep(len(chunk) / self.throttle)
+        if drop: req.close_connection = True
+
+SERVICES = {"zenodo": MockZenodo, "ia-s3": MockIAS3, "mirror": MockMirror}
+
+def main():
+    ap = argparse.ArgumentParser(description="Run a local archive-service stand-in")
+    ap.add_argument("service", choices=sorted(SERVICES))
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--fail-uploads", type=int, default=0, help="Answer the next N uploads with 503")
+    ap.add_argument("--root", default=".", help="Directory served by the mirror")
+    ap.add_argument("--drops", type=int, default=0, help="Mirror: cut the next N downloads short")
+    ap.add_argument("--connect-delay", type=float, default=0.0, help="Seconds added to every new connection")
+    ap.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    ap.add_argument("--throttle", type=float, default=0.0, help="Per-stream transfer cap in bytes/s (0 = none)")
+    args = ap.parse_args()
+    link = dict(connect_delay=args.connect_delay, latency=args.latency, throttle=args.throttle)
+    if args.service == "mirror": svc = MockMirror(args.root, drops=args.drops, **link)
+    else: svc = SERVICES[args.service](fail_uploads=args.fail_uploads, **link)
+    serve(svc, args.host, args.port)
+    print(f"[+] mock {args.service} listening on {svc.base}", file=sys.stderr)
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
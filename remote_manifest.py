@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# MIT License
+"""What an IA item or Zenodo deposition already holds, for incremental publishing.
+
+A manifest maps file name -> {"bytes", "md5"} (plus "sha1" on IA, "id" on
+Zenodo). A local file counts as unchanged when the remote copy has its name,
+its size and its md5; sizes are compared first, so only same-size files are
+md5-hashed (cached, see file_hashing.md5_file). A TarBundle gets its md5
+from one local hash pass, and only when the remote bundle is the same size.
+
+IA_METADATA_URL overrides the metadata endpoint, e.g. for mock_services.MockIAS3.
+
+    python remote_manifest.py ia IDENTIFIER FILE [FILE ...]
+    python remote_manifest.py zenodo DEPOSITION_ID FILE [FILE ...] [--sandbox]
+"""
+from __future__ import annotations
+import os, sys, json, argparse
+from typing import Dict, List, Optional
+import requests
+from file_hashing import default_cache, md5_files, DigestCache
+from bundle_stream import TarBundle
+
+IA_METADATA_URL = "https://archive.org/metadata"
+
+def metadata_endpoint() -> str:
+    return os.getenv("IA_METADATA_URL", IA_METADATA_URL).rstrip("/")
+
+def ia_manifest(identifier: str, session: Optional[requests.Session] = None, timeout: float = 60) -> Dict[str, Dict]:
+    """Files of an IA item ({} when the item does not exist yet)."""
+    r = (session or requests).get(f"{metadata_endpoint()}/{identifier}", timeout=timeout)
+    r.raise_for_status()
+    out = {}
+    for f in (r.json() or {}).get("files", []):
+        size = f.get("size")
+        out[f["name"]] = {"bytes": None if size is None else int(size), "md5": f.get("md5"), "sha1": f.get("sha1")}
+    return out
+
+def zenodo_manifest(dep: Dict) -> Dict[str, Dict]:
+    """Files of a Zenodo deposition as returned by the deposit API."""
+    out = {}
+    for f in dep.get("files", []):
+        md5 = f.get("checksum") or ""
+        out[f["filename"]] = {"bytes": f.get("filesize"), "md5": md5[4:] if md5.startswith("md5:") else md5,
+                              "id": f.get("id")}
+    return out
+
+def unchanged(items: list, sizes: List[int], remote: Dict[str, Dict], cache: Optional[DigestCache] = None,
+              workers: Optional[int] = None) -> List[bool]:
+    """Per item (path or TarBundle): does the remote already hold this exact content under its name?"""
+    names = [f.name if isinstance(f, TarBundle) else os.path.basename(f) for f in items]
+    same = [False] * len(items); check = []
+    for i, (name, size) in enumerate(zip(names, sizes)):
+        e = remote.get(name)
+        if e and e.get("md5") and e.get("bytes") in (None, size): check.append(i)
+    paths = [i for i in check if not isinstance(items[i], TarBundle)]
+    for i, (_, md5) in zip(paths, md5_files([items[i] for i in paths], workers=workers, cache=cache)):
+        same[i] = md5 == remote[names[i]]["md5"]
+    for i in check:
+        if isinstance(items[i], TarBundle):
+            b = items[i]; same[i] = (b.manifest or b.hash_pass())["md5"] == remote[names[i]]["md5"]
+    return same
+
+def main():
+    ap = argparse.ArgumentParser(description="Show which files an archive already holds")
+    ap.add_argument("target", choices=["ia", "zenodo"])
+    ap.add_argument("remote", help="IA identifier or Zenodo deposition id")
+    ap.add_argument("files", nargs="+")
+    ap.add_argument("--sandbox", action="store_true", help="Zenodo sandbox (ZENODO_API_URL also applies)")
+    args = ap.parse_args()
+
+    if args.target == "ia":
+        remote = ia_manifest(args.remote)
+    else:
+        from uploader_core import _zenodo_api, zenodo_session  # uploader_core imports this module
+        token = os.getenv("ZENODO_TOKEN")
+        if not token: print("[!] ZENODO_TOKEN missing in environment", file=sys.stderr); sys.exit(2)
+        api = _zenodo_api(args.sandbox)
+        r = zenodo_session(token).get(f"{api}/deposit/depositions/{args.remote}"); r.raise_for_status()
+        remote = zenodo_manifest(r.json())
+    missing = [f for f in args.files if not os.path.isfile(f)]
+    if missing: print(f"[!] Missing file: {missing[0]}", file=sys.stderr); sys.exit(1)
+    same = unchanged(args.files, [os.path.getsize(f) for f in args.files], remote, default_cache())
+    local = {os.path.basename(f) for f in args.files}
+    plan = {"unchanged": [os.path.basename(f) for f, s in zip(args.files, same) if s],
+            "upload": [os.path.basename(f) for f, s in zip(args.files, same) if not s],
+            "remote_only": sorted(set(remote) - local)}
+    print(json.dumps(plan, indent=2, ensure_ascii=False))
+    print(f"[+] {len(plan['upload'])} to upload, {len(plan['unchanged'])} unchanged", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
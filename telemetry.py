@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# MIT License
+"""Spans and counters for the uploader and chain tools.
+
+Off unless FABRIC_TELEMETRY names an output file:
+  *.prom   Prometheus textfile (node_exporter textfile collector), rewritten at exit
+  other    JSON lines: one {"type": "span", ...} per finished span as it ends, plus
+           {"type": "counter", ...} totals at exit
+
+Disabled, span() hands back a shared no-op object and count() returns
+right away, so call sites can stay in hot paths.
+
+    with telemetry.span("upload", target="zenodo") as sp:
+        ...; sp.add(bytes=size)
+    telemetry.count("upload_retries", target="zenodo")
+
+    @telemetry.traced("build_checksums")
+    def build_checksums(...): ...
+
+    python telemetry.py summary telemetry.jsonl
+"""
+from __future__ import annotations
+import os, json, time, atexit, pathlib, argparse, functools, threading
+from typing import Optional
+
+_mu = threading.Lock()
+_path: Optional[pathlib.Path] = None
+_prom = False
+_spans: dict[tuple, list] = {}     # (name, labels) -> [count, seconds, bytes]
+_counters: dict[tuple, float] = {}
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items())))
+
+class _NoSpan:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def add(self, **kv): pass
+
+_NOOP = _NoSpan()
+
+class Span:
+    __slots__ = ("name", "labels", "attrs", "t0")
+
+    def __init__(self, name: str, labels: dict):
+        self.name = name; self.labels = labels; self.attrs = {}; self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter(); return self
+
+    def add(self, **kv) -> None:
+        """Accumulate numeric attributes (bytes=..., files=...)."""
+        for k, v in kv.items(): self.attrs[k] = self.attrs.get(k, 0) + v
+
+    def __exit__(self, exc_type, *exc):
+        dt = time.perf_counter() - self.t0; nbytes = self.attrs.get("bytes", 0)
+        with _mu:
+            agg = _spans.setdefault(_key(self.name, self.labels), [0, 0.0, 0])
+            agg[0] += 1; agg[1] += dt; agg[2] += nbytes
+        if not _prom:
+            rec = {"type": "span", "ts": round(time.time(), 3), "pid": os.getpid(), "name": self.name,
+                   "labels": self.labels, "seconds": round(dt, 6), **self.attrs}
+            if nbytes and dt > 0: rec["mib_per_s"] = round(nbytes / 2**20 / dt, 2)
+            if exc_type is not None: rec["error"] = exc_type.__name__
+            _write(json.dumps(rec) + "\n")
+        return False
+
+def enabled() -> bool:
+    return _path is not None
+
+def span(name: str, **labels):
+    if _path is None: return _NOOP
+    return Span(name, labels)
+
+def traced(name: str, **labels):
+    """Decorator: run the function inside span(name, **labels)."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if _path is None: return fn(*a, **kw)
+            with Span(name, labels): return fn(*a, **kw)
+        return wrapper
+    return deco
+
+def count(name: str, value: float = 1, **labels) -> None:
+    if _path is None: return
+    with _mu:
+        k = _key(name, labels); _counters[k] = _counters.get(k, 0) + value
+
+def _write(line: str) -> None:
+    # O_APPEND single writes keep lines whole when several processes share the file
+    fd = os.open(_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try: os.write(fd, line.encode("utf-8"))
+    finally: os.close(fd)
+
+def _prom_labels(labels: tuple) -> str:
+    if not labels: return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+def flush() -> None:
+    """Write counters (JSONL) or the whole Prometheus textfile; runs at exit."""
+    if _path is None: return
+    with _mu:
+        spans = dict(_spans); counters = dict(_counters)
+    if not _prom:
+        lines = "".join(json.dumps({"type": "counter", "ts": round(time.time(), 3), "pid": os.getpid(), "name": n,
+                                    "labels": dict(lb), "value": v}) + "\n" for (n, lb), v in counters.items())
+        if lines: _write(lines)
+        with _mu: _counters.clear()
+        return
+    out = ["# TYPE fabric_span_seconds summary\n"]
+    for (n, lb), (c, secs, _) in sorted(spans.items()):
+        lab = _prom_labels((("span", n),) + lb)
+        out += [f"fabric_span_seconds_sum{lab} {secs:.6f}\n", f"fabric_span_seconds_count{lab} {c}\n"]
+    out.append("# TYPE fabric_span_bytes_total counter\n")
+    out += [f"fabric_span_bytes_total{_prom_labels((('span', n),) + lb)} {b}\n"
+            for (n, lb), (_, _, b) in sorted(spans.items()) if b]
+    for (n, lb), v in sorted(counters.items()):
+        out.append(f"# TYPE fabric_{n}_total counter\nfabric_{n}_total{_prom_labels(lb)} {v:g}\n")
+    tmp = _path.with_name(_path.name + f".{os.getpid()}.tmp")
+    tmp.write_text("".join(out), encoding="utf-8")
+    os.replace(tmp, _path)  # textfile collectors must never see a half-written file
+
+def configure(path: Optional[os.PathLike | str]) -> None:
+    """Enable output to path (None disables); FABRIC_TELEMETRY does this at import."""
+    global _path, _prom
+    _path = pathlib.Path(path) if path else None
+    _prom = bool(_path and _path.suffix == ".prom")
+
+configure(os.getenv("FABRIC_TELEMETRY") or None)
+atexit.register(flush)
+
+def summary(path: os.PathLike | str) -> list[dict]:
+    """Per (span, labels) totals from a JSONL file."""
+    agg: dict[tuple, dict] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            r = json.loads(line)
+            if r.get("type") != "span": continue
+            a = agg.setdefault(_key(r["name"], r.get("labels", {})),
+                               {"span": r["name"], "labels": r.get("labels", {}), "count": 0, "seconds": 0.0, "bytes": 0})
+            a["count"] += 1; a["seconds"] += r["seconds"]; a["bytes"] += r.get("bytes", 0)
+    for a in agg.values():
+        a["seconds"] = round(a["seconds"], 6)
+        if a["bytes"] and a["seconds"]: a["mib_per_s"] = round(a["bytes"] / 2**20 / a["seconds"], 2)
+    return sorted(agg.values(), key=lambda a: -a["seconds"])
+
+def main():
+    ap = argparse.ArgumentParser(description="Summarize a FABRIC_TELEMETRY JSON-lines file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("summary"); s.add_argument("file")
+    args = ap.parse_args()
+    for a in summary(args.file):
+        lab = ",".join(f"{k}={v}" for k, v in a["labels"].items())
+        rate = f"  {a['mib_per_s']:.1f} MiB/s" if "mib_per_s" in a else ""
+        print(f"{a['span']:20s} {lab:30s} n={a['count']:<6d} {a['seconds']:10.3f}s{rate}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# MIT License
+"""TarBundle: the size laid out from member stats matches the tar actually streamed, and tarfile reads it back.
+
+    python -m unittest discover tests
+"""
+import os, sys, hashlib, pathlib, tarfile, tempfile, unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from bundle_stream import BLOCK, BUNDLE_SCHEMA, TarBundle, arcnames
+
+class Bundle(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        self.dir = pathlib.Path(self.tmp.name)
+        sizes = {"STORY.md": 0, "a/one.bin": 1, "a/block.bin": BLOCK, "b/odd.bin": 3 * BLOCK + 7,
+                 "b/" + "long-name-" * 12 + ".bin": 2000, "b/ünïcode.txt": 511}  # empty, aligned, PAX long name
+        self.files = []
+        for rel, n in sizes.items():
+            p = self.dir / "src" / rel; p.parent.mkdir(parents=True, exist_ok=True); p.write_bytes(os.urandom(n))
+            self.files.append(str(p))
+
+    def test_precomputed_size_matches_streamed_tar(self):
+        b = TarBundle("release.tar", self.files); out = self.dir / "release.tar"
+        manifest = b.write(out); data = out.read_bytes()
+        self.assertEqual(len(data), b.size); self.assertEqual(len(b.open()), b.size)
+        self.assertEqual(b.size % tarfile.RECORDSIZE, 0)
+        self.assertEqual((manifest["schema"], manifest["bytes"]), (BUNDLE_SCHEMA, b.size))
+        self.assertEqual(manifest["sha256"], hashlib.sha256(data).hexdigest())
+        self.assertEqual(manifest["md5"], hashlib.md5(data).hexdigest())
+        with tarfile.open(out) as tar:
+            self.assertEqual(tar.getnames(), arcnames(self.files))
+            for m, src in zip(manifest["members"], self.files):
+                body = pathlib.Path(src).read_bytes()
+                self.assertEqual(tar.extractfile(m["path"]).read(), body)
+                self.assertEqual((m["bytes"], m["sha256"]), (len(body), hashlib.sha256(body).hexdigest()))
+
+    def test_size_matches_tarfile_writing_the_same_members(self):
+        b = TarBundle("release.tar", self.files); ref = self.dir / "ref.tar"
+        with tarfile.open(ref, "w", format=tarfile.PAX_FORMAT) as tar:
+            for src, arc in zip(self.files, arcnames(self.files)):
+                ti = tar.gettarinfo(src, arc); ti.mode = 0o644; ti.uid = ti.gid = 0; ti.uname = ti.gname = ""
+                with open(src, "rb") as f: tar.addfile(ti, f)
+        self.assertEqual(b.size, ref.stat().st_size)
+
+    def test_small_reads_and_hash_pass_agree(self):
+        b = TarBundle("release.tar", self.files)
+        with b.open() as r: data = b"".join(iter(lambda: r.read(777), b""))
+        self.assertEqual(len(data), b.size)
+        self.assertEqual(b.hash_pass()["sha256"], hashlib.sha256(data).hexdigest())
+
+    def test_member_changing_size_is_caught(self):
+        b = TarBundle("release.tar", self.files)
+        with open(self.files[1], "ab") as f: f.write(b"more")
+        with self.assertRaises(RuntimeError): b.hash_pass()
+
+    def test_duplicate_member_names_are_rejected(self):
+        with self.assertRaises(ValueError): TarBundle("twice.tar", [self.files[1], self.files[1]])
+        self.assertEqual(arcnames([str(self.dir / "x" / "one.bin"), str(self.dir / "y" / "one.bin")]), ["x/one.bin", "y/one.bin"])
+
+if __name__ == "__main__":
+    unittest.main()
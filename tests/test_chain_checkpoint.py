@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# MIT License
+"""Checkpoint blocks: create, light verify (threshold verifier) and spot checks on a synthetic ledger.
+
+    python -m unittest discover tests
+"""
+import sys, base64, pathlib, tempfile, unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+from nacl.signing import SigningKey
+from nacl.encoding import RawEncoder
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "bench"), str(ROOT / "chain")]
+import synth, chain_checkpoint, chain_verify_threshold
+from chain_index import ChainIndex
+from chain_cosigs import append_cosigs, cosig_record
+from chain_merkle import EMPTY_ROOT
+from chain_writer import ChainWriter
+
+class Checkpoints(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        self.ledger = synth.make_ledger(self.tmp.name, 10, files_per_block=2, cosigners=2)  # threshold 3
+        keys = self.ledger.parent / "keys"
+        self.keys = {n: SigningKey(base64.b64decode((keys / f"{n}.ed25519.sk").read_text().strip()))
+                     for n in ("s0", "c0", "c1")}
+
+    def sig(self, name, block_hash):
+        sk = self.keys[name]
+        return {"signer": name, "pubkey_b64": base64.b64encode(bytes(sk.verify_key)).decode(),
+                "sig_b64": base64.b64encode(sk.sign(bytes.fromhex(block_hash), encoder=RawEncoder).signature).decode()}
+
+    def append(self, n=1):
+        for i in range(n):
+            draft = {"schema": "fabric-chain/1.0", "timestamp": "2025-01-02T00:00:00Z", "files": [],
+                     "merkle_root": EMPTY_ROOT, "notes": f"after {i}"}
+            ChainWriter(self.ledger).append(draft, lambda h: [self.sig(s, h) for s in self.keys])
+
+    def create(self, cosigners=("c0", "c1")):
+        """chain_checkpoint create --ledger (keys and pubkeys.json are found next to it), then cosign."""
+        with redirect_stdout(StringIO()), mock.patch.object(sys, "argv", [
+                "chain_checkpoint.py", "--ledger", str(self.ledger), "create", "--signer", "s0"]):
+            chain_checkpoint.main()
+        cpb = ChainIndex(self.ledger).open().tail()[0]
+        append_cosigs(self.ledger, [cosig_record(cpb, n, **{k: v for k, v in self.sig(n, cpb["block_hash"]).items()
+                                                            if k != "signer"}) for n in cosigners])
+        return cpb
+
+    def verify(self, *extra):
+        argv = ["chain_verify_threshold.py", "--light", "--workers", "1", *extra]
+        with redirect_stdout(StringIO()) as out, mock.patch.object(sys, "argv", argv), \
+             mock.patch.multiple(chain_verify_threshold, LEDGER=self.ledger, PUBS=self.ledger.parent / "pubkeys.json",
+                                 POLICY=self.ledger.parent / "policy.json"):
+            with self.assertRaises(SystemExit) as e: chain_verify_threshold.main()
+        return e.exception.code, out.getvalue()
+
+    def test_light_verify_reads_only_cosigs_after_the_range(self):
+        cpb = self.create(); self.append(2)
+        with mock.patch.object(chain_checkpoint, "load_cosigs", wraps=chain_checkpoint.load_cosigs) as load:
+            code, out = self.verify("--spot", "3")
+        self.assertEqual(code, 0, out)
+        self.assertIn(f"trusting checkpoint block {cpb['index']} over blocks 0..9", out)
+        self.assertIn("checking the 3 block(s) after its range", out)
+        self.assertIn("[✓] Spot check: block 3 is leaf 3/10", out)
+        self.assertEqual([c.kwargs["since"] for c in load.call_args_list], [10])
+        every = chain_checkpoint.load_cosigs(self.ledger)
+        self.assertEqual(chain_checkpoint.load_cosigs(self.ledger, since=5), {i: r for i, r in every.items() if i >= 5})
+
+    def test_checkpoint_below_threshold_is_not_trusted(self):
+        self.create(cosigners=("c0",))
+        code, out = self.verify()
+        self.assertIn("checkpoint block 10 is not trusted", out)
+        self.assertIn("no checkpoint block meets the threshold; verifying every block", out)
+        self.assertIn("signature threshold not met at block 10: 2/3 valid", out)
+        self.assertEqual(code, 1)
+
+    def test_untrusted_newest_falls_back_to_older_checkpoint(self):
+        self.create(); self.append(); self.create(cosigners=())
+        with mock.patch.object(chain_checkpoint, "load_cosigs", wraps=chain_checkpoint.load_cosigs) as load:
+            code, out = self.verify()
+        self.assertIn("trusting checkpoint block 10 over blocks 0..9", out)
+        self.assertEqual([c.kwargs["since"] for c in load.call_args_list], [12, 10])  # re-read for the older range
+        self.assertIn("signature threshold not met at block 12: 1/3 valid", out)
+        self.assertEqual(code, 1)
+
+    def test_spot_check_catches_a_rewritten_block(self):
+        cpb = self.create(); cix = ChainIndex(self.ledger).open()
+        self.assertTrue(chain_checkpoint.proof_ok(chain_checkpoint.prove(cix, cpb, 4)))
+        block = cix.get(4); block["notes"] = "rewritten"
+        with mock.patch.object(ChainIndex, "get", return_value=block), redirect_stdout(StringIO()) as out:
+            self.assertFalse(chain_checkpoint.spot_check(cix, cpb, 4))
+        self.assertIn("does not match its own block_hash", out.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
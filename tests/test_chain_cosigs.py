@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# MIT License
+"""SIGS.jsonl cosignatures: merge, compact and the query index (synthetic ledger, no keys on disk needed).
+
+    python -m unittest discover tests
+"""
+import sys, base64, pathlib, tempfile, unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from nacl.signing import SigningKey
+from nacl.encoding import RawEncoder
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "bench")]
+import synth
+from chain_index import ChainIndex
+from chain_cosigs import append_cosigs, cosig_record, compact, load_cosigs, merge_signatures, report_strays
+from chain_query import ChainQuery
+
+def record(block, signer, sk=None, sig=None):
+    sk = sk or SigningKey.generate()
+    if sig is None: sig = sk.sign(bytes.fromhex(block["block_hash"]), encoder=RawEncoder).signature
+    return cosig_record(block, signer, base64.b64encode(bytes(sk.verify_key)).decode(), base64.b64encode(sig).decode())
+
+class Cosignatures(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        self.ledger = synth.make_ledger(self.tmp.name, 5, files_per_block=2, cosigners=2, logged_share=0)
+        self.block = ChainIndex(self.ledger).open().get(3)
+        self.good = {s["signer"]: s for s in self.block["signatures"]}
+
+    def test_bad_record_never_replaces_a_valid_signature(self):
+        bad = record(self.block, "c0", sig=bytes(64))
+        sigs, stray = merge_signatures(self.block, [bad])
+        self.assertEqual(stray, [bad])
+        self.assertIn(self.good["c0"], sigs)
+        with redirect_stdout(StringIO()) as out:
+            self.assertFalse(report_strays(self.block, stray))
+        self.assertIn("bad cosignature from 'c0' at block 3", out.getvalue())
+
+    def test_malformed_record_is_a_stray(self):
+        bad = dict(record(self.block, "c0"), pubkey_b64="not base64!", sig_b64="")
+        self.assertEqual(merge_signatures(self.block, [bad])[1], [bad])
+
+    def test_compact_folds_valid_records_and_keeps_bad_ones(self):
+        new = record(self.block, "c9"); bad = record(self.block, "c0", sig=bytes(64))
+        other = dict(record(self.block, "c1"), block_hash="00" * 32)
+        append_cosigs(self.ledger, [new, bad, other])
+        self.assertEqual(compact(self.ledger), 1)
+        block = ChainIndex(self.ledger).open().get(3)
+        self.assertIn(self.good["c0"], block["signatures"])
+        self.assertIn({k: new[k] for k in ("signer", "pubkey_b64", "sig_b64")}, block["signatures"])
+        self.assertEqual(load_cosigs(self.ledger), {3: [bad, other]})  # strays stay for the verifiers
+        self.assertEqual(compact(self.ledger), 0)
+
+    def test_later_valid_record_replaces_the_signer(self):
+        sk = SigningKey.generate(); again = record(self.block, "c0", sk)
+        sigs, stray = merge_signatures(self.block, [again])
+        self.assertEqual(stray, [])
+        self.assertEqual([s["pubkey_b64"] for s in sigs if s["signer"] == "c0"], [again["pubkey_b64"]])
+
+    def test_query_index_ignores_bad_records(self):
+        with ChainQuery(self.ledger) as q:
+            q.sync()
+            append_cosigs(self.ledger, [record(self.block, "c0", sig=bytes(64)), record(self.block, "c9")])
+            q.sync()
+            rows = {r["signer"]: r["sig_b64"] for r in q.db.execute("SELECT signer, sig_b64 FROM signatures WHERE block = 3")}
+        self.assertEqual(rows["c0"], self.good["c0"]["sig_b64"])
+        self.assertIn("c9", rows)
+
+if __name__ == "__main__":
+    unittest.main()
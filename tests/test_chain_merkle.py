@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# MIT License
+"""Merkle construction: merkle_root, MerkleTree proofs and MerkleAccumulator agree for every leaf count.
+
+    python -m unittest discover tests
+"""
+import sys, hashlib, pathlib, unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from chain_merkle import EMPTY_ROOT, MerkleAccumulator, MerkleTree, file_proof, merkle_root, verify_proof
+
+def naive_root(hashes):
+    """The ledger's original construction: pair neighbours, an odd last node pairs with itself."""
+    level = [bytes.fromhex(h) for h in hashes]
+    if not level: return EMPTY_ROOT
+    while len(level) > 1:
+        if len(level) % 2: level.append(level[-1])
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+def leaves(n):
+    return [hashlib.sha256(b"leaf %d" % i).hexdigest() for i in range(n)]
+
+class Merkle(unittest.TestCase):
+    def test_roots_agree(self):
+        for n in list(range(0, 34)) + [255, 256, 257, 1000]:
+            hs = leaves(n); acc = MerkleAccumulator()
+            for h in hs: acc.add(h)
+            want = naive_root(hs)
+            self.assertEqual(merkle_root(hs), want, n)
+            self.assertEqual(MerkleTree(hs).root, want, n)
+            self.assertEqual(acc.root(), want, n); self.assertEqual(acc.count, n)
+
+    def test_every_proof_verifies(self):
+        for n in (1, 2, 3, 5, 8, 13, 33):
+            hs = leaves(n); tree = MerkleTree(hs)
+            for i, h in enumerate(hs):
+                path = tree.proof(i)
+                self.assertTrue(verify_proof(h, i, path, tree.root, n), (n, i))
+                if n > 1: self.assertFalse(verify_proof(hs[(i + 1) % n], i, path, tree.root, n), (n, i))
+
+    def test_proof_rejects_wrong_position_or_count(self):
+        hs = leaves(6); tree = MerkleTree(hs); path = tree.proof(2)
+        self.assertFalse(verify_proof(hs[2], 3, path, tree.root, 6))
+        self.assertFalse(verify_proof(hs[2], 2, path, tree.root, 20))  # depth does not match the leaf count
+        self.assertFalse(verify_proof(hs[2], 2, path[:-1], tree.root))
+        with self.assertRaises(IndexError): tree.proof(6)
+
+    def test_file_proof_against_block(self):
+        files = [{"path": f"d/f{i}.bin", "bytes": i, "sha256": h} for i, h in enumerate(leaves(5))]
+        block = {"index": 7, "block_hash": "00" * 32, "merkle_root": merkle_root([f["sha256"] for f in files]), "files": files}
+        proof = file_proof(block, "f3.bin")  # unique basename
+        self.assertEqual((proof["path"], proof["leaf_index"], proof["leaf_count"]), ("d/f3.bin", 3, 5))
+        self.assertTrue(verify_proof(proof["leaf"], proof["leaf_index"], proof["siblings"], block["merkle_root"], 5))
+        with self.assertRaises(KeyError): file_proof(block, "missing.bin")
+
+if __name__ == "__main__":
+    unittest.main()
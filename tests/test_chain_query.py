@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# MIT License
+"""chain_query.sync: incremental after appends, full rebuild after a compaction rewrites the ledger.
+
+    python -m unittest discover tests
+"""
+import sys, json, base64, pathlib, tempfile, unittest
+from nacl.signing import SigningKey
+from nacl.encoding import RawEncoder
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "bench")]
+import synth
+from chain_cosigs import append_cosigs, compact, cosig_record, sigs_path
+from chain_index import ChainIndex
+from chain_query import ChainQuery
+from chain_writer import ChainWriter
+
+def signed(block, signer="late"):
+    sk = SigningKey.generate(); sig = sk.sign(bytes.fromhex(block["block_hash"]), encoder=RawEncoder).signature
+    return cosig_record(block, signer, base64.b64encode(bytes(sk.verify_key)).decode(), base64.b64encode(sig).decode())
+
+class QuerySync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        self.ledger = synth.make_ledger(self.tmp.name, 6, files_per_block=2, cosigners=2, logged_share=0.5)
+        self.log_lines = len(sigs_path(self.ledger).read_bytes().splitlines())
+        self.q = ChainQuery(self.ledger); self.addCleanup(self.q.close)
+
+    def snapshot(self):
+        rows = lambda sql: [tuple(r) for r in self.q.db.execute(sql)]
+        return (rows("SELECT idx, block_hash, prev_hash, n_files FROM blocks ORDER BY idx"),
+                rows("SELECT block, pos, path, sha256 FROM files ORDER BY block, pos"),
+                rows("SELECT block, signer, sig_b64 FROM signatures ORDER BY block, signer"))
+
+    def append_block(self):
+        draft = {"schema": "fabric-chain/1.0", "timestamp": "2025-01-02T00:00:00Z", "notes": "new",
+                 "files": [{"path": "new.bin", "bytes": 1, "sha256": "aa" * 32}], "merkle_root": "aa" * 32}
+        return ChainWriter(self.ledger).append(draft, lambda h: [])
+
+    def test_sync_reads_only_what_was_appended(self):
+        self.assertEqual(self.q.sync(), 6 + self.log_lines)
+        self.assertEqual(self.q.sync(), 0)
+        block = self.append_block()
+        self.assertEqual(self.q.sync(), 1)
+        self.assertEqual(self.q.first_seen("AA" * 32)["block"], block["index"])
+        append_cosigs(self.ledger, [signed(block)])
+        self.assertEqual(self.q.sync(), 1)
+        self.assertEqual(self.q.block(block["index"])["signers"], ["late"])
+        self.assertEqual([r["idx"] for r in self.q.unsigned_by("late")], list(range(6)))
+
+    def test_torn_log_tail_waits_for_the_rest(self):
+        self.q.sync(); rec = signed(ChainIndex(self.ledger).open().get(2))
+        line = (json.dumps(rec, sort_keys=True) + "\n").encode()
+        with open(sigs_path(self.ledger), "ab") as f: f.write(line[:40])
+        self.assertEqual(self.q.sync(), 0)
+        with open(sigs_path(self.ledger), "ab") as f: f.write(line[40:])
+        self.assertEqual(self.q.sync(), 1)
+        self.assertIn("late", self.q.block(2)["signers"])
+
+    def test_compaction_triggers_a_rebuild_with_the_same_answers(self):
+        self.q.sync(); append_cosigs(self.ledger, [signed(ChainIndex(self.ledger).open().get(4))]); self.q.sync()
+        before = self.snapshot()
+        compact(self.ledger)  # rewrites CHAIN.jsonl and empties SIGS.jsonl
+        self.assertEqual(self.q.sync(), 6)  # the tail no longer matches: re-read from scratch
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(self.q.rebuild(), 6); self.assertEqual(self.snapshot(), before)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# MIT License
+"""Segmented binary ledger: JSONL round trip, appends across segments, and reads through the usual entry points.
+
+    python -m unittest discover tests
+"""
+import sys, json, pathlib, tempfile, unittest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "bench")]
+import synth
+from chain_index import ChainIndex, scan_ledger
+from chain_segments import SegmentStore, check, convert, export, open_store
+from chain_verify_engine import block_facts
+from chain_writer import ChainWriter
+
+ODD_DRAFTS = [
+    # a chunk tree and a bundle ride along as JSON extras
+    {"schema": "fabric-chain/1.0", "timestamp": "2025-02-01T00:00:00Z", "notes": "odd files",
+     "files": [{"path": "big.bin", "bytes": 3, "sha256": "ab" * 32,
+                "sha256_tree": {"chunk_size": 1, "root": "cd" * 32, "chunks": ["ef" * 32]}},
+               {"path": "rel.tar", "bytes": 10, "sha256": "12" * 32, "bundle": {"members": 2}}],
+     "merkle_root": "34" * 32},
+    # no schema/notes, an unknown top-level field and a file with a non-hex digest (kept as raw JSON)
+    {"timestamp": "2025-02-01T00:00:01Z", "extra": {"k": [1, 2]},
+     "files": [{"path": "x", "bytes": 1, "sha256": "not-a-digest"}], "merkle_root": "56" * 32},
+]
+
+class SegmentStoreRoundTrip(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        self.ledger = synth.make_ledger(self.tmp.name, 9, files_per_block=3, cosigners=2)
+        sign = lambda h: [{"signer": "s0", "pubkey_b64": "AAAA", "sig_b64": "not base64 ~"}]  # odd, not verified here
+        for d in ODD_DRAFTS: ChainWriter(self.ledger).append(d, sign)
+        self.lines = self.ledger.read_bytes().splitlines(keepends=True)
+        self.store_dir = self.ledger.with_suffix(".seg")
+        self.stats = convert(self.ledger, self.store_dir, capacity=4)
+
+    def test_convert_and_export_round_trip(self):
+        self.assertEqual(self.stats["blocks"], 11); self.assertEqual(self.stats["reformatted"], 0)
+        with SegmentStore(self.store_dir) as store:
+            self.assertEqual(store.nsegs, 3); self.assertEqual(check(store), [])
+            self.assertEqual([b for _, _, b in store.scan()], [json.loads(l) for l in self.lines])
+            out = pathlib.Path(self.tmp.name) / "back.jsonl"
+            self.assertEqual(export(store, out), 11)
+        self.assertEqual(out.read_bytes(), b"".join(self.lines))
+
+    def test_reads_match_the_jsonl_index(self):
+        cix = ChainIndex(self.ledger).open()
+        with SegmentStore(self.store_dir) as store:
+            self.assertEqual(len(store), len(cix))
+            self.assertEqual(store.tail()[0], cix.tail()[0])
+            self.assertEqual(list(store.iter_hashes(2, 9)), list(cix.iter_hashes(2, 9)))
+            for i in (0, 3, 4, 10): self.assertEqual(store.get(i), cix.get(i))
+            self.assertIsNone(store.find(11))
+            self.assertEqual(store.scan(5).__next__()[2]["index"], 5)
+
+    def test_append_through_writer_rewrites_only_the_tail(self):
+        self.ledger.rename(self.ledger.with_suffix(".jsonl.bak"))  # tools now read the store
+        self.assertIsNotNone(open_store(self.ledger))
+        first = (self.store_dir / "000000.fseg").read_bytes()
+        draft = {"schema": "fabric-chain/1.0", "timestamp": "2025-03-01T00:00:00Z", "notes": "after",
+                 "files": [{"path": "n", "bytes": 0, "sha256": "78" * 32}], "merkle_root": "78" * 32}
+        sign = lambda h: []
+        writer = ChainWriter(self.ledger)
+        blocks = [writer.append(dict(draft, notes=f"after {i}"), sign) for i in range(3)]  # 11 -> 14: crosses into segment 3
+        self.assertEqual([b["index"] for b in blocks], [11, 12, 13])
+        with SegmentStore(self.store_dir) as store:
+            self.assertEqual(len(store), 14); self.assertEqual(store.nsegs, 4); self.assertEqual(check(store), [])
+            self.assertEqual(store.get(12), blocks[1])
+            self.assertEqual(store.get(11)["prev_hash"], store.get(10)["block_hash"])
+            self.assertTrue(block_facts(store.get(13))["hash_ok"])
+        self.assertEqual((self.store_dir / "000000.fseg").read_bytes(), first)
+        self.assertEqual([b["index"] for _, _, b in scan_ledger(self.ledger)], list(range(14)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# MIT License
+"""sha256_tree entries (file_hashing.digest_entry) and how the ledger reads them.
+
+    python -m unittest discover tests
+"""
+import os, sys, hashlib, pathlib, tempfile, unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from file_hashing import DigestCache, chunk_digests, digest_entry, tree_and_sha256
+from chain_merkle import TREE_SCHEME, file_leaf, file_proof, merkle_root, tree_consistent
+
+CHUNK = 1024
+
+class ChunkTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        self.data = os.urandom(5 * CHUNK + 123)
+        self.path = pathlib.Path(self.tmp.name) / "big.bin"; self.path.write_bytes(self.data)
+
+    def test_entry_keeps_whole_file_sha256(self):
+        fi = digest_entry(self.path, chunk_size=CHUNK)
+        t = fi[TREE_SCHEME]
+        self.assertEqual(fi["sha256"], hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(t["chunks"], [hashlib.sha256(self.data[i:i + CHUNK]).hexdigest()
+                                       for i in range(0, len(self.data), CHUNK)])
+        self.assertEqual(t["root"], merkle_root(t["chunks"]))
+        self.assertTrue(tree_consistent({"path": "big.bin", **fi}))
+        self.assertEqual(file_leaf(fi), fi["sha256"])  # older verifiers compute the same leaf
+
+    def test_small_file_has_no_tree(self):
+        small = pathlib.Path(self.tmp.name) / "small.bin"; small.write_bytes(b"x" * CHUNK)
+        self.assertEqual(digest_entry(small, chunk_size=CHUNK), {"bytes": CHUNK, "sha256": hashlib.sha256(b"x" * CHUNK).hexdigest()})
+
+    def test_tree_only_entry_uses_root(self):
+        fi = digest_entry(self.path, chunk_size=CHUNK); del fi["sha256"]
+        self.assertEqual(file_leaf(fi), fi[TREE_SCHEME]["root"])
+        proof = file_proof({"index": 0, "block_hash": "00" * 32, "merkle_root": "", "files": [{"path": "big.bin", **fi}]}, "big.bin")
+        self.assertEqual(proof["chunk_size"], CHUNK)
+
+    def test_proof_of_full_entry_is_over_sha256(self):
+        fi = {"path": "big.bin", **digest_entry(self.path, chunk_size=CHUNK)}
+        proof = file_proof({"index": 0, "block_hash": "00" * 32, "merkle_root": "", "files": [fi]}, "big.bin")
+        self.assertEqual(proof["leaf"], fi["sha256"]); self.assertNotIn("chunk_size", proof)
+
+    def test_only_selected_chunks(self):
+        size, chunks = chunk_digests(self.path, CHUNK, only=[1, 9])
+        self.assertEqual(size, len(self.data))
+        self.assertEqual([i for i, c in enumerate(chunks) if c], [1])
+
+    def test_cached_halves(self):
+        cache = DigestCache(pathlib.Path(self.tmp.name) / "cache.json")
+        first = tree_and_sha256(self.path, CHUNK, cache)
+        self.assertEqual(tree_and_sha256(self.path, CHUNK, cache), first)
+        cache._entries.pop(DigestCache._key(self.path))  # only the tree is cached now
+        self.assertEqual(tree_and_sha256(self.path, CHUNK, cache), first)
+
+if __name__ == "__main__":
+    unittest.main()
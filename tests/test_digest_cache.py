@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# MIT License
+"""DigestCache persistence under concurrent saves.
+
+    python -m unittest discover tests
+"""
+import os, sys, pathlib, tempfile, threading, unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from file_hashing import DigestCache, hash_files
+
+class DigestCacheSave(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        self.dir = pathlib.Path(self.tmp.name)
+
+    def test_concurrent_saves_keep_every_entry(self):
+        files = []
+        for i in range(64):
+            p = self.dir / f"f{i}.txt"; p.write_text(str(i)); files.append(p)
+        cache = DigestCache(self.dir / "cache.json"); errors = []
+        def worker(chunk):
+            try:
+                for p in chunk: hash_files([p], workers=1, cache=cache)  # one put + save per file
+            except Exception as e:
+                errors.append(e)
+        ts = [threading.Thread(target=worker, args=(files[i::8],)) for i in range(8)]
+        for t in ts: t.start()
+        for t in ts: t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(os.listdir(self.dir / ".")), sorted([p.name for p in files] + ["cache.json"]))
+        reloaded = DigestCache(self.dir / "cache.json")
+        for p in files:
+            self.assertIsNotNone(reloaded.get(p, os.stat(p)), p)
+
+    def test_save_without_changes_writes_nothing(self):
+        DigestCache(self.dir / "cache.json").save()
+        self.assertFalse((self.dir / "cache.json").exists())
+
+if __name__ == "__main__":
+    unittest.main()
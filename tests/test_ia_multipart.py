@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# MIT License
+"""ia_multipart.multipart_upload against mock_services.MockIAS3: resume from saved part state, retries, journal.
+
+    python -m unittest discover tests
+"""
+import os, sys, hashlib, pathlib, tempfile, unittest
+from unittest import mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import ia_multipart, uploader_core, upload_journal
+from mock_services import MockIAS3, serve
+from upload_journal import UploadJournal
+
+PART = ia_multipart.MIN_PART_SIZE
+
+class Interrupted(Exception):
+    pass
+
+class MultipartResume(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        self.data = os.urandom(2 * PART + 4321)  # three parts, the last one short
+        self.file = pathlib.Path(self.tmp.name) / "big.bin"; self.file.write_bytes(self.data)
+        self.svc = MockIAS3(); srv = serve(self.svc); self.addCleanup(srv.server_close); self.addCleanup(srv.shutdown)
+        env = mock.patch.dict(os.environ, {"IA_S3_URL": self.svc.base, "IA_ACCESS_KEY": "a", "IA_SECRET_KEY": "b",
+                                           "FABRIC_DIGEST_CACHE": "off"})
+        env.start(); self.addCleanup(env.stop)
+        nap = mock.patch.object(upload_journal.time, "sleep"); nap.start(); self.addCleanup(nap.stop)
+        self.s3 = ia_multipart.s3_session("a", "b")
+
+    def part_puts(self):
+        return sum(1 for m, p in self.svc.calls if m == "PUT" and p.endswith("/big.bin"))
+
+    def stored(self):
+        return self.svc.items["item"]["big.bin"]
+
+    def upload(self, **kw):
+        return ia_multipart.multipart_upload(self.s3, "item", str(self.file), {"title": "t"}, part_size=PART, **kw)
+
+    def test_resume_sends_only_missing_parts(self):
+        states = []
+        def stop_after_first(st):
+            states.append(st)
+            if st["parts"]: raise Interrupted()
+        with self.assertRaises(Interrupted): self.upload(workers=1, on_part=stop_after_first)
+        self.assertEqual(list(states[-1]["parts"]), ["1"]); self.assertEqual(self.part_puts(), 1)
+        etag = self.upload(workers=2, state=states[-1])
+        self.assertEqual(self.part_puts(), 3)  # parts 2 and 3 only
+        self.assertTrue(etag.endswith("-3"))
+        self.assertEqual(self.stored()["sha256"], hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(self.svc.uploads, {})
+
+    def test_vanished_upload_starts_over(self):
+        state = {"upload_id": "gone", "part_size": PART, "parts": {"1": "00" * 16}}
+        self.upload(workers=1, state=state)
+        self.assertEqual(self.part_puts(), 3)
+        self.assertEqual(self.stored()["md5"], hashlib.md5(self.data).hexdigest())
+
+    def test_failed_parts_are_retried_and_journal_cleared(self):
+        self.svc.fail_uploads = 2
+        journal = UploadJournal(pathlib.Path(self.tmp.name) / "journal.json")
+        uploader_core.upload_to_internet_archive("item", [str(self.file)], {"title": "t"}, journal=journal, job="job",
+                                                 multipart_threshold=PART, part_size=PART, part_workers=2)
+        self.assertEqual(self.part_puts(), 5)
+        self.assertEqual(self.stored()["sha256"], hashlib.sha256(self.data).hexdigest())
+        digest = hashlib.sha256(self.data).hexdigest()
+        self.assertTrue(journal.has("job", "internet_archive", "big.bin", digest))
+        self.assertIsNone(journal.partial("job", "internet_archive", "big.bin"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# MIT License
+"""Incremental publishing: remote_manifest against mock_services.MockIAS3 and the uploader skipping what it holds.
+
+    python -m unittest discover tests
+"""
+import os, sys, hashlib, pathlib, tempfile, unittest
+from unittest import mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import uploader_core, upload_journal
+from bundle_stream import TarBundle
+from mock_services import MockIAS3, serve
+from remote_manifest import ia_manifest, unchanged
+
+class Incremental(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        d = pathlib.Path(self.tmp.name)
+        self.files = []
+        for name, text in (("STORY.md", "a flame carried forward\n"), ("data.csv", "a,b\n1,2\n"), ("notes.txt", "n\n")):
+            (d / name).write_text(text, encoding="utf-8"); self.files.append(str(d / name))
+        self.svc = MockIAS3(); srv = serve(self.svc); self.addCleanup(srv.server_close); self.addCleanup(srv.shutdown)
+        env = mock.patch.dict(os.environ, {"IA_S3_URL": self.svc.base, "IA_METADATA_URL": self.svc.base + "/metadata",
+                                           "IA_ACCESS_KEY": "a", "IA_SECRET_KEY": "b", "FABRIC_DIGEST_CACHE": "off"})
+        env.start(); self.addCleanup(env.stop)
+        nap = mock.patch.object(upload_journal.time, "sleep"); nap.start(); self.addCleanup(nap.stop)
+
+    def publish(self, files, incremental=True):
+        # threshold 1: every file goes through the S3 API the mock serves
+        return uploader_core.upload_to_internet_archive("item", files, {"title": "t"}, multipart_threshold=1,
+                                                        incremental=incremental)
+
+    def puts(self):
+        return sorted(p.rsplit("/", 1)[1] for m, p in self.svc.calls if m == "PUT")
+
+    def test_manifest_of_unknown_and_known_item(self):
+        self.assertEqual(ia_manifest("item"), {})
+        self.publish(self.files, incremental=False)
+        m = ia_manifest("item")
+        self.assertEqual(sorted(m), ["STORY.md", "data.csv", "notes.txt"])
+        body = pathlib.Path(self.files[0]).read_bytes()
+        self.assertEqual(m["STORY.md"], {"bytes": len(body), "md5": hashlib.md5(body).hexdigest(),
+                                         "sha1": hashlib.sha1(body).hexdigest()})
+
+    def test_only_changed_files_are_sent_again(self):
+        self.publish(self.files); self.svc.calls.clear()
+        pathlib.Path(self.files[1]).write_text("a,b\n1,3\n", encoding="utf-8")  # same size, new content
+        self.publish(self.files)
+        self.assertEqual(self.puts(), ["data.csv"])
+        self.svc.calls.clear(); self.publish(self.files)
+        self.assertEqual(self.puts(), [])
+
+    def test_size_mismatch_skips_hashing(self):
+        remote = {"STORY.md": {"bytes": 1, "md5": "00" * 16}, "data.csv": {"bytes": None, "md5": None}}
+        with mock.patch("remote_manifest.md5_files", return_value=[]) as md5:
+            self.assertEqual(unchanged(self.files, [os.path.getsize(f) for f in self.files], remote), [False] * 3)
+        self.assertEqual(md5.call_args.args[0], [])
+
+    def test_bundle_compared_by_its_md5(self):
+        b = TarBundle("release.tar", self.files)
+        self.assertEqual(unchanged([b], [b.size], {"release.tar": {"bytes": b.size, "md5": "00" * 16}}), [False])
+        self.publish([b], incremental=False)
+        self.assertEqual(self.svc.items["item"]["release.tar"]["md5"], b.manifest["md5"])
+        self.assertEqual(unchanged([TarBundle("release.tar", self.files)], [b.size], ia_manifest("item")), [True])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# MIT License
+"""mirror_audit against mock_services.MockMirror: resuming cut-off responses and naming mismatched chunks.
+
+    python -m unittest discover tests
+"""
+import os, sys, hashlib, pathlib, tempfile, unittest
+from unittest import mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import mirror_audit
+from mirror_audit import audit, audit_session, fetch, url_mirror
+from mock_services import MockMirror, serve
+
+CS = 256 << 10  # chunk size of the tree entries below, several mirror_audit reads each
+
+def sha(b):
+    return hashlib.sha256(b).hexdigest()
+
+class MirrorAudit(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); self.addCleanup(self.tmp.cleanup)
+        self.root = pathlib.Path(self.tmp.name)
+        self.data = os.urandom(5 * CS + 999); (self.root / "big.bin").write_bytes(self.data)
+        self.svc = MockMirror(self.root); srv = serve(self.svc); self.addCleanup(srv.server_close); self.addCleanup(srv.shutdown)
+        nap = mock.patch.object(mirror_audit.time, "sleep"); nap.start(); self.addCleanup(nap.stop)
+        self.session = audit_session(2); self.addCleanup(self.session.close)
+        self.url = f"{self.svc.base}/big.bin"
+
+    def entry(self, **kw):
+        chunks = [sha(self.data[i:i + CS]) for i in range(0, len(self.data), CS)]
+        return {"name": "big.bin", "bytes": len(self.data), "sha256": sha(self.data), "source": "block 0",
+                "chunk_size": CS, "chunks": chunks, **kw}
+
+    def test_cut_off_responses_are_resumed(self):
+        self.svc.drops = 3; self.svc.drop_after = 100_000
+        res = fetch(self.session, self.url, expect=len(self.data))
+        self.assertEqual((res["status"], res["bytes"], res["sha256"]), ("ok", len(self.data), sha(self.data)))
+        self.assertEqual(res["resumes"], 3); self.assertEqual(self.svc.drops, 0)
+        self.assertEqual(len([c for c in self.svc.calls if c[0] == "GET"]), 4)
+
+    def test_cut_off_range_is_resumed_within_its_bounds(self):
+        self.svc.drops = 1; self.svc.drop_after = 100_000
+        res = fetch(self.session, self.url, expect=len(self.data), offset=CS, length=CS)
+        self.assertEqual((res["status"], res["sha256"], res["resumes"]), ("ok", sha(self.data[CS:2 * CS]), 1))
+
+    def test_wrong_size_and_missing(self):
+        self.assertEqual(fetch(self.session, self.url, expect=len(self.data) + 1)["status"], "size")
+        self.assertEqual(fetch(self.session, f"{self.svc.base}/nope.bin")["status"], "missing")
+
+    def test_chunk_mismatch_names_the_chunk(self):
+        bad = bytearray(self.data); bad[2 * CS + 5] ^= 0xFF; (self.root / "big.bin").write_bytes(bytes(bad))
+        self.svc.drops = 2; self.svc.drop_after = 100_000  # and the link is flaky on top
+        report = audit([self.entry()], [url_mirror(self.svc.base)], connections=2)
+        self.assertFalse(report["ok"])
+        row = report["files"][0]
+        self.assertEqual(row["status"], "chunks")
+        self.assertEqual(row["bad_chunks"], [{"chunk": 2, "offset": 2 * CS, "length": CS}])
+        self.assertEqual(row["fetched"], len(self.data)); self.assertEqual(row["resumes"], 2)
+
+    def test_whole_file_digest_mismatch(self):
+        report = audit([self.entry(chunks=[sha(b"")], sha256="00" * 32)], [url_mirror(self.svc.base)])
+        row = report["files"][0]
+        self.assertEqual((row["status"], row["actual_sha256"]), ("digest", sha(self.data)))
+        ok = audit([self.entry()], [url_mirror(self.svc.base)])
+        self.assertTrue(ok["ok"]); self.assertEqual(ok["files"][0]["status"], "ok")
+
+if __name__ == "__main__":
+    unittest.main()
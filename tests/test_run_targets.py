@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# MIT License
+"""run_targets timeouts: a timed-out target is cancelled, not left running.
+
+    python -m unittest discover tests
+"""
+import sys, time, pathlib, threading, unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from uploader_core import Monitor, Cancelled, run_targets
+
+def chunked(stopped, chunks=200):
+    """A fake upload: one progress event per 10 ms chunk, like _MonitoredBar."""
+    def task(monitor):
+        try:
+            for _ in range(chunks):
+                monitor.emit("bytes", "slow", "f", 1); time.sleep(0.01)
+            return "finished"
+        finally:
+            stopped.set()
+    return task
+
+class RunTargetsTimeout(unittest.TestCase):
+    def test_timed_out_target_stops_at_next_chunk(self):
+        stopped = threading.Event(); events = []
+        parent = Monitor(events.append)
+        t0 = time.monotonic()
+        done, errors = run_targets({"slow": chunked(stopped), "fast": lambda m: "ok"},
+                                   {"slow": 0.2}, monitor=parent, grace=5)
+        self.assertTrue(stopped.is_set())
+        self.assertLess(time.monotonic() - t0, 1.5)
+        self.assertEqual(done, {"fast": "ok"})
+        self.assertEqual(errors, {"slow": "timed out after 0.2s"})
+        self.assertFalse(parent.cancelled)
+        n = len(events); time.sleep(0.05)
+        self.assertEqual(len(events), n)  # nothing reaches the parent after run_targets returns
+
+    def test_parent_cancel_reaches_targets(self):
+        stopped = threading.Event(); parent = Monitor(lambda ev: None); parent.cancel()
+        with self.assertRaises(Cancelled):
+            run_targets({"slow": chunked(stopped)}, monitor=parent)
+        self.assertTrue(stopped.wait(1))
+
+if __name__ == "__main__":
+    unittest.main()
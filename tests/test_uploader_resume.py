@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# MIT License
+"""upload_to_internet_archive against a stubbed internetarchive item (no network).
+
+    python -m unittest discover tests
+"""
+import os, sys, pathlib, tempfile, unittest
+from unittest import mock
+import requests
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import uploader_core
+from upload_journal import UploadJournal
+
+def response(status):
+    r = requests.Response(); r.status_code = status
+    return r
+
+class StubItem:
+    def __init__(self, status):
+        self.status = status; self.calls = 0
+
+    def upload(self, path, **kw):
+        self.calls += 1
+        return [response(self.status)]
+
+class SingleUploadResume(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(); d = pathlib.Path(self.tmp.name)
+        self.file = d / "STORY.md"; self.file.write_text("a flame carried forward\n", encoding="utf-8")
+        self.journal = UploadJournal(d / "journal.json")
+        env = mock.patch.dict(os.environ, {"IA_ACCESS_KEY": "a", "IA_SECRET_KEY": "b", "FABRIC_DIGEST_CACHE": "off"})
+        env.start(); self.addCleanup(env.stop); self.addCleanup(self.tmp.cleanup)
+
+    def upload(self, item, retries=3):
+        with mock.patch.object(uploader_core.ia, "get_item", return_value=item), \
+             mock.patch.object(uploader_core.time, "sleep"):
+            return uploader_core.upload_to_internet_archive(
+                "item", [str(self.file)], {"title": "t"}, retries=retries, journal=self.journal, job="job",
+                multipart_threshold=0)
+
+    def digest(self):
+        return uploader_core.hash_file(self.file)[1]
+
+    def test_already_on_item_counts_as_uploaded(self):
+        # internetarchive returns an empty Response (status_code None) when the md5 already matches
+        item = StubItem(None)
+        self.assertEqual(self.upload(item), "https://archive.org/details/item")
+        self.assertEqual(item.calls, 1)
+        self.assertTrue(self.journal.has("job", "internet_archive", "STORY.md", self.digest()))
+
+    def test_uploaded_file_is_journaled(self):
+        self.upload(StubItem(200))
+        self.assertTrue(self.journal.has("job", "internet_archive", "STORY.md", self.digest()))
+
+    def test_server_error_fails_after_retries(self):
+        item = StubItem(500)
+        with self.assertRaises(RuntimeError): self.upload(item, retries=2)
+        self.assertEqual(item.calls, 2)
+        self.assertFalse(self.journal.has("job", "internet_archive", "STORY.md", self.digest()))
+
+if __name__ == "__main__":
+    unittest.main()
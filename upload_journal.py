@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# MIT License
+"""On-disk upload journal so an interrupted run_archive can resume.
+
+Layout (JSON):
+  {"version": 1, "jobs": {<job>: {<target>: {"identifier" | "deposition_id": ...,
+                                              "files": {<name>: {"bytes": n, "sha256": hex}}}}}}
+
+A file counts as delivered to a target only if its recorded sha256 matches the
+local digest, so a changed file is uploaded again.
+"""
+from __future__ import annotations
+import os, json, random, time, pathlib, threading, logging
+from typing import Callable, Optional, TypeVar
+import telemetry
+
+ROOT = pathlib.Path(__file__).resolve().parent
+DEFAULT_JOURNAL = ROOT / ".upload_journal.json"
+
+log = logging.getLogger("testament.uploader")
+T = TypeVar("T")
+
+def retry_with_backoff(fn: Callable[[], T], attempts: int = 3, base: float = 1.0,
+                       cap: float = 30.0, what: str = "operation", target: str = "other") -> T:
+    """Call fn until it succeeds, sleeping a full-jitter exponential backoff between tries.
+
+    Each retry bumps the "retries" telemetry counter for target.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts:
+                raise RuntimeError(f"{what} failed after {attempts} attempts: {e}") from e
+            delay = random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+            log.warning(f"{what} attempt {attempt}/{attempts} failed: {e} (retrying in {delay:.1f}s)")
+            telemetry.count("retries", target=target)
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+class UploadJournal:
+    def __init__(self, path: os.PathLike | str = DEFAULT_JOURNAL):
+        self.path = pathlib.Path(path)
+        self._lock = threading.RLock()
+        self.data = {"version": 1, "jobs": {}}
+        if self.path.exists():
+            self.data = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def target(self, job: str, target: str) -> dict:
+        """Mutable state dict for (job, target); persist changes with set/record."""
+        with self._lock:
+            t = self.data["jobs"].setdefault(job, {}).setdefault(target, {})
+            t.setdefault("files", {})
+            return t
+
+    def has(self, job: str, target: str, name: str, digest: str) -> bool:
+        with self._lock:
+            return self.target(job, target)["files"].get(name, {}).get("sha256") == digest
+
+    def record(self, job: str, target: str, name: str, size: int, digest: str) -> None:
+        with self._lock:
+            self.target(job, target)["files"][name] = {"bytes": size, "sha256": digest}
+            self.save()
+
+    def set(self, job: str, target: str, **fields) -> None:
+        with self._lock:
+            self.target(job, target).update(fields)
+            self.save()
+
+    def partial(self, job: str, target: str, name: str) -> Optional[dict]:
+        """In-progress state for a file that is uploaded in pieces (e.g. multipart parts)."""
+        with self._lock:
+            return self.target(job, target).get("partial", {}).get(name)
+
+    def set_partial(self, job: str, target: str, name: str, state: Optional[dict]) -> None:
+        with self._lock:
+            partial = self.target(job, target).setdefault("partial", {})
+            if state is None: partial.pop(name, None)
+            else: partial[name] = state
+            self.save()
+
+    def reset(self, job: str, target: str, **fields) -> None:
+        """Forget every delivered file for a target (e.g. its deposition vanished)."""
+        with self._lock:
+            self.data["jobs"].setdefault(job, {})[target] = {"files": {}, **fields}
+            self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2, sort_keys=True)
+                f.flush(); os.fsync(f.fileno())
+            os.replace(tmp, self.path)
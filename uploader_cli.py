@@ -1,25 +1,95 @@
 #!/usr/bin/env python3
 # MIT License
 import argparse, sys, json
-from uploader_core import run_archive
+from uploader_core import read_manifest, run_archive, run_batch
 
 def parse_args():
     p = argparse.ArgumentParser(description="The Testament Uploader — CLI (IA + Zenodo)")
-    p.add_argument("--title", required=True)
+    p.add_argument("--title")
     p.add_argument("--creator", action="append", default=[])
-    p.add_argument("--description", required=True)
+    p.add_argument("--description")
     p.add_argument("--tag", action="append", default=[])
-    p.add_argument("--file", action="append", required=True)
+    p.add_argument("--file", action="append")
     p.add_argument("--identifier")
     p.add_argument("--no-ia", action="store_true")
     p.add_argument("--no-zenodo", action="store_true")
     p.add_argument("--zenodo-no-publish", action="store_true")
     p.add_argument("--zenodo-live", action="store_true")
     p.add_argument("--dry-run", action="store_true")
-    return p.parse_args()
+    p.add_argument("--concurrent", action="store_true", help="Upload to IA and Zenodo at the same time")
+    p.add_argument("--max-concurrency", type=int, default=2, help="Max targets uploading at once (with --concurrent)")
+    p.add_argument("--ia-timeout", type=float, help="Seconds before the IA upload is cancelled (with --concurrent)")
+    p.add_argument("--zenodo-timeout", type=float, help="Seconds before the Zenodo upload is cancelled (with --concurrent)")
+    p.add_argument("--zenodo-workers", type=int, default=1, help="Parallel file uploads to the Zenodo bucket")
+    p.add_argument("--ia-multipart-threshold-mb", type=float,
+                   help="Files at least this large go through IA S3 multipart (0 disables; default 256)")
+    p.add_argument("--ia-part-size-mb", type=float, help="IA multipart part size (default 64, min 5)")
+    p.add_argument("--ia-part-workers", type=int, help="Concurrent IA part uploads per file (default 4)")
+    p.add_argument("--journal", help="Upload journal path (default .upload_journal.json next to the uploader)")
+    p.add_argument("--no-resume", action="store_true", help="Ignore the upload journal and upload everything")
+    p.add_argument("--incremental", action="store_true",
+                   help="Upload only files the IA item / Zenodo record does not already hold (Zenodo: new version)")
+    p.add_argument("--zenodo-previous", type=int, metavar="DEPOSITION_ID",
+                   help="Published deposition to make a new version of (with --incremental; default from the journal)")
+    p.add_argument("--bundle", metavar="NAME.tar",
+                   help="Send all files as one tar streamed on the fly (one request per target)")
+    p.add_argument("--bundle-manifest", help="Where to write the bundle's member digests (default NAME.tar.manifest.json)")
+    p.add_argument("--batch", metavar="MANIFEST.jsonl",
+                   help="Run every job in a JSONL manifest (one run_archive keyword set per line); "
+                        "the other upload flags become per-job defaults")
+    p.add_argument("--jobs", type=int, default=4, help="Batch jobs running at once (with --batch)")
+    p.add_argument("--results", help="Append one JSON result line per batch job here (default stdout)")
+    a = p.parse_args()
+    if not a.batch and not (a.title and a.description and a.file):
+        p.error("--title, --description and --file are required (or use --batch)")
+    if a.batch:
+        # each names one item/deposition/tar, so as a default every job would collide on it
+        per_job = [f for f, v in (("--identifier", a.identifier), ("--bundle", a.bundle),
+                                  ("--bundle-manifest", a.bundle_manifest), ("--zenodo-previous", a.zenodo_previous))
+                   if v is not None]
+        if per_job:
+            p.error(f"{', '.join(per_job)} cannot be used with --batch; set "
+                    "identifier/bundle/bundle_manifest/zenodo_previous per job in the manifest")
+    return a
+
+def shared_options(a) -> dict:
+    return dict(
+        do_ia=not a.no_ia,
+        do_zenodo=not a.no_zenodo,
+        zenodo_publish=not a.zenodo_no_publish,
+        zenodo_sandbox=not a.zenodo_live,
+        concurrent=a.concurrent,
+        max_concurrency=a.max_concurrency,
+        ia_timeout=a.ia_timeout,
+        zenodo_timeout=a.zenodo_timeout,
+        zenodo_workers=a.zenodo_workers,
+        ia_multipart_threshold=None if a.ia_multipart_threshold_mb is None else int(a.ia_multipart_threshold_mb * 2**20),
+        ia_part_size=None if a.ia_part_size_mb is None else int(a.ia_part_size_mb * 2**20),
+        ia_part_workers=a.ia_part_workers,
+        incremental=a.incremental
+    )
+
+def main_batch(a) -> int:
+    try:
+        jobs = read_manifest(a.batch)
+    except (OSError, ValueError) as e:
+        print(f"[!] {e}", file=sys.stderr); return 2
+    out = open(a.results, "a", encoding="utf-8") if a.results else sys.stdout
+    try:
+        def emit(res):
+            out.write(json.dumps(res, sort_keys=True) + "\n"); out.flush()
+        defaults = {"creators": a.creator, "tags": a.tag, **shared_options(a)}
+        results = run_batch(jobs, max_jobs=a.jobs, defaults=defaults, dry_run=a.dry_run,
+                            resume=not a.no_resume, journal_path=a.journal, on_result=emit)
+    finally:
+        if out is not sys.stdout: out.close()
+    failed = sum(not r["ok"] for r in results)
+    print(f"[+] {len(results) - failed}/{len(results)} job(s) done" + (f", {failed} failed" if failed else ""), file=sys.stderr)
+    return 1 if failed else 0
 
 def main():
     a = parse_args()
+    if a.batch: return main_batch(a)
     res = run_archive(
         title=a.title,
         creators=a.creator,
@@ -27,13 +97,16 @@ def main():
         tags=a.tag,
         files=a.file,
         identifier=a.identifier,
-        do_ia=not a.no_ia,
-        do_zenodo=not a.no_zenodo,
-        zenodo_publish=not a.zenodo_no_publish,
-        zenodo_sandbox=not a.zenodo_live,
-        dry_run=a.dry_run
+        bundle=a.bundle,
+        bundle_manifest=a.bundle_manifest,
+        dry_run=a.dry_run,
+        resume=not a.no_resume,
+        journal_path=a.journal,
+        zenodo_previous=a.zenodo_previous,
+        **shared_options(a)
     )
     print(json.dumps(res, indent=2))
+    return 1 if res.get("errors") else 0
 
 if __name__ == "__main__":
     sys.exit(main() or 0)
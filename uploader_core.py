@@ -2,11 +2,19 @@
 # MIT License
 from __future__ import annotations
 import os, sys, time, json, hashlib, pathlib, logging
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+import threading
 from tqdm import tqdm
 from dotenv import load_dotenv
 import requests
 import internetarchive as ia
+from file_hashing import default_cache, hash_file, hash_files
+from upload_journal import DEFAULT_JOURNAL, UploadJournal, retry_with_backoff
+import ia_multipart
+from bundle_stream import TarBundle, write_manifest
+from remote_manifest import ia_manifest, unchanged, zenodo_manifest
+import telemetry
 
 log = logging.getLogger("testament.uploader")
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -14,14 +22,76 @@ logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 load_dotenv()
 
 def sha256sum(path: str) -> str:
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(1024*1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
+    # no save per file: the shared cache is saved by the next batch hash or at exit
+    with telemetry.span("sha256sum") as sp:
+        size, digest = hash_file(path, default_cache()); sp.add(bytes=size)
+    return digest
 
-def build_checksums(files: List[str]) -> Dict[str, str]:
-    return {os.path.basename(f): sha256sum(f) for f in files}
+def build_checksums(files: List[str], workers: Optional[int] = None) -> Dict[str, str]:
+    with telemetry.span("build_checksums") as sp:
+        digests = hash_files(files, workers=workers, cache=default_cache())
+        sp.add(files=len(files), bytes=sum(size for size, _ in digests))
+    return {os.path.basename(f): d for f, (_, d) in zip(files, digests)}
+
+class Cancelled(BaseException):
+    """Raised in upload threads once a Monitor is cancelled.
+
+    A BaseException, like KeyboardInterrupt, so retry loops and run_targets'
+    per-target error handling let it through.
+    """
+
+class Monitor:
+    """Byte-level progress sink and cancel switch for run_archive (used by the GUI).
+
+    on_event receives {"event": "start" | "bytes" | "done" | "skip", "target", "file", "bytes"}
+    from upload threads, so it should only hand events off (e.g. to a queue).
+    A monitor with a parent forwards its events there and is cancelled with it
+    (run_targets gives each target one, so a timeout stops just that target).
+    """
+
+    def __init__(self, on_event: Optional[Callable[[Dict], None]] = None, parent: Optional["Monitor"] = None):
+        self.on_event = on_event; self.parent = parent
+        self._cancel = threading.Event(); self._reason = "archive cancelled"
+
+    def cancel(self, reason: str = "archive cancelled") -> None:
+        self._reason = reason; self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def check(self) -> None:
+        if self._cancel.is_set(): raise Cancelled(self._reason)
+        if self.parent is not None: self.parent.check()
+
+    def emit(self, event: str, target: str, name: str, n: int = 0) -> None:
+        # start and forward progress are where a cancel takes effect; done/skip must never be lost
+        if event == "start" or (event == "bytes" and n >= 0): self.check()
+        if self.on_event is not None: self.on_event({"event": event, "target": target, "file": name, "bytes": n})
+        if self.parent is not None: self.parent.emit(event, target, name, n)
+
+class _MonitoredBar:
+    """Stands in for a tqdm bar: forwards updates to it and to a Monitor."""
+
+    def __init__(self, bar, monitor: Monitor, target: str, name: str):
+        self.bar = bar; self.monitor = monitor; self.target = target; self.name = name
+
+    def update(self, n: int) -> None:
+        self.bar.update(n); self.monitor.emit("bytes", self.target, self.name, n)
+
+def _watch(bar, monitor: Optional[Monitor], target: str, name: str):
+    return bar if monitor is None else _MonitoredBar(bar, monitor, target, name)
+
+def _emit(monitor: Optional[Monitor], event: str, target: str, name: str, n: int = 0) -> None:
+    if monitor is not None: monitor.emit(event, target, name, n)
+
+def _name(f) -> str:
+    return f.name if isinstance(f, TarBundle) else os.path.basename(f)
+
+def _sizes_digests(files: list) -> List[Tuple[int, str]]:
+    """hash_files for paths; a TarBundle contributes its size and stat key (it is hashed while it uploads)."""
+    hashed = iter(hash_files([f for f in files if not isinstance(f, TarBundle)], cache=default_cache()))
+    return [(f.size, f.key) if isinstance(f, TarBundle) else next(hashed) for f in files]
 
 def ensure_paths(files: List[str]) -> List[str]:
     ok = []
@@ -42,9 +112,14 @@ def default_metadata(title: str, creators: List[str], description: str, tags: Li
         "notes": "Fabric Testament — ♾️🔥📜",
     }
 
+@telemetry.traced("upload", target="internet_archive")
 def upload_to_internet_archive(identifier: str, files: List[str], md: Dict,
                                retries: int = 3, collection: Optional[str] = None,
-                               mediatype: str = "texts") -> str:
+                               mediatype: str = "texts", journal: Optional[UploadJournal] = None,
+                               job: Optional[str] = None, multipart_threshold: Optional[int] = None,
+                               part_size: Optional[int] = None, part_workers: Optional[int] = None,
+                               sessions: Optional["SharedSessions"] = None, monitor: Optional[Monitor] = None,
+                               incremental: bool = False) -> str:
     ak = os.getenv("IA_ACCESS_KEY"); sk = os.getenv("IA_SECRET_KEY")
     if not ak or not sk:
         raise RuntimeError("IA credentials missing (IA_ACCESS_KEY / IA_SECRET_KEY)")
@@ -61,19 +136,103 @@ def upload_to_internet_archive(identifier: str, files: List[str], md: Dict,
         "description": md.get("description"),
         "licenseurl": "https://opensource.org/licenses/MIT",
     }
-    item = ia.get_item(identifier)
-    for attempt in range(1, retries+1):
+    if journal is not None:
+        state = journal.target(job, "internet_archive")
+        if state.get("identifier") != identifier:
+            journal.reset(job, "internet_archive", identifier=identifier)
+    if multipart_threshold is None:
+        multipart_threshold = int(os.getenv("IA_MULTIPART_THRESHOLD", ia_multipart.DEFAULT_THRESHOLD))
+    part_size = part_size or int(os.getenv("IA_PART_SIZE", ia_multipart.DEFAULT_PART_SIZE))
+    part_workers = part_workers or int(os.getenv("IA_PART_WORKERS", ia_multipart.DEFAULT_PART_WORKERS))
+    item = None; s3 = None  # the item metadata lookup is only needed for non-multipart uploads
+    digests = _sizes_digests(files); same = set()
+    if incremental:
+        todo = [i for i, f in enumerate(files)
+                if journal is None or not journal.has(job, "internet_archive", _name(f), digests[i][1])]
+        remote = retry_with_backoff(lambda: ia_manifest(identifier), retries, base=2.0,
+                                    what=f"IA metadata of {identifier}", target="internet_archive")
+        kept = unchanged([files[i] for i in todo], [digests[i][0] for i in todo], remote, default_cache())
+        same = {i for i, keep in zip(todo, kept) if keep}
+        log.info(f"IA: {len(same)} of {len(todo)} file(s) already on {identifier}")
+    for n, (f, (size, digest)) in enumerate(zip(files, digests)):
+        name = _name(f)
+        if journal is not None and journal.has(job, "internet_archive", name, digest):
+            log.info(f"IA: {name} already uploaded, skipping")
+            _emit(monitor, "skip", "internet_archive", name, size); continue
+        if n in same:
+            log.info(f"IA: {name} unchanged on the item, skipping")
+            if journal is not None: journal.record(job, "internet_archive", name, size, digest)
+            _emit(monitor, "skip", "internet_archive", name, size); continue
+        _emit(monitor, "start", "internet_archive", name, size)
+        if isinstance(f, TarBundle):
+            s3 = s3 or (sessions.ia_s3(ak, sk) if sessions else ia_multipart.s3_session(ak, sk, pool_size=part_workers))
+            with telemetry.span("upload_file", target="internet_archive", mode="bundle") as sp:
+                retry_with_backoff(lambda: _ia_put_bundle(s3, identifier, f, md_ia, monitor), retries, base=2.0,
+                                   what=f"IA upload of {name}", target="internet_archive")
+                sp.add(bytes=size)
+            if journal is not None:
+                journal.record(job, "internet_archive", name, size, digest)
+            _emit(monitor, "done", "internet_archive", name); continue
+        if multipart_threshold > 0 and size >= multipart_threshold:
+            s3 = s3 or (sessions.ia_s3(ak, sk) if sessions else ia_multipart.s3_session(ak, sk, pool_size=part_workers))
+            with telemetry.span("upload_file", target="internet_archive", mode="multipart") as sp:
+                _ia_multipart_file(s3, identifier, f, size, digest, md_ia, part_size, part_workers,
+                                   retries, journal, job, monitor)
+                sp.add(bytes=size)
+            _emit(monitor, "done", "internet_archive", name); continue
+        if item is None: item = sessions.ia().get_item(identifier) if sessions else ia.get_item(identifier)
+        def put():
+            r = item.upload(f, metadata=md_ia, access_key=ak, secret_key=sk,
+                            retries=5, verify=True, checksum=True, verbose=True)[0]
+            # checksum=True: a file the item already holds (same md5) is not sent and comes back
+            # as an empty Response with status_code None, e.g. after a crash before journal.record
+            if r.status_code is None:
+                log.info(f"IA: {name} already on the item, skipping"); return
+            if not r.ok:
+                raise RuntimeError(f"status={r.status_code}")
+        with telemetry.span("upload_file", target="internet_archive", mode="single") as sp:
+            retry_with_backoff(put, retries, base=2.0, what=f"IA upload of {name}", target="internet_archive")
+            sp.add(bytes=size)
+        if journal is not None:
+            journal.record(job, "internet_archive", name, size, digest)
+        # the internetarchive client reports no byte progress of its own: the file counts once it is in
+        _emit(monitor, "bytes", "internet_archive", name, size); _emit(monitor, "done", "internet_archive", name)
+    return f"https://archive.org/details/{identifier}"
+
+def _ia_multipart_file(s3: requests.Session, identifier: str, path: str, size: int, digest: str,
+                       md_ia: Dict, part_size: int, part_workers: int, retries: int,
+                       journal: Optional[UploadJournal], job: Optional[str], monitor: Optional[Monitor] = None) -> None:
+    """Multipart-upload one large file, journaling finished parts so a rerun resumes mid-file."""
+    name = os.path.basename(path)
+    state = journal.partial(job, "internet_archive", name) if journal is not None else None
+    if state and state.get("sha256") != digest: state = None
+    def on_part(st):
+        if journal is not None:
+            journal.set_partial(job, "internet_archive", name, {**st, "sha256": digest})
+    started = time.monotonic()
+    with tqdm(total=size, desc=f"IA {name}", unit="B", unit_scale=True, unit_divisor=1024) as bar:
+        ia_multipart.multipart_upload(s3, identifier, path, md_ia, part_size=part_size, workers=part_workers,
+                                      retries=max(retries, 5), state=state, on_part=on_part,
+                                      progress=_watch(bar, monitor, "internet_archive", name).update)
+    elapsed = max(time.monotonic() - started, 1e-9)
+    log.info(f"IA: {name} multipart, {size/2**20:.1f} MiB in {elapsed:.1f}s ({size/2**20/elapsed:.1f} MiB/s)")
+    if journal is not None:
+        journal.set_partial(job, "internet_archive", name, None)
+        journal.record(job, "internet_archive", name, size, digest)
+
+def _ia_put_bundle(s3: requests.Session, identifier: str, bundle: TarBundle, md_ia: Dict,
+                   monitor: Optional[Monitor] = None) -> None:
+    """Stream a tar bundle into the item with one PUT; the md5 taken on the way must match the ETag."""
+    with tqdm(total=bundle.size, desc=f"IA {bundle.name}", unit="B", unit_scale=True, unit_divisor=1024) as bar, \
+         bundle.open() as fp:
+        body = ProgressReader(fp, bundle.size, _watch(bar, monitor, "internet_archive", bundle.name))
         try:
-            r = item.upload(files, metadata=md_ia, access_key=ak, secret_key=sk,
-                            retries=5, verify=True, checksum=True, verbose=True)
-            if r.ok:
-                return f"https://archive.org/details/{identifier}"
-            else:
-                raise RuntimeError(f"IA upload failed (status={r.status_code})")
-        except Exception as e:
-            log.warning(f"IA upload attempt {attempt}/{retries} failed: {e}")
-            time.sleep(2*attempt)
-    raise RuntimeError("IA upload failed after retries")
+            etag = ia_multipart.put_object(s3, identifier, bundle.name, body, md_ia)
+        except Exception:
+            body.rewind_progress(); raise
+    if etag and etag != body.md5.hexdigest():
+        body.rewind_progress()
+        raise RuntimeError(f"IA upload of {bundle.name}: ETag {etag} != md5 {body.md5.hexdigest()}")
 
 ZENODO_API = "https://zenodo.org/api"
 ZENODO_SANDBOX_API = "https://sandbox.zenodo.org/api"
@@ -81,23 +240,215 @@ ZENODO_SANDBOX_API = "https://sandbox.zenodo.org/api"
 def _zenodo_headers(token: str) -> Dict[str, str]:
     return {"Authorization": f"Bearer {token}"}
 
-def upload_to_zenodo(files: List[str], md: Dict, publish: bool = True, use_sandbox: bool = True) -> Tuple[str, Optional[str]]:
+def zenodo_session(token: str, pool_size: int = 4) -> requests.Session:
+    """One keep-alive session for every Zenodo call, sized for parallel file PUTs."""
+    s = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    s.mount("https://", adapter); s.mount("http://", adapter)
+    s.headers.update(_zenodo_headers(token))
+    return s
+
+class SharedSessions:
+    """HTTP sessions reused by every job of a batch, created on first use (thread-safe)."""
+
+    def __init__(self, pool_size: int = 16):
+        self.pool_size = pool_size; self._mu = threading.Lock(); self._by_key: Dict[tuple, object] = {}
+
+    def _get(self, key: tuple, make: Callable[[], object]):
+        with self._mu:
+            if key not in self._by_key: self._by_key[key] = make()
+            return self._by_key[key]
+
+    def zenodo(self, token: str) -> requests.Session:
+        return self._get(("zenodo", token), lambda: zenodo_session(token, pool_size=self.pool_size))
+
+    def ia_s3(self, access_key: str, secret_key: str) -> requests.Session:
+        return self._get(("ia_s3", access_key, secret_key),
+                         lambda: ia_multipart.s3_session(access_key, secret_key, pool_size=self.pool_size))
+
+    def ia(self):
+        """internetarchive session for item lookups and non-multipart uploads."""
+        return self._get(("ia",), lambda: ia.get_session(http_adapter_kwargs={"pool_maxsize": self.pool_size}))
+
+class ProgressReader:
+    """File wrapper streamed as a request body: feeds byte counts to a tqdm bar and md5s what it sends."""
+
+    def __init__(self, fp, size: int, bar=None):
+        self.fp = fp; self.size = size; self.bar = bar
+        self.sent = 0; self.md5 = hashlib.md5()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def read(self, n: int = -1) -> bytes:
+        chunk = self.fp.read(1 << 20 if n is None or n < 0 else n)
+        if chunk:
+            self.sent += len(chunk); self.md5.update(chunk)
+            if self.bar is not None: self.bar.update(len(chunk))
+        return chunk
+
+    def rewind_progress(self) -> None:
+        if self.bar is not None and self.sent: self.bar.update(-self.sent)
+        self.sent = 0
+
+def _zenodo_api(use_sandbox: bool) -> str:
+    # ZENODO_API_URL points the uploader at a local stand-in (see mock_services.py)
+    override = os.getenv("ZENODO_API_URL")
+    if override: return override.rstrip("/")
+    return ZENODO_SANDBOX_API if (use_sandbox or os.getenv("ZENODO_SANDBOX") == "1") else ZENODO_API
+
+def _zenodo_deposition(api: str, session: requests.Session, journal: Optional[UploadJournal],
+                       job: Optional[str], previous: Optional[int] = None) -> Dict:
+    """Reuse the journaled draft deposition if it still exists, else create a new one.
+
+    With previous (a published deposition id) the new one is its next version,
+    which starts out holding the previous version's files.
+    """
+    if journal is not None:
+        state = journal.target(job, "zenodo")
+        dep_id = state.get("deposition_id") if state.get("api") == api and not state.get("record_url") else None
+        if dep_id:
+            r = session.get(f"{api}/deposit/depositions/{dep_id}")
+            if r.ok and not r.json().get("submitted"):
+                log.info(f"Zenodo: resuming deposition {dep_id}")
+                return r.json()
+            log.warning(f"Zenodo: journaled deposition {dep_id} is gone or submitted; starting over")
+    if previous is not None:
+        r = session.post(f"{api}/deposit/depositions/{previous}/actions/newversion")
+        r.raise_for_status()
+        draft = r.json().get("links", {}).get("latest_draft")
+        if not draft:
+            raise RuntimeError(f"Zenodo deposition {previous} returned no latest_draft link")
+        r = session.get(draft)
+        r.raise_for_status()
+        dep = r.json()
+        log.info(f"Zenodo: deposition {dep['id']} is a new version of {previous}")
+    else:
+        r = session.post(f"{api}/deposit/depositions", json={})
+        r.raise_for_status()
+        dep = r.json()
+    if journal is not None:
+        journal.reset(job, "zenodo", api=api, deposition_id=dep["id"],
+                      **({"previous": previous} if previous is not None else {}))
+    return dep
+
+def _zenodo_record(api: str, dep: Dict) -> Tuple[str, Optional[str]]:
+    record_id = dep.get("record_id") or dep.get("id")
+    record_url = dep.get("links", {}).get("record_html") or dep.get("links", {}).get("html")
+    if not record_url:
+        base = "https://sandbox.zenodo.org/record" if (api == ZENODO_SANDBOX_API) else "https://zenodo.org/record"
+        record_url = f"{base}/{record_id}"
+    return record_url, dep.get("doi")
+
+def _zenodo_put_file(session: requests.Session, bucket: str, path: str, size: int, bar) -> None:
+    """Stream one file (or TarBundle) into the deposition bucket and check the md5 Zenodo reports back."""
+    name = _name(path)
+    with (path.open() if isinstance(path, TarBundle) else open(path, "rb")) as fp:
+        body = ProgressReader(fp, size, bar)
+        try:
+            r = session.put(f"{bucket}/{requests.utils.quote(name)}", data=body,
+                            headers={"Content-Type": "application/octet-stream"})
+            r.raise_for_status()
+        except Exception:
+            body.rewind_progress(); raise
+    checksum = (r.json() or {}).get("checksum", "")
+    if checksum.startswith("md5:") and checksum[4:] != body.md5.hexdigest():
+        body.rewind_progress()
+        raise RuntimeError(f"checksum mismatch for {name}: server {checksum}, sent md5:{body.md5.hexdigest()}")
+
+@telemetry.traced("upload", target="zenodo")
+def upload_to_zenodo(files: List[str], md: Dict, publish: bool = True, use_sandbox: bool = True,
+                     retries: int = 3, journal: Optional[UploadJournal] = None,
+                     job: Optional[str] = None, workers: int = 1,
+                     sessions: Optional["SharedSessions"] = None,
+                     monitor: Optional[Monitor] = None, incremental: bool = False,
+                     previous: Optional[int] = None) -> Tuple[str, Optional[str]]:
+    """Upload to a Zenodo deposition and (optionally) publish it.
+
+    incremental=True makes the deposition a new version of previous (default:
+    the job's last published deposition in the journal) and uploads only the
+    files that version does not already hold; files it holds that are not
+    being published are removed from the new version. If nothing changed, no
+    version is made and the previous record is returned.
+    """
     token = os.getenv("ZENODO_TOKEN")
     if not token:
         raise RuntimeError("ZENODO_TOKEN missing in environment")
-    api = ZENODO_SANDBOX_API if (use_sandbox or os.getenv("ZENODO_SANDBOX") == "1") else ZENODO_API
+    api = _zenodo_api(use_sandbox)
+    digests = _sizes_digests(files)
 
-    r = requests.post(f"{api}/deposit/depositions", headers=_zenodo_headers(token), json={})
-    r.raise_for_status()
-    dep = r.json(); dep_id = dep["id"]
-
-    for f in tqdm(files, desc="Zenodo upload"):
-        with open(f, "rb") as fp:
-            r = requests.post(f"{api}/deposit/depositions/{dep_id}/files",
-                              headers=_zenodo_headers(token),
-                              data={"name": os.path.basename(f)},
-                              files={"file": fp})
+    if journal is not None:
+        state = journal.target(job, "zenodo")
+        if state.get("record_url") and state.get("api") == api and \
+                all(journal.has(job, "zenodo", _name(f), d) for f, (_, d) in zip(files, digests)):
+            log.info("Zenodo: already published by a previous run")
+            for f, (size, _) in zip(files, digests): _emit(monitor, "skip", "zenodo", _name(f), size)
+            return state["record_url"], state.get("doi")
+
+    session = sessions.zenodo(token) if sessions else zenodo_session(token, pool_size=workers)
+    if incremental and previous is None and journal is not None:
+        state = journal.target(job, "zenodo")
+        if state.get("record_url") and state.get("api") == api: previous = state.get("deposition_id")
+    if incremental and previous is not None:
+        r = session.get(f"{api}/deposit/depositions/{previous}")
+        r.raise_for_status()
+        prev = r.json(); remote = zenodo_manifest(prev)
+        if len(remote) == len(files) and all(unchanged(files, [s for s, _ in digests], remote, default_cache())):
+            log.info(f"Zenodo: deposition {previous} already holds every file; no new version")
+            record_url, doi = _zenodo_record(api, prev)
+            if journal is not None:
+                journal.reset(job, "zenodo", api=api, deposition_id=previous, record_url=record_url, doi=doi)
+            for f, (size, digest) in zip(files, digests):
+                if journal is not None: journal.record(job, "zenodo", _name(f), size, digest)
+                _emit(monitor, "skip", "zenodo", _name(f), size)
+            return record_url, doi
+
+    dep = _zenodo_deposition(api, session, journal, job, previous if incremental else None); dep_id = dep["id"]
+    bucket = dep.get("links", {}).get("bucket")
+    if not bucket:
+        raise RuntimeError(f"Zenodo deposition {dep_id} has no bucket link")
+
+    todo = []
+    for f, (size, digest) in zip(files, digests):
+        if journal is not None and journal.has(job, "zenodo", _name(f), digest):
+            _emit(monitor, "skip", "zenodo", _name(f), size)
+        else: todo.append((f, size, digest))
+    remote = zenodo_manifest(dep) if incremental else {}
+    if remote:
+        # a new version starts with the previous files: keep the unchanged, drop the changed and the retired
+        kept = unchanged([f for f, _, _ in todo], [size for _, size, _ in todo], remote, default_cache())
+        local = {_name(f) for f in files}
+        for (f, size, digest), keep in zip(todo, kept):
+            if not keep: continue
+            if journal is not None: journal.record(job, "zenodo", _name(f), size, digest)
+            _emit(monitor, "skip", "zenodo", _name(f), size)
+        todo = [t for t, keep in zip(todo, kept) if not keep]
+        for name in sorted({n for n in remote if n not in local} | {_name(f) for f, _, _ in todo} & remote.keys()):
+            r = session.delete(f"{api}/deposit/depositions/{dep_id}/files/{remote[name]['id']}")
             r.raise_for_status()
+        log.info(f"Zenodo: {sum(kept)} file(s) carried over, {len(todo)} to upload")
+    total = sum(size for _, size, _ in todo)
+    started = time.monotonic()
+    with tqdm(total=total, desc="Zenodo upload", unit="B", unit_scale=True, unit_divisor=1024) as bar:
+        def upload_one(item):
+            f, size, digest = item; name = _name(f)
+            _emit(monitor, "start", "zenodo", name, size); watched = _watch(bar, monitor, "zenodo", name)
+            with telemetry.span("upload_file", target="zenodo") as sp:
+                retry_with_backoff(lambda: _zenodo_put_file(session, bucket, f, size, watched), retries,
+                                   what=f"Zenodo upload of {name}", target="zenodo")
+                sp.add(bytes=size)
+            if journal is not None:
+                journal.record(job, "zenodo", name, size, digest)
+            _emit(monitor, "done", "zenodo", name)
+        if workers > 1 and len(todo) > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zenodo") as ex:
+                list(ex.map(upload_one, todo))
+        else:
+            for item in todo: upload_one(item)
+    elapsed = max(time.monotonic() - started, 1e-9)
+    if todo:
+        log.info(f"Zenodo: {len(todo)} file(s), {total/2**20:.1f} MiB in {elapsed:.1f}s "
+                 f"({total/2**20/elapsed:.1f} MiB/s)")
 
     creators = [{"name": c} for c in md.get("creators", [])] or [{"name":"Unknown"}]
     payload = {"metadata": {
@@ -110,39 +461,222 @@ def upload_to_zenodo(files: List[str], md: Dict, publish: bool = True, use_sandb
         "license": "mit",
         "notes": md.get("notes",""),
     }}
-    r = requests.put(f"{api}/deposit/depositions/{dep_id}", headers=_zenodo_headers(token), json=payload)
+    r = session.put(f"{api}/deposit/depositions/{dep_id}", json=payload)
     r.raise_for_status()
 
     if publish:
-        r = requests.post(f"{api}/deposit/depositions/{dep_id}/actions/publish", headers=_zenodo_headers(token))
+        r = session.post(f"{api}/deposit/depositions/{dep_id}/actions/publish")
         r.raise_for_status()
         dep = r.json()
 
-    record_id = dep.get("record_id") or dep.get("id")
-    record_url = dep.get("links", {}).get("record_html") or dep.get("links", {}).get("html")
-    doi = dep.get("doi")
-    if not record_url:
-        base = "https://sandbox.zenodo.org/record" if (api == ZENODO_SANDBOX_API) else "https://zenodo.org/record"
-        record_url = f"{base}/{record_id}"
+    record_url, doi = _zenodo_record(api, dep)
+    if journal is not None and publish:
+        journal.set(job, "zenodo", record_url=record_url, doi=doi)
     return record_url, doi
 
+CANCEL_GRACE = 30.0  # seconds a timed-out target gets to reach its next chunk, part or file
+
+def run_targets(tasks: Dict[str, Callable[[Monitor], object]], timeouts: Optional[Dict[str, Optional[float]]] = None,
+                max_concurrency: int = 2, monitor: Optional[Monitor] = None,
+                grace: float = CANCEL_GRACE) -> Tuple[Dict[str, object], Dict[str, str]]:
+    """Run independent upload targets on a bounded pool.
+
+    Each task is called with its own Monitor (a child of monitor). Each
+    timeout counts from the moment its target starts running, so a target
+    queued behind the concurrency cap is not charged for the wait; on timeout
+    the target's monitor is cancelled, so its upload stops at the next chunk,
+    part or file with the journal intact, and run_targets waits up to grace
+    seconds for it to unwind. Returns (results, errors); a failed or
+    timed-out target lands in errors only.
+    """
+    timeouts = timeouts or {}
+    started: Dict[str, float] = {}
+    monitors = {name: Monitor(parent=monitor) for name in tasks}
+    def timed(name, fn):
+        def run():
+            started[name] = time.monotonic(); return fn(monitors[name])
+        return run
+    ex = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="upload")
+    futs = {ex.submit(timed(name, fn)): name for name, fn in tasks.items()}
+    results: Dict[str, object] = {}; errors: Dict[str, str] = {}
+    pending = set(futs); abandoned = set()
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = futs[fut]
+                try:
+                    results[name] = fut.result()
+                except Exception as e:
+                    log.warning(f"{name} failed: {e}"); errors[name] = str(e)
+            now = time.monotonic()
+            for fut in list(pending):
+                name = futs[fut]; limit = timeouts.get(name)
+                if limit is not None and name in started and now - started[name] > limit:
+                    log.warning(f"{name} timed out after {limit}s"); errors[name] = f"timed out after {limit}s"
+                    monitors[name].cancel(errors[name]); pending.discard(fut); abandoned.add(fut)
+    finally:
+        for m in monitors.values(): m.cancel()  # no-op for finished targets; stops the rest on an early exit
+        ex.shutdown(wait=False, cancel_futures=True)
+    if abandoned:
+        _, stuck = wait(abandoned, timeout=grace)
+        for fut in stuck: log.warning(f"{futs[fut]} still running {grace}s after its timeout (blocked in a request)")
+    return results, errors
+
 def run_archive(title: str, creators: List[str], description: str, tags: List[str],
                 files: List[str], identifier: Optional[str] = None,
                 do_ia: bool = True, do_zenodo: bool = True,
                 zenodo_publish: bool = True, zenodo_sandbox: bool = True,
-                dry_run: bool = False) -> Dict[str, Optional[str]]:
+                dry_run: bool = False, concurrent: bool = False,
+                max_concurrency: int = 2, ia_timeout: Optional[float] = None,
+                zenodo_timeout: Optional[float] = None, resume: bool = True,
+                journal_path: Optional[str] = None, zenodo_workers: int = 1,
+                ia_multipart_threshold: Optional[int] = None, ia_part_size: Optional[int] = None,
+                ia_part_workers: Optional[int] = None, journal: Optional[UploadJournal] = None,
+                sessions: Optional[SharedSessions] = None, bundle: Optional[str] = None,
+                bundle_manifest: Optional[str] = None, monitor: Optional[Monitor] = None,
+                incremental: bool = False, zenodo_previous: Optional[int] = None) -> Dict[str, Optional[str]]:
+    """Upload files to the enabled targets; a shared journal/sessions may be passed in (see run_batch).
+
+    bundle="name.tar" sends the files as one streamed tar instead (see
+    bundle_stream); member and bundle digests go to bundle_manifest
+    (default name.tar.manifest.json) for chain_new_block.py --bundle-manifest.
+    monitor receives per-file byte progress; after monitor.cancel() the run
+    stops at the next chunk or part and raises Cancelled, with the journal
+    kept so a rerun resumes.
+    incremental=True diffs against what the IA item and the Zenodo record
+    already hold (see remote_manifest) and uploads only new or changed files;
+    on Zenodo that makes a new version of zenodo_previous (default: the
+    job's last published deposition) carrying the unchanged files over.
+    """
     files = ensure_paths(files)
     md = default_metadata(title, creators, description, tags)
-    logging.info("Checksums:\n" + json.dumps(build_checksums(files), indent=2))
+    items: list = files
+    if bundle:
+        if not bundle.endswith(".tar"): bundle += ".tar"
+        items = [TarBundle(bundle, files)]
+        logging.info(f"Bundle: {bundle}, {len(files)} member(s), {items[0].size} bytes; digests taken while it streams")
+    else:
+        logging.info("Checksums:\n" + json.dumps(build_checksums(files), indent=2))
     results = {"internet_archive": None, "zenodo": None, "zenodo_doi": None}
     if dry_run:
-        logging.info("[DRY RUN] Skipping uploads."); return results
-    if do_ia:
-        if not identifier:
-            stem = title.lower().strip().replace(" ", "-")
-            identifier = f"{stem}-{int(time.time())}"
-        results["internet_archive"] = upload_to_internet_archive(identifier, files, md)
-    if do_zenodo:
-        url, doi = upload_to_zenodo(files, md, publish=zenodo_publish, use_sandbox=zenodo_sandbox)
-        results["zenodo"] = url; results["zenodo_doi"] = doi
+        logging.info("[DRY RUN] Skipping uploads.")
+        if bundle: results["bundle"] = _save_bundle_manifest(items[0], bundle_manifest)
+        return results
+    if not resume: journal = None
+    elif journal is None:
+        journal = UploadJournal(journal_path or os.getenv("FABRIC_UPLOAD_JOURNAL") or DEFAULT_JOURNAL)
+    if do_ia and not identifier and journal is not None:
+        identifier = journal.target(title, "internet_archive").get("identifier")
+    if do_ia and not identifier:
+        stem = title.lower().strip().replace(" ", "-")
+        identifier = f"{stem}-{int(time.time())}"
+    ia_opts = dict(journal=journal, job=title, multipart_threshold=ia_multipart_threshold,
+                   part_size=ia_part_size, part_workers=ia_part_workers, sessions=sessions, monitor=monitor,
+                   incremental=incremental)
+    zenodo_opts = dict(publish=zenodo_publish, use_sandbox=zenodo_sandbox, journal=journal, job=title,
+                       workers=zenodo_workers, sessions=sessions, monitor=monitor, incremental=incremental,
+                       previous=zenodo_previous)
+    if monitor is not None: monitor.check()
+    if concurrent:
+        tasks = {}
+        if do_ia:
+            tasks["internet_archive"] = lambda m: upload_to_internet_archive(identifier, items, md,
+                                                                             **{**ia_opts, "monitor": m})
+        if do_zenodo:
+            tasks["zenodo"] = lambda m: upload_to_zenodo(items, md, **{**zenodo_opts, "monitor": m})
+        done, errors = run_targets(tasks, {"internet_archive": ia_timeout, "zenodo": zenodo_timeout},
+                                   max_concurrency=max_concurrency, monitor=monitor)
+        results["internet_archive"] = done.get("internet_archive")
+        if "zenodo" in done:
+            results["zenodo"], results["zenodo_doi"] = done["zenodo"]
+        results["errors"] = errors
+    else:
+        if do_ia:
+            results["internet_archive"] = upload_to_internet_archive(identifier, items, md, **ia_opts)
+        if do_zenodo:
+            url, doi = upload_to_zenodo(items, md, **zenodo_opts)
+            results["zenodo"] = url; results["zenodo_doi"] = doi
+    if bundle and not results.get("errors"):
+        results["bundle"] = _save_bundle_manifest(items[0], bundle_manifest)
+    return results
+
+def _save_bundle_manifest(b: TarBundle, path: Optional[str]) -> Dict:
+    # every target may have been skipped by the journal; then one local pass supplies the digests
+    m = b.manifest or b.hash_pass()
+    path = path or f"{b.name}.manifest.json"
+    write_manifest(m, path)
+    logging.info(f"Bundle {b.name}: sha256 {m['sha256']}, {len(m['members'])} member(s); manifest -> {path}")
+    return {"name": b.name, "bytes": m["bytes"], "sha256": m["sha256"], "members": len(m["members"]), "manifest": path}
+
+BATCH_FIELDS = {"title", "creators", "description", "tags", "files", "identifier", "do_ia", "do_zenodo",
+                "zenodo_publish", "zenodo_sandbox", "concurrent", "max_concurrency", "ia_timeout",
+                "zenodo_timeout", "zenodo_workers", "ia_multipart_threshold", "ia_part_size", "ia_part_workers",
+                "bundle", "bundle_manifest", "incremental", "zenodo_previous"}
+
+def read_manifest(path: str) -> List[Dict]:
+    """Jobs from a JSONL manifest, one run_archive keyword set per line.
+
+    title, description and files are required; relative file paths are taken
+    from the manifest's directory. Titles must be unique: the upload journal
+    is keyed by title.
+    """
+    base = os.path.dirname(os.path.abspath(path)); jobs = []; titles = set()
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip() or line.lstrip().startswith("#"): continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: not JSON: {e}") from e
+            missing = {"title", "description", "files"} - job.keys(); unknown = job.keys() - BATCH_FIELDS
+            if missing: raise ValueError(f"{path}:{lineno}: missing {', '.join(sorted(missing))}")
+            if unknown: raise ValueError(f"{path}:{lineno}: unknown field(s) {', '.join(sorted(unknown))}")
+            if job["title"] in titles: raise ValueError(f"{path}:{lineno}: duplicate title {job['title']!r}")
+            titles.add(job["title"])
+            job["files"] = [os.path.join(base, p) for p in job["files"]]
+            jobs.append(job)
+    return jobs
+
+def run_batch(jobs: List[Dict], max_jobs: int = 4, defaults: Optional[Dict] = None, dry_run: bool = False,
+              resume: bool = True, journal_path: Optional[str] = None,
+              on_result: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+    """Run many archive jobs in one process, at most max_jobs at a time.
+
+    Jobs share one journal, one set of HTTP sessions and the digest cache;
+    every distinct file is hashed once up front. defaults supplies
+    run_archive keywords a job does not set. Each finished job yields a
+    result dict (job, title, ok, seconds, the run_archive result or error),
+    passed to on_result as it completes; the list is returned in job order.
+    """
+    defaults = defaults or {}
+    cache = default_cache()
+    if cache is None: log.warning("digest cache is off: files shared by several jobs are hashed once per job")
+    unique = list(dict.fromkeys(os.path.abspath(f) for j in jobs for f in j["files"] if os.path.exists(f)))
+    with telemetry.span("batch_prehash") as sp:
+        sp.add(files=len(unique), bytes=sum(size for size, _ in hash_files(unique, cache=cache)))
+    journal = UploadJournal(journal_path or os.getenv("FABRIC_UPLOAD_JOURNAL") or DEFAULT_JOURNAL) if resume else None
+    workers = max(defaults.get("zenodo_workers", 1), defaults.get("ia_part_workers") or ia_multipart.DEFAULT_PART_WORKERS)
+    sessions = SharedSessions(pool_size=max(1, max_jobs) * workers)
+    results: List[Optional[Dict]] = [None] * len(jobs)
+
+    def one(n: int, job: Dict) -> Dict:
+        started = time.monotonic(); out = {"job": n, "title": job["title"]}
+        try:
+            with telemetry.span("batch_job"):
+                res = run_archive(**{"creators": [], "tags": [], **defaults, **job}, dry_run=dry_run,
+                                  resume=resume, journal=journal, sessions=sessions)
+            out.update(ok=not res.get("errors"), **res)
+        except Exception as e:
+            log.warning(f"batch job {n} ({job['title']}) failed: {e}")
+            out.update(ok=False, error=str(e))
+        out["seconds"] = round(time.monotonic() - started, 3)
+        return out
+
+    with ThreadPoolExecutor(max_workers=max(1, max_jobs), thread_name_prefix="batch") as ex:
+        futs = {ex.submit(one, n, job): n for n, job in enumerate(jobs)}
+        for fut in as_completed(futs):
+            res = fut.result(); results[futs[fut]] = res
+            telemetry.count("batch_jobs", ok=str(res["ok"]).lower())
+            if on_result is not None: on_result(res)
     return results
@@ -1,15 +1,99 @@
 #!/usr/bin/env python3
 # MIT License
+"""Tk front end for run_archive.
+
+Hashing and uploading run on background threads. They post events to a
+queue that the Tk loop drains every POLL_MS via after(), so the window
+stays responsive. Files are hashed into the digest cache as soon as they
+are added, which makes the checksum step of the archive itself cheap.
+"""
+import os, time, queue, threading
+from collections import deque
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from uploader_core import run_archive
+from file_hashing import default_cache, iter_hash_files
+from uploader_core import Cancelled, Monitor, run_archive
+
+POLL_MS = 100
+RATE_WINDOW = 5.0  # seconds of samples behind the throughput / ETA figures
+TARGETS = (("internet_archive", "Internet Archive"), ("zenodo", "Zenodo"))
+
+def human_bytes(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024 or unit == "GiB": return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+def human_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}h{seconds // 60 % 60:02d}m" if seconds >= 3600 else f"{seconds // 60}m{seconds % 60:02d}s"
+
+class TransferStats:
+    """Byte totals, in-flight files, throughput and ETA for one target, fed by Monitor events."""
+
+    def __init__(self, total: int = 0):
+        self.total = total; self.done = 0; self.files_done = 0
+        self.inflight: dict[str, list[int]] = {}  # name -> [sent, size]
+        self.samples = deque(); self.sent = 0      # (time, bytes actually sent) for the rate
+
+    def on_event(self, ev: dict, now: float) -> None:
+        name = ev["file"]; n = ev["bytes"]
+        if ev["event"] == "start": self.inflight[name] = [0, n]
+        elif ev["event"] == "skip": self.done += n; self.files_done += 1
+        elif ev["event"] == "bytes":
+            self.done += n; self.sent += n
+            if name in self.inflight: self.inflight[name][0] += n
+            self.samples.append((now, self.sent))
+        elif ev["event"] == "done":
+            self.inflight.pop(name, None); self.files_done += 1
+
+    def rate(self, now: float) -> float:
+        while len(self.samples) > 1 and now - self.samples[0][0] > RATE_WINDOW: self.samples.popleft()
+        if len(self.samples) < 2: return 0.0
+        (t0, b0), (t1, b1) = self.samples[0], self.samples[-1]
+        return (b1 - b0) / max(now - t0, t1 - t0, 1e-9)
+
+    def summary(self, now: float) -> str:
+        rate = self.rate(now); left = max(self.total - self.done, 0)
+        text = f"{human_bytes(self.done)} / {human_bytes(self.total)}"
+        if rate > 0: text += f" — {human_bytes(rate)}/s"
+        if rate > 0 and left: text += f", ETA {human_eta(left / rate)}"
+        return text
+
+    def current(self) -> str:
+        return ", ".join(f"{name} {100 * sent // max(size, 1)}%" for name, (sent, size) in self.inflight.items())
+
+class TargetRow:
+    def __init__(self, parent, label: str, row: int):
+        ttk.Label(parent, text=label).grid(row=row, column=0, sticky="w")
+        self.bar = ttk.Progressbar(parent, length=360, maximum=1)
+        self.bar.grid(row=row, column=1, sticky="we", padx=8)
+        self.info = tk.StringVar(value="—"); self.file = tk.StringVar(value="")
+        ttk.Label(parent, textvariable=self.info, width=40).grid(row=row, column=2, sticky="w")
+        ttk.Label(parent, textvariable=self.file, foreground="gray").grid(row=row + 1, column=1, columnspan=2, sticky="w", padx=8)
+        self.stats = None
+
+    def reset(self, total: int) -> None:
+        self.stats = TransferStats(total); self.bar.configure(maximum=max(total, 1), value=0)
+        self.info.set(f"0 B / {human_bytes(total)}"); self.file.set("")
+
+    def disable(self) -> None:
+        self.stats = None; self.bar.configure(value=0); self.info.set("off"); self.file.set("")
+
+    def refresh(self, now: float) -> None:
+        if self.stats is None: return
+        self.bar.configure(value=self.stats.done); self.info.set(self.stats.summary(now))
+        self.file.set(self.stats.current())
 
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("The Testament Uploader — ♾️🔥📜")
-        self.geometry("680x540")
+        self.geometry("780x700")
         self.files = []
+        self.digests = {}        # path -> (size, sha256) from background hashing
+        self.events = queue.Queue()
+        self.hash_gen = 0        # bumped by Clear so late results from an old hashing thread are dropped
+        self.monitor = None; self.worker = None; self.closing = False
 
         frm = ttk.Frame(self, padding=12)
         frm.pack(fill="both", expand=True)
@@ -23,15 +107,17 @@ class App(tk.Tk):
         self.zenodo_publish_var = tk.BooleanVar(value=True)
         self.zenodo_sandbox_var = tk.BooleanVar(value=True)
         self.dry_var = tk.BooleanVar(value=True)
+        self.concurrent_var = tk.BooleanVar(value=False)
+        self.incremental_var = tk.BooleanVar(value=False)
 
         row = 0
-        ttk.Label(frm, text="Title").grid(row=row, column=0, sticky="e"); 
+        ttk.Label(frm, text="Title").grid(row=row, column=0, sticky="e");
         ttk.Entry(frm, textvariable=self.title_var, width=52).grid(row=row, column=1, sticky="w"); row+=1
 
-        ttk.Label(frm, text="Creators (comma-separated)").grid(row=row, column=0, sticky="e"); 
+        ttk.Label(frm, text="Creators (comma-separated)").grid(row=row, column=0, sticky="e");
         ttk.Entry(frm, textvariable=self.creators_var, width=52).grid(row=row, column=1, sticky="w"); row+=1
 
-        ttk.Label(frm, text="Tags (comma-separated)").grid(row=row, column=0, sticky="e"); 
+        ttk.Label(frm, text="Tags (comma-separated)").grid(row=row, column=0, sticky="e");
         ttk.Entry(frm, textvariable=self.tags_var, width=52).grid(row=row, column=1, sticky="w"); row+=1
 
         ttk.Label(frm, text="Description").grid(row=row, column=0, sticky="ne")
@@ -53,42 +139,137 @@ class App(tk.Tk):
         ttk.Checkbutton(opts, text="Zenodo", variable=self.zenodo_var).pack(side="left", padx=8)
         ttk.Checkbutton(opts, text="Publish on Zenodo", variable=self.zenodo_publish_var).pack(side="left", padx=8)
         ttk.Checkbutton(opts, text="Zenodo Sandbox", variable=self.zenodo_sandbox_var).pack(side="left", padx=8)
-        ttk.Checkbutton(opts, text="Dry run", variable=self.dry_var).pack(side="left", padx=8); row+=1
+        ttk.Checkbutton(opts, text="Dry run", variable=self.dry_var).pack(side="left", padx=8)
+        ttk.Checkbutton(opts, text="Concurrent", variable=self.concurrent_var).pack(side="left", padx=8)
+        ttk.Checkbutton(opts, text="Only changed files", variable=self.incremental_var).pack(side="left", padx=8); row+=1
+
+        prog = ttk.Frame(frm); prog.grid(row=row, column=0, columnspan=2, sticky="we", pady=(4,4)); row+=1
+        self.rows = {key: TargetRow(prog, label, 2 * i) for i, (key, label) in enumerate(TARGETS)}
 
-        ttk.Button(frm, text="Archive Now", command=self.archive).grid(row=row, column=0, columnspan=2, pady=10)
+        btns = ttk.Frame(frm); btns.grid(row=row, column=0, columnspan=2, pady=10); row+=1
+        self.archive_btn = ttk.Button(btns, text="Archive Now", command=self.archive)
+        self.archive_btn.pack(side="left")
+        self.cancel_btn = ttk.Button(btns, text="Cancel", command=self.cancel, state="disabled")
+        self.cancel_btn.pack(side="left", padx=8)
         self.status = tk.StringVar(value="Ready.")
-        ttk.Label(frm, textvariable=self.status).grid(row=row+1, column=0, columnspan=2, sticky="w")
+        ttk.Label(frm, textvariable=self.status).grid(row=row, column=0, columnspan=2, sticky="w")
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(POLL_MS, self.poll)
+
+    # --- files and background hashing ---
+
+    def _file_text(self, p: str) -> str:
+        if p not in self.digests: return f"{p}  —  hashing…"
+        size, digest = self.digests[p]
+        return f"{p}  —  {human_bytes(size)}  sha256 {digest[:16]}…"
 
     def add_files(self):
-        paths = filedialog.askopenfilenames(title="Select files to archive")
+        paths = [p for p in filedialog.askopenfilenames(title="Select files to archive") if p not in self.files]
         for p in paths:
-            self.files.append(p); self.files_list.insert("end", p)
+            self.files.append(p); self.files_list.insert("end", self._file_text(p))
+        if paths:
+            threading.Thread(target=self._hash_worker, args=(paths, self.hash_gen), daemon=True).start()
+
+    def _hash_worker(self, paths, gen):
+        try:
+            for p, size, digest in iter_hash_files(paths, cache=default_cache()):
+                self.events.put(("hashed", gen, (p, size, digest)))
+        except Exception as e:
+            self.events.put(("hash_error", gen, str(e)))
 
     def clear_files(self):
-        self.files.clear(); self.files_list.delete(0, "end")
+        if self.worker: return
+        self.hash_gen += 1; self.files.clear(); self.digests.clear(); self.files_list.delete(0, "end")
+
+    # --- archiving ---
 
     def archive(self):
+        title = self.title_var.get().strip()
+        creators = [c.strip() for c in self.creators_var.get().split(",") if c.strip()]
+        tags = [t.strip() for t in self.tags_var.get().split(",") if t.strip()]
+        description = self.desc.get("1.0", "end").strip()
+        identifier = self.identifier_var.get().strip() or None
+        if not title or not description or not self.files:
+            messagebox.showerror("Missing data", "Title, Description, and at least one file are required."); return
         try:
-            title = self.title_var.get().strip()
-            creators = [c.strip() for c in self.creators_var.get().split(",") if c.strip()]
-            tags = [t.strip() for t in self.tags_var.get().split(",") if t.strip()]
-            description = self.desc.get("1.0", "end").strip()
-            identifier = self.identifier_var.get().strip() or None
-            if not title or not description or not self.files:
-                messagebox.showerror("Missing data", "Title, Description, and at least one file are required."); return
-            self.status.set("Archiving…"); self.update_idletasks()
-            res = run_archive(title, creators, description, tags, self.files, identifier,
-                              do_ia=self.ia_var.get(), do_zenodo=self.zenodo_var.get(),
-                              zenodo_publish=self.zenodo_publish_var.get(),
-                              zenodo_sandbox=self.zenodo_sandbox_var.get(),
-                              dry_run=self.dry_var.get())
-            msg = "Done.\n\n"
-            if res.get("internet_archive"): msg += f"Internet Archive: {res['internet_archive']}\n"
-            if res.get("zenodo"): msg += f"Zenodo: {res['zenodo']}\n"
-            if res.get("zenodo_doi"): msg += f"DOI: {res['zenodo_doi']}\n"
-            messagebox.showinfo("Archive complete", msg or "Done."); self.status.set("Ready.")
+            total = sum(os.path.getsize(p) for p in self.files)
+        except OSError as e:
+            messagebox.showerror("Error", str(e)); return
+        for key, enabled in (("internet_archive", self.ia_var.get()), ("zenodo", self.zenodo_var.get())):
+            if enabled and not self.dry_var.get(): self.rows[key].reset(total)
+            else: self.rows[key].disable()
+        kwargs = dict(title=title, creators=creators, description=description, tags=tags, files=list(self.files),
+                      identifier=identifier, do_ia=self.ia_var.get(), do_zenodo=self.zenodo_var.get(),
+                      zenodo_publish=self.zenodo_publish_var.get(), zenodo_sandbox=self.zenodo_sandbox_var.get(),
+                      dry_run=self.dry_var.get(), concurrent=self.concurrent_var.get(),
+                      incremental=self.incremental_var.get())
+        self.monitor = Monitor(lambda ev: self.events.put(("upload", None, ev)))
+        self.worker = threading.Thread(target=self._archive_worker, args=(kwargs, self.monitor), daemon=True)
+        self.archive_btn.configure(state="disabled"); self.cancel_btn.configure(state="normal")
+        self.status.set("Archiving… (hashing)"); self.worker.start()
+
+    def _archive_worker(self, kwargs, monitor):
+        try:
+            self.events.put(("finished", None, run_archive(**kwargs, monitor=monitor)))
+        except Cancelled:
+            self.events.put(("cancelled", None, None))
         except Exception as e:
-            messagebox.showerror("Error", str(e)); self.status.set("Error.")
+            self.events.put(("error", None, str(e)))
+
+    def cancel(self):
+        if self.monitor is None: return
+        self.monitor.cancel(); self.cancel_btn.configure(state="disabled")
+        self.status.set("Cancelling… (stopping after the chunk or part in flight)")
+
+    def _archive_done(self):
+        self.worker = None; self.monitor = None
+        self.archive_btn.configure(state="normal"); self.cancel_btn.configure(state="disabled")
+
+    def on_close(self):
+        if self.worker is None: self.destroy(); return
+        # let the worker unwind so the journal is left consistent for a resume
+        self.closing = True; self.cancel()
+
+    # --- event pump ---
+
+    def poll(self):
+        now = time.monotonic(); handled = 0
+        while handled < 5000:
+            try:
+                kind, gen, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            handled += 1
+            if kind == "upload":
+                row = self.rows[payload["target"]]
+                if row.stats is not None: row.stats.on_event(payload, now)
+                if payload["event"] == "start": self.status.set("Archiving… (uploading)")
+            elif kind == "hashed" and gen == self.hash_gen:
+                p, size, digest = payload; self.digests[p] = (size, digest)
+                if p in self.files:
+                    i = self.files.index(p); self.files_list.delete(i); self.files_list.insert(i, self._file_text(p))
+            elif kind == "hash_error" and gen == self.hash_gen:
+                self.status.set(f"Hashing failed: {payload}")
+            elif kind in ("finished", "cancelled", "error"):
+                self._archive_done()
+                if self.closing: self.destroy(); return
+                self._report(kind, payload)
+        for row in self.rows.values(): row.refresh(now)
+        self.after(POLL_MS, self.poll)
+
+    def _report(self, kind, payload):
+        if kind == "cancelled":
+            self.status.set("Cancelled. Re-run to resume from the upload journal."); return
+        if kind == "error":
+            messagebox.showerror("Error", payload); self.status.set("Error."); return
+        res = payload
+        msg = "Done.\n\n"
+        if res.get("internet_archive"): msg += f"Internet Archive: {res['internet_archive']}\n"
+        if res.get("zenodo"): msg += f"Zenodo: {res['zenodo']}\n"
+        if res.get("zenodo_doi"): msg += f"DOI: {res['zenodo_doi']}\n"
+        for target, err in (res.get("errors") or {}).items(): msg += f"{target} FAILED: {err}\n"
+        messagebox.showinfo("Archive complete", msg or "Done."); self.status.set("Ready.")
 
 if __name__ == "__main__":
     App().mainloop()